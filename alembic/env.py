@@ -38,10 +38,11 @@ from app.core.database import Base
 # Importar todos los modelos para que Alembic los reconozca
 from app.models.user import User
 from app.models.client import Client
-from app.models.credit import Credit
+from app.models.credit import Credit, CreditInstallment
 #from app.models.payment import Payment
 from app.models.cash_transaction import CashTransaction
-from app.models.box import Box, BoxMovement
+from app.models.box import Box, BoxClose
+from app.models.ledger import LedgerAccount, LedgerEntry, LedgerPosting
 
 # Asignar la metadata de nuestros modelos a Alembic
 target_metadata = Base.metadata
@@ -0,0 +1,28 @@
+"""add clients collector_id index
+
+Revision ID: 10c7dfe4c0eb
+Revises: 07e09c43f708
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '10c7dfe4c0eb'
+down_revision: Union[str, Sequence[str], None] = '07e09c43f708'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Índice compuesto para listar clientes por cobrador con paginación keyset."""
+    op.create_index('ix_clients_collector_id_id', 'clients', ['collector_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_clients_collector_id_id', table_name='clients')
@@ -0,0 +1,47 @@
+"""create cash_balances
+
+Revision ID: 15da7e8039c9
+Revises: bc8ab2ba3680
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '15da7e8039c9'
+down_revision: Union[str, Sequence[str], None] = 'bc8ab2ba3680'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Saldo de caja materializado por usuario, inicializado desde cash_transactions."""
+    op.create_table('cash_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Backfill: mismo cálculo que crud_caja.get_ledger_balance, agrupado por usuario.
+    # Se compara como texto para aceptar tanto nombres (ORM) como valores del enum.
+    op.execute(
+        """
+        INSERT INTO cash_balances (user_id, balance, updated_at)
+        SELECT user_id,
+               COALESCE(SUM(CASE WHEN CAST(transaction_type AS VARCHAR) IN ('DEPOSIT', 'PAYMENT', 'deposit', 'payment') THEN amount ELSE -amount END), 0),
+               CURRENT_TIMESTAMP
+        FROM cash_transactions
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cash_balances')
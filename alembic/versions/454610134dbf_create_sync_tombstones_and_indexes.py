@@ -0,0 +1,45 @@
+"""create sync_tombstones and delta sync indexes
+
+Revision ID: 454610134dbf
+Revises: b87b85e4cfd2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '454610134dbf'
+down_revision: Union[str, Sequence[str], None] = 'b87b85e4cfd2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Bajas para la sincronización incremental e índices por (alcance, updated_at)."""
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('collector_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_collector_id_deleted_at', 'sync_tombstones', ['collector_id', 'deleted_at'], unique=False)
+    op.create_index('ix_clients_collector_id_updated_at', 'clients', ['collector_id', 'updated_at'], unique=False)
+    op.create_index('ix_credits_client_id_updated_at', 'credits', ['client_id', 'updated_at'], unique=False)
+    op.create_index('ix_cash_transactions_user_id_updated_at', 'cash_transactions', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_box_movements_box_id_created_at', 'box_movements', ['box_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_box_movements_box_id_created_at', table_name='box_movements')
+    op.drop_index('ix_cash_transactions_user_id_updated_at', table_name='cash_transactions')
+    op.drop_index('ix_credits_client_id_updated_at', table_name='credits')
+    op.drop_index('ix_clients_collector_id_updated_at', table_name='clients')
+    op.drop_index('ix_sync_tombstones_collector_id_deleted_at', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
@@ -0,0 +1,108 @@
+"""create credit_installments (amortization schedule) and backfill existing credits
+
+Revision ID: 476906fbf748
+Revises: 978a2dc1f9eb
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from datetime import date, datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '476906fbf748'
+down_revision: Union[str, Sequence[str], None] = '978a2dc1f9eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+
+installment_status_enum = sa.Enum('pending', 'partial', 'paid', name='installmentstatus')
+
+installments = sa.table('credit_installments',
+    sa.column('credit_id', sa.Integer), sa.column('number', sa.Integer), sa.column('due_date', sa.Date),
+    sa.column('amount', sa.Float), sa.column('paid_amount', sa.Float), sa.column('status', sa.String),
+    sa.column('paid_at', sa.DateTime),
+)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        return datetime.fromisoformat(str(value)).date()
+    return datetime.utcnow().date()
+
+
+def _schedule(credit_id, total, daily, term_days, start, paid):
+    """Mismo plan que app.crud.credit.build_schedule, con lo ya pagado aplicado en orden."""
+    term = term_days if term_days and term_days > 0 else 1
+    amount = round(daily if term > 1 and daily else total / term, 2)
+    rows = []
+    for n in range(1, term + 1):
+        value = amount if n < term else round(total - amount * (term - 1), 2)
+        applied = round(min(max(paid, 0.0), value), 2)
+        paid -= applied
+        status = 'paid' if applied >= value - 0.005 else ('partial' if applied > 0 else 'pending')
+        rows.append({
+            'credit_id': credit_id, 'number': n, 'due_date': start + timedelta(days=n), 'amount': value,
+            'paid_amount': applied, 'status': status, 'paid_at': None,
+        })
+    return rows
+
+
+def upgrade() -> None:
+    """
+    Plan de cuotas por crédito, indexado por (due_date, status) para "quién paga hoy".
+
+    Backfill: genera el plan de cada crédito existente desde su start_date, aplica lo ya
+    pagado (total - restante) a las cuotas más antiguas y completa end_date si falta.
+    """
+    op.create_table('credit_installments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('credit_id', sa.Integer(), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('paid_amount', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('status', installment_status_enum, nullable=False),
+    sa.Column('paid_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['credit_id'], ['credits.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('credit_id', 'number', name='uq_credit_installments_credit_id_number')
+    )
+    op.create_index(op.f('ix_credit_installments_id'), 'credit_installments', ['id'], unique=False)
+    op.create_index('ix_credit_installments_due_date_status', 'credit_installments', ['due_date', 'status'], unique=False)
+
+    bind = op.get_bind()
+    credits = bind.execute(sa.text(
+        'SELECT id, total_amount, remaining_amount, daily_payment, term_days, start_date, created_at '
+        'FROM credits WHERE total_amount IS NOT NULL AND total_amount > 0 ORDER BY id'
+    )).all()
+    pending = []
+    for credit_id, total, remaining, daily, term_days, start_date, created_at in credits:
+        remaining = total if remaining is None else remaining
+        rows = _schedule(credit_id, total, daily, term_days, _as_date(start_date or created_at), total - remaining)
+        pending.extend(rows)
+        bind.execute(
+            sa.text('UPDATE credits SET end_date = :end_date WHERE id = :id AND end_date IS NULL'),
+            {'end_date': datetime.combine(rows[-1]['due_date'], datetime.min.time()), 'id': credit_id},
+        )
+        if len(pending) >= BATCH:
+            bind.execute(installments.insert(), pending)
+            pending = []
+    if pending:
+        bind.execute(installments.insert(), pending)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_credit_installments_due_date_status', table_name='credit_installments')
+    op.drop_index(op.f('ix_credit_installments_id'), table_name='credit_installments')
+    op.drop_table('credit_installments')
+    installment_status_enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,30 @@
+"""add cash_transactions client_ref
+
+Revision ID: 6065a846705a
+Revises: 15da7e8039c9
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6065a846705a'
+down_revision: Union[str, Sequence[str], None] = '15da7e8039c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Clave generada por el cliente para deduplicar pagos enviados en lote (única por usuario)."""
+    op.add_column('cash_transactions', sa.Column('client_ref', sa.String(length=64), nullable=True))
+    op.create_index('ix_cash_transactions_user_id_client_ref', 'cash_transactions', ['user_id', 'client_ref'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cash_transactions_user_id_client_ref', table_name='cash_transactions')
+    op.drop_column('cash_transactions', 'client_ref')
@@ -0,0 +1,28 @@
+"""add clients.route_order for the daily route worklist
+
+Revision ID: 8b3a75e40290
+Revises: 476906fbf748
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3a75e40290'
+down_revision: Union[str, Sequence[str], None] = '476906fbf748'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Orden de visita del cliente en la ruta de su cobrador (GET /route/today)."""
+    op.add_column('clients', sa.Column('route_order', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('clients', 'route_order')
@@ -0,0 +1,50 @@
+"""create box_closes (daily cash-box close snapshots)
+
+Revision ID: 978a2dc1f9eb
+Revises: f0605e479aae
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '978a2dc1f9eb'
+down_revision: Union[str, Sequence[str], None] = 'f0605e479aae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Cierres diarios de caja: foto inmutable de saldos, una por caja por día."""
+    op.create_table('box_closes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('box_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('business_date', sa.Date(), nullable=False),
+    sa.Column('system_balance', sa.Float(), nullable=False),
+    sa.Column('insurance_balance', sa.Float(), nullable=False),
+    sa.Column('counted_balance', sa.Float(), nullable=False),
+    sa.Column('difference', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('denominations', sa.JSON(), nullable=True),
+    sa.Column('last_posting_id', sa.Integer(), nullable=True),
+    sa.Column('closed_by_id', sa.Integer(), nullable=True),
+    sa.Column('observations', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['box_id'], ['boxes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['closed_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('box_id', 'business_date', name='uq_box_closes_box_id_business_date')
+    )
+    op.create_index(op.f('ix_box_closes_id'), 'box_closes', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_box_closes_id'), table_name='box_closes')
+    op.drop_table('box_closes')
@@ -0,0 +1,28 @@
+"""add house_photo_thumb_url to clients
+
+Revision ID: b87b85e4cfd2
+Revises: 24ce7d24b591
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b87b85e4cfd2'
+down_revision: Union[str, Sequence[str], None] = '24ce7d24b591'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """URL de la miniatura de la foto de vivienda."""
+    op.add_column('clients', sa.Column('house_photo_thumb_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('clients', 'house_photo_thumb_url')
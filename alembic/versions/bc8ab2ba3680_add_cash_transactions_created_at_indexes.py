@@ -0,0 +1,30 @@
+"""add cash_transactions created_at indexes
+
+Revision ID: bc8ab2ba3680
+Revises: 10c7dfe4c0eb
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bc8ab2ba3680'
+down_revision: Union[str, Sequence[str], None] = '10c7dfe4c0eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Índices compuestos para filtrar transacciones por rango de created_at."""
+    op.create_index('ix_cash_transactions_user_id_created_at', 'cash_transactions', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_cash_transactions_credit_id_created_at', 'cash_transactions', ['credit_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cash_transactions_credit_id_created_at', table_name='cash_transactions')
+    op.drop_index('ix_cash_transactions_user_id_created_at', table_name='cash_transactions')
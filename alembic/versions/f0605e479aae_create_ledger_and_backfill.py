@@ -0,0 +1,317 @@
+"""create double-entry ledger and backfill from boxes, box_movements and cash_transactions
+
+Revision ID: f0605e479aae
+Revises: 454610134dbf
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0605e479aae'
+down_revision: Union[str, Sequence[str], None] = '454610134dbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+
+account_type_enum = sa.Enum('PRINCIPAL', 'MICROSEGURO', 'CAPITAL', 'CARTERA', 'GASTOS', name='accounttype')
+
+accounts = sa.table('ledger_accounts',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('account_type', sa.String), sa.column('balance', sa.Float),
+)
+entries = sa.table('ledger_entries',
+    sa.column('id', sa.Integer), sa.column('entry_type', sa.String), sa.column('description', sa.String),
+    sa.column('performed_by_id', sa.Integer), sa.column('credit_id', sa.Integer), sa.column('created_at'),
+)
+postings = sa.table('ledger_postings',
+    sa.column('entry_id', sa.Integer), sa.column('account_id', sa.Integer), sa.column('amount', sa.Float),
+    sa.column('movement_type', sa.String), sa.column('description', sa.String), sa.column('created_at'),
+)
+
+
+def _create_tables() -> None:
+    op.create_table('ledger_accounts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('account_type', account_type_enum, nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'account_type', name='uq_ledger_accounts_user_id_account_type')
+    )
+    op.create_index(op.f('ix_ledger_accounts_id'), 'ledger_accounts', ['id'], unique=False)
+    op.create_table('ledger_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entry_type', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('performed_by_id', sa.Integer(), nullable=True),
+    sa.Column('credit_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['performed_by_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['credit_id'], ['credits.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ledger_entries_id'), 'ledger_entries', ['id'], unique=False)
+    op.create_table('ledger_postings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('movement_type', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['entry_id'], ['ledger_entries.id'], ),
+    sa.ForeignKeyConstraint(['account_id'], ['ledger_accounts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ledger_postings_id'), 'ledger_postings', ['id'], unique=False)
+    op.create_index(op.f('ix_ledger_postings_entry_id'), 'ledger_postings', ['entry_id'], unique=False)
+    op.create_index('ix_ledger_postings_account_id_created_at', 'ledger_postings', ['account_id', 'created_at'], unique=False)
+
+
+class _Writer:
+    """Inserta asientos con ids explícitos (la tabla está vacía) y sus partidas, por lotes."""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.next_id = 1
+        self.entries = []
+        self.postings = []
+
+    def add(self, entry_type, description, performed_by_id, credit_id, created_at, legs):
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries.append({
+            'id': entry_id, 'entry_type': entry_type, 'description': description,
+            'performed_by_id': performed_by_id, 'credit_id': credit_id, 'created_at': created_at,
+        })
+        for account_id, amount, movement_type, leg_description in legs:
+            self.postings.append({
+                'entry_id': entry_id, 'account_id': account_id, 'amount': amount,
+                'movement_type': movement_type, 'description': leg_description, 'created_at': created_at,
+            })
+        if len(self.entries) >= BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.entries:
+            self.bind.execute(entries.insert(), self.entries)
+            self.bind.execute(postings.insert(), self.postings)
+        self.entries, self.postings = [], []
+
+
+def upgrade() -> None:
+    """
+    Libro mayor de partida doble (cuentas, asientos y partidas) que reemplaza los saldos
+    de boxes, box_movements y cash_balances.
+
+    Backfill: una cuenta principal y una de microseguro por caja; cada movimiento de caja
+    y cada transacción de caja pasa a ser un asiento (contrapartida: capital o cartera).
+    Si la suma del historial no explica el saldo guardado (ediciones directas), la
+    diferencia se registra como asiento de apertura.
+
+    Cambio de semántica intencional: la cuenta principal consolida la base de la caja
+    (boxes.base_balance) y el saldo de caja del usuario (cash_balances), así que el saldo
+    de la caja pasa a incluir las transacciones de caja. Cada parte lleva su propio asiento
+    de apertura (OPENING / OPENING_CASH) para que downgrade pueda separarlas de nuevo.
+    """
+    _create_tables()
+    bind = op.get_bind()
+
+    # Cuentas del sistema y de usuario
+    bind.execute(accounts.insert(), [
+        {'user_id': None, 'account_type': t, 'balance': 0.0} for t in ('CAPITAL', 'CARTERA', 'GASTOS')
+    ])
+    # Saldos guardados: los de la caja (base y microseguro) y, aparte, los de cash_balances
+    targets = {}
+    for user_id, base, insurance in bind.execute(sa.text('SELECT user_id, base_balance, insurance_balance FROM boxes')):
+        targets[(user_id, 'PRINCIPAL')] = base or 0.0
+        targets[(user_id, 'MICROSEGURO')] = insurance or 0.0
+    cash_targets = {
+        user_id: balance or 0.0
+        for user_id, balance in bind.execute(sa.text('SELECT user_id, balance FROM cash_balances'))
+    }
+    for user_id in cash_targets:
+        targets.setdefault((user_id, 'PRINCIPAL'), 0.0)
+    user_accounts = sorted(targets)
+    if user_accounts:
+        bind.execute(accounts.insert(), [
+            {'user_id': user_id, 'account_type': t, 'balance': 0.0} for user_id, t in user_accounts
+        ])
+    ids = {
+        (user_id, account_type): account_id
+        for account_id, user_id, account_type in bind.execute(sa.text('SELECT id, user_id, account_type FROM ledger_accounts'))
+    }
+    capital, cartera = ids[(None, 'CAPITAL')], ids[(None, 'CARTERA')]
+
+    writer = _Writer(bind)
+    box_history = {}   # account_id -> suma de los movimientos de caja
+    cash_history = {}  # user_id -> suma de las transacciones de caja
+    movements = bind.execute(sa.text(
+        'SELECT m.amount, m.movement_type, m.description, m.is_insurance, m.created_at, m.performed_by_id, b.user_id '
+        'FROM box_movements m JOIN boxes b ON b.id = m.box_id ORDER BY m.id'
+    ))
+    for amount, movement_type, description, is_insurance, created_at, performed_by_id, user_id in movements:
+        if not amount:
+            continue
+        account_id = ids[(user_id, 'MICROSEGURO' if is_insurance else 'PRINCIPAL')]
+        box_history[account_id] = box_history.get(account_id, 0.0) + amount
+        writer.add(movement_type, description, performed_by_id, None, created_at, [
+            (account_id, amount, movement_type, description),
+            (capital, -amount, movement_type, None),
+        ])
+    transactions = bind.execute(sa.text(
+        'SELECT user_id, credit_id, amount, CAST(transaction_type AS VARCHAR), description, created_at '
+        'FROM cash_transactions WHERE user_id IS NOT NULL ORDER BY id'
+    ))
+    for user_id, credit_id, amount, tx_type, description, created_at in transactions:
+        if not amount:
+            continue
+        tx_type = (tx_type or '').upper()
+        signed = amount if tx_type in ('DEPOSIT', 'PAYMENT') else -amount
+        counter = cartera if tx_type in ('PAYMENT', 'DISBURSEMENT') else capital
+        account_id = ids.get((user_id, 'PRINCIPAL'))
+        if account_id is None:
+            # Usuario con transacciones pero sin caja ni saldo materializado
+            bind.execute(accounts.insert(), [{'user_id': user_id, 'account_type': 'PRINCIPAL', 'balance': 0.0}])
+            account_id = ids[(user_id, 'PRINCIPAL')] = bind.execute(sa.text(
+                "SELECT id FROM ledger_accounts WHERE user_id = :u AND account_type = 'PRINCIPAL'"
+            ), {'u': user_id}).scalar()
+            targets[(user_id, 'PRINCIPAL')] = 0.0
+        cash_history[user_id] = cash_history.get(user_id, 0.0) + signed
+        writer.add(tx_type, description, user_id, credit_id, created_at, [
+            (account_id, signed, tx_type, description),
+            (counter, -signed, tx_type, None),
+        ])
+    writer.flush()
+
+    # Apertura: diferencia entre cada saldo guardado y lo que explica su historial.
+    # Sin fila en cash_balances, el saldo de caja es el de su historial (sin apertura).
+    for (user_id, account_type), box_target in targets.items():
+        account_id = ids[(user_id, account_type)]
+        openings = [(box_target - box_history.get(account_id, 0.0), 'OPENING', 'Saldo inicial')]
+        cash_total = 0.0
+        if account_type == 'PRINCIPAL':
+            cash_total = cash_targets.get(user_id, cash_history.get(user_id, 0.0))
+            openings.append((cash_total - cash_history.get(user_id, 0.0), 'OPENING_CASH', 'Saldo inicial de caja (cash_balances)'))
+        for diff, movement_type, leg_description in openings:
+            if abs(diff) > 1e-9:
+                writer.add('OPENING', 'Saldo inicial (migración al libro mayor)', None, None, None, [
+                    (account_id, diff, movement_type, leg_description),
+                    (capital, -diff, movement_type, None),
+                ])
+        bind.execute(accounts.update().where(accounts.c.id == account_id).values(balance=box_target + cash_total))
+    # Los asientos sin fecha toman la del momento de la migración
+    writer.flush()
+    bind.execute(sa.text('UPDATE ledger_entries SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+    bind.execute(sa.text('UPDATE ledger_postings SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+    if bind.dialect.name == 'postgresql':
+        # Los ids del backfill fueron explícitos: la secuencia sigue desde el último
+        bind.execute(sa.text(
+            "SELECT setval(pg_get_serial_sequence('ledger_entries', 'id'), COALESCE(MAX(id), 1)) FROM ledger_entries"
+        ))
+
+    # Los saldos y el historial viven ahora en el libro mayor
+    op.drop_index('ix_box_movements_box_id_created_at', table_name='box_movements')
+    op.drop_index(op.f('ix_box_movements_id'), table_name='box_movements')
+    op.drop_table('box_movements')
+    op.drop_table('cash_balances')
+    with op.batch_alter_table('boxes') as batch_op:
+        batch_op.drop_column('base_balance')
+        batch_op.drop_column('insurance_balance')
+        batch_op.drop_column('last_updated')
+
+
+def downgrade() -> None:
+    """
+    Restaura saldos e historial de cajas desde el libro mayor y elimina sus tablas.
+
+    La cuenta principal se separa otra vez: cash_balances es el historial de
+    cash_transactions más su apertura (OPENING_CASH) y la base de la caja es el resto.
+    """
+    with op.batch_alter_table('boxes') as batch_op:
+        batch_op.add_column(sa.Column('base_balance', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('insurance_balance', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('last_updated', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True))
+    op.create_table('box_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('box_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('movement_type', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('is_insurance', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.Column('performed_by_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['box_id'], ['boxes.id'], ),
+    sa.ForeignKeyConstraint(['performed_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_box_movements_id'), 'box_movements', ['id'], unique=False)
+    op.create_index('ix_box_movements_box_id_created_at', 'box_movements', ['box_id', 'created_at'], unique=False)
+    op.create_table('cash_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Mismo cálculo que la migración original de cash_balances, más la apertura de caja
+    op.execute(
+        """
+        INSERT INTO cash_balances (user_id, balance, updated_at)
+        SELECT user_id, COALESCE(SUM(amount), 0), CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id,
+                   CASE WHEN CAST(transaction_type AS VARCHAR) IN ('DEPOSIT', 'PAYMENT', 'deposit', 'payment') THEN amount ELSE -amount END AS amount
+            FROM cash_transactions
+            WHERE user_id IS NOT NULL
+            UNION ALL
+            SELECT a.user_id, p.amount
+            FROM ledger_postings p
+            JOIN ledger_accounts a ON a.id = p.account_id
+            WHERE p.movement_type = 'OPENING_CASH' AND a.user_id IS NOT NULL
+        ) cash
+        GROUP BY user_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE boxes SET
+            base_balance = COALESCE((SELECT balance FROM ledger_accounts a
+                                     WHERE a.user_id = boxes.user_id AND a.account_type = 'PRINCIPAL'), 0)
+                           - COALESCE((SELECT balance FROM cash_balances c WHERE c.user_id = boxes.user_id), 0),
+            insurance_balance = COALESCE((SELECT balance FROM ledger_accounts a
+                                          WHERE a.user_id = boxes.user_id AND a.account_type = 'MICROSEGURO'), 0)
+        """
+    )
+    # Historial de la caja: las partidas de sus cuentas, sin la apertura del saldo de caja
+    op.execute(
+        """
+        INSERT INTO box_movements (box_id, amount, movement_type, description, is_insurance, created_at, performed_by_id)
+        SELECT b.id, p.amount, p.movement_type, p.description, a.account_type = 'MICROSEGURO', p.created_at, e.performed_by_id
+        FROM ledger_postings p
+        JOIN ledger_accounts a ON a.id = p.account_id
+        JOIN boxes b ON b.user_id = a.user_id
+        JOIN ledger_entries e ON e.id = p.entry_id
+        WHERE p.movement_type <> 'OPENING_CASH'
+        ORDER BY p.id
+        """
+    )
+
+    op.drop_index('ix_ledger_postings_account_id_created_at', table_name='ledger_postings')
+    op.drop_index(op.f('ix_ledger_postings_entry_id'), table_name='ledger_postings')
+    op.drop_index(op.f('ix_ledger_postings_id'), table_name='ledger_postings')
+    op.drop_table('ledger_postings')
+    op.drop_index(op.f('ix_ledger_entries_id'), table_name='ledger_entries')
+    op.drop_table('ledger_entries')
+    op.drop_index(op.f('ix_ledger_accounts_id'), table_name='ledger_accounts')
+    op.drop_table('ledger_accounts')
+    account_type_enum.drop(op.get_bind(), checkfirst=True)
@@ -4,26 +4,19 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
-from app.core.database import SessionLocal
+from app.core.database import get_db  # única implementación, re-exportada para auth
 from app.core.security import SECRET_KEY, ALGORITHM, TokenData
 from app.models.user import User, RoleType
-from app.crud.user import get_user_by_username
+from app.core.principal import Principal, get_principal
 
 # Importante: usar la ruta absoluta correcta del endpoint de token
 # para que Swagger (/docs) no intente llamar a un path inexistente.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,25 +27,26 @@ async def get_current_user(
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=token_data.username)
+    # Principal desde la caché en memoria; solo consulta `users` si no está o venció
+    user = get_principal(db, token_data.username, user_id=token_data.user_id)
     if user is None:
         raise credentials_exception
     return user
 
 async def get_current_active_user(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)]
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def check_admin_role(
-    current_user: Annotated[User, Depends(get_current_active_user)]
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_active_user)]
+) -> Principal:
     if current_user.role != RoleType.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -61,8 +55,8 @@ def check_admin_role(
     return current_user
 
 def check_admin_or_supervisor_role(
-    current_user: Annotated[User, Depends(get_current_active_user)]
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_active_user)]
+) -> Principal:
     if current_user.role not in [RoleType.ADMIN, RoleType.SUPERVISOR]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
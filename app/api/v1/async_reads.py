@@ -0,0 +1,154 @@
+"""
+Versiones async de las lecturas de mayor tráfico (clientes, créditos, transacciones,
+estadísticas y saldo de caja).
+
+Se montan en las mismas rutas que las versiones sync, antes que ellas, solo cuando
+settings.db_async_enabled es True (ver app/main.py). Usan AsyncSession y no ocupan
+un hilo del threadpool mientras esperan a la base de datos. La autenticación y el
+alcance de visibilidad siguen siendo las dependencias sync (resueltas desde caché).
+"""
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db
+from app.core.dependencies import get_current_user
+from app.core.etag import conditional_list_async, etag_matches, list_etag_async, not_modified, set_etag
+from app.core.streaming import StreamMode, stream_list_async
+from app.core.visibility import VisibilityScope, get_visibility_scope, get_supervisor_collector_ids
+from app.crud import box as crud_box
+from app.crud import stats as crud_stats
+from app.crud.client import clients_select
+from app.crud.credit import credits_select
+from app.crud.transaction import transactions_select
+from app.models.credit import CreditStatus
+from app.models.user import User, RoleType
+from app.schemas.box import Box as BoxSchema
+from app.schemas.client import Client
+from app.schemas.credit import Credit
+from app.schemas.transaction import Transaction
+from app.api.v1.box import box_etag, check_box_access
+from app.api.v1.stats import resolve_stats_user_ids
+
+router = APIRouter()
+
+
+@router.get("/clients/", response_model=List[Client], tags=["clients"])
+async def list_clients(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    collector_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    stream: Optional[StreamMode] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """Lista todos los clientes con filtros opcionales (async)."""
+    stmt = clients_select(skip, limit, collector_id, is_active, collector_ids=scope.collector_ids, after_id=after_id)
+    if stream:
+        etag = await list_etag_async(db, stmt, request.url.query, scope.collector_ids)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return stream_list_async(stmt, Client, stream, etag=etag)
+    return await conditional_list_async(db, response, stmt, if_none_match, request.url.query, scope.collector_ids)
+
+
+@router.get("/credits/", response_model=List[Credit], tags=["credits"])
+async def list_credits(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    client_id: Optional[int] = None,
+    status: Optional[CreditStatus] = None,
+    stream: Optional[StreamMode] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """Lista créditos con visibilidad según rol (async)."""
+    stmt = credits_select(skip, limit, client_id=client_id, collector_ids=scope.collector_ids, status=status)
+    if stream:
+        etag = await list_etag_async(db, stmt, request.url.query, scope.collector_ids)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return stream_list_async(stmt, Credit, stream, etag=etag)
+    return await conditional_list_async(db, response, stmt, if_none_match, request.url.query, scope.collector_ids)
+
+
+@router.get("/transactions/", response_model=List[Transaction], tags=["transactions"])
+async def list_transactions(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    credit_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    stream: Optional[StreamMode] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    stmt = transactions_select(
+        skip, limit, user_ids=scope.collector_ids, credit_id=credit_id, start_date=start_date, end_date=end_date
+    )
+    if stream:
+        etag = await list_etag_async(db, stmt, request.url.query, scope.collector_ids)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return stream_list_async(stmt, Transaction, stream, etag=etag)
+    return await conditional_list_async(db, response, stmt, if_none_match, request.url.query, scope.collector_ids)
+
+
+@router.get("/stats/", tags=["stats"])
+async def get_stats(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    user_id: Optional[int] = Query(None),
+    supervisor_id: Optional[int] = Query(None),
+    group_by: Optional[Literal["day", "collector", "supervisor"]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """Estadísticas filtradas por fecha y permisos de usuario (async)."""
+    supervisor_ids = []
+    if current_user.role == RoleType.ADMIN and supervisor_id and not user_id:
+        supervisor_ids = await db.run_sync(get_supervisor_collector_ids, supervisor_id)
+    target_user_ids = resolve_stats_user_ids(
+        current_user, scope, user_id, supervisor_id,
+        supervisor_scope=lambda sid: supervisor_ids,
+    )
+    return await crud_stats.get_stats_async(
+        db,
+        start_date=start_date,
+        end_date=end_date,
+        user_ids=target_user_ids,
+        group_by=group_by
+    )
+
+
+@router.get("/box/{user_id}", response_model=BoxSchema, tags=["box"])
+async def get_user_box(
+    user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obtiene la caja de un usuario específico con validación de permisos (async)."""
+    target_user = await db.get(User, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
+    box = await crud_box.get_box_by_user_id_async(db, user_id)
+    etag = box_etag(box)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return box
@@ -7,12 +7,14 @@ from sqlalchemy.orm import Session
 from app.api.dependencies import get_db, get_current_user
 from app.core.security import (
     create_access_token,
+    run_in_login_pool,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     Token
 )
 from app.crud.user import authenticate_user, create_user, get_user_by_username
 from app.schemas.user import User, UserCreate
 from app.models.user import User as UserModel
+from app.core.principal import Principal
 
 router = APIRouter()
 
@@ -21,7 +23,8 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    # Consulta + bcrypt son bloqueantes: se ejecutan fuera del event loop
+    user = await run_in_login_pool(authenticate_user, db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,7 +33,7 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user.username, "uid": user.id, "role": user.role},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -42,7 +45,8 @@ def register_user():
 
 @router.get("/me", response_model=User)
 async def get_current_user_info(
-    current_user: Annotated[UserModel, Depends(get_current_user)]
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Session = Depends(get_db)
 ):
     """Obtener información del usuario autenticado actual."""
-    return current_user
+    return db.get(UserModel, current_user.id)
@@ -1,19 +1,49 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.dates import business_date
 from app.core.dependencies import get_current_user
 from app.models.user import User, RoleType
-from app.schemas.box import Box as BoxSchema, BoxMovementCreate, BoxUpdate, CashCount, BoxCloseResponse, BoxMovement
+from app.models.ledger import AccountType
+from app.schemas.box import (
+    Box as BoxSchema, BoxMovementCreate, BoxUpdate, BoxCloseCreate, BoxClose, BoxBalanceAsOf, BoxMovement,
+    TeamCloseRequest, TeamCloseReportItem, TeamCloseResponse,
+)
 from app.crud import box as crud_box
 from app.crud import user as crud_user
+from app.crud import ledger
+from app.core.idempotency import run_idempotent
+from app.core.etag import etag_matches, not_modified, set_etag, weak_etag
 
 router = APIRouter()
 
+
+def box_etag(box) -> str:
+    """ETag de la caja; incluye los saldos porque last_updated puede tener resolución de segundos."""
+    return weak_etag(box.id, box.base_balance, box.insurance_balance, box.last_updated)
+
+
+def check_box_access(current_user: User, user_id: int, target_user: Optional[User]) -> None:
+    """Permisos para ver una caja; target_user solo se necesita (y carga) para supervisores."""
+    if current_user.role == RoleType.ADMIN:
+        return # Admin ve todo
+    if current_user.role == RoleType.SUPERVISOR:
+        # Supervisor ve la suya y la de sus subordinados
+        if not target_user or (target_user.id != current_user.id and target_user.supervisor_id != current_user.id):
+            raise HTTPException(status_code=403, detail="Not authorized to view this box")
+    elif current_user.id != user_id:
+        # Cobrador solo ve la suya
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
 @router.get("/{user_id}", response_model=BoxSchema)
 def get_user_box(
     user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -23,18 +53,12 @@ def get_user_box(
         raise HTTPException(status_code=404, detail="Box not found for this user")
 
     # Permisos
-    if current_user.role == RoleType.ADMIN:
-        pass # Admin ve todo
-    elif current_user.role == RoleType.SUPERVISOR:
-        # Supervisor ve la suya y la de sus subordinados
-        target_user = crud_user.get_user(db, user_id)
-        if target_user.id != current_user.id and target_user.supervisor_id != current_user.id:
-             raise HTTPException(status_code=403, detail="Not authorized to view this box")
-    else:
-        # Cobrador solo ve la suya
-        if current_user.id != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-            
+    target_user = crud_user.get_user(db, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
+    etag = box_etag(target_box)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return target_box
 
 @router.get("/{user_id}/history", response_model=List[BoxMovement])
@@ -51,110 +75,274 @@ def get_box_history(
         raise HTTPException(status_code=404, detail="Box not found for this user")
 
     # Permisos (Misma lógica que ver la caja)
-    if current_user.role == RoleType.ADMIN:
-        pass
-    elif current_user.role == RoleType.SUPERVISOR:
-        target_user = crud_user.get_user(db, user_id)
-        if target_user.id != current_user.id and target_user.supervisor_id != current_user.id:
-             raise HTTPException(status_code=403, detail="Not authorized to view this box")
-    else:
-        if current_user.id != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-            
+    target_user = crud_user.get_user(db, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
     return crud_box.get_box_movements(db, target_box.id, skip, limit)
 
+@router.get("/{user_id}/balance", response_model=BoxBalanceAsOf)
+def get_box_balance_as_of(
+    user_id: int,
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Saldos de la caja al final de un día (por defecto, hoy), a partir del cierre más cercano."""
+    target_user = crud_user.get_user(db, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
+    target_box = crud_box.get_box_by_user_id(db, user_id)
+    if not target_box:
+        raise HTTPException(status_code=404, detail="Box not found for this user")
+
+    as_of = as_of or business_date()
+    balances, close = crud_box.get_balance_as_of(db, target_box, as_of)
+    return BoxBalanceAsOf(
+        user_id=user_id,
+        as_of=as_of,
+        base_balance=balances[AccountType.PRINCIPAL],
+        insurance_balance=balances[AccountType.MICROSEGURO],
+        close_date=close.business_date if close else None,
+    )
+
+@router.get("/{user_id}/closes", response_model=List[BoxClose])
+def get_box_closes(
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Historial de cierres diarios de la caja de un usuario."""
+    target_user = crud_user.get_user(db, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
+    target_box = crud_box.get_box_by_user_id(db, user_id)
+    if not target_box:
+        raise HTTPException(status_code=404, detail="Box not found for this user")
+    return crud_box.get_box_closes(db, target_box.id, skip, limit)
+
+@router.post("/{user_id}/close", response_model=BoxClose, status_code=status.HTTP_201_CREATED)
+def close_box(
+    user_id: int,
+    count: BoxCloseCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cierre del día: arqueo por denominaciones contra el saldo del sistema.
+    Guarda una foto inmutable de los saldos; solo un cierre por caja por día.
+    """
+    target_user = crud_user.get_user(db, user_id) if current_user.role == RoleType.SUPERVISOR else None
+    check_box_access(current_user, user_id, target_user)
+    target_box = crud_box.get_box_by_user_id(db, user_id)
+    if not target_box:
+        raise HTTPException(status_code=404, detail="Box not found for this user")
+
+    try:
+        return crud_box.close_box(
+            db, target_box, count.total_amount,
+            denominations=count.model_dump(exclude={"observations"}),
+            closed_by_id=current_user.id,
+            observations=count.observations,
+        )
+    except crud_box.BoxAlreadyClosedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @router.post("/transfer", status_code=status.HTTP_200_OK)
 def transfer_money(
     movement: BoxMovementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
 ):
     """
     Supervisor transfiere dinero de su base a la base de un cobrador.
     """
-    if current_user.role != RoleType.SUPERVISOR:
-        raise HTTPException(status_code=403, detail="Only supervisors can transfer money")
-    
-    if not movement.target_user_id:
-        raise HTTPException(status_code=400, detail="Target user required for transfer")
+    def _run(commit: bool):
+        if current_user.role != RoleType.SUPERVISOR:
+            raise HTTPException(status_code=403, detail="Only supervisors can transfer money")
 
-    # Validar que el destino sea subordinado
-    target_user = crud_user.get_user(db, movement.target_user_id)
-    if not target_user or target_user.supervisor_id != current_user.id:
-        raise HTTPException(status_code=400, detail="Target user must be your subordinate")
+        if not movement.target_user_id:
+            raise HTTPException(status_code=400, detail="Target user required for transfer")
 
-    sup_box = crud_box.get_box_by_user_id(db, current_user.id)
-    col_box = crud_box.get_box_by_user_id(db, target_user.id)
+        # Validar que el destino sea subordinado
+        target_user = crud_user.get_user(db, movement.target_user_id)
+        if not target_user or target_user.supervisor_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Target user must be your subordinate")
 
-    if not sup_box or not col_box:
-        raise HTTPException(status_code=404, detail="Box not found")
+        sup_box = crud_box.get_box_by_user_id(db, current_user.id)
+        col_box = crud_box.get_box_by_user_id(db, target_user.id)
 
-    if sup_box.base_balance < movement.amount:
-        raise HTTPException(status_code=400, detail="Insufficient funds in supervisor base")
+        if not sup_box or not col_box:
+            raise HTTPException(status_code=404, detail="Box not found")
 
-    # Ejecutar transferencia
-    # 1. Restar de Supervisor
-    crud_box.update_box_balance(db, sup_box, -movement.amount)
-    crud_box.create_movement(db, sup_box.id, -movement.amount, "TRANSFER_OUT", current_user.id, f"Transfer to {target_user.username}")
+        # Ejecutar transferencia: resta al supervisor y suma al cobrador en un solo commit
+        try:
+            ledger.move(
+                db, sup_box.id, col_box.id, movement.amount, "TRANSFER",
+                performed_by_id=current_user.id,
+                from_description=f"Transfer to {target_user.username}",
+                to_description=f"Transfer from {current_user.username}",
+                commit=commit,
+            )
+        except ledger.InsufficientFundsError:
+            raise HTTPException(status_code=400, detail="Insufficient funds in supervisor base")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # 2. Sumar a Cobrador
-    crud_box.update_box_balance(db, col_box, movement.amount)
-    crud_box.create_movement(db, col_box.id, movement.amount, "TRANSFER_IN", current_user.id, f"Transfer from {current_user.username}")
+        return {"message": "Transfer successful"}
 
-    return {"message": "Transfer successful"}
+    # Con Idempotency-Key, un reintento no repite la transferencia
+    return run_idempotent(
+        db, current_user.id, idempotency_key, "POST /box/transfer", movement.model_dump(mode="json"), _run,
+    )
 
 @router.post("/expense", status_code=status.HTTP_200_OK)
 def record_expense(
     movement: BoxMovementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
 ):
     """Cobrador registra un gasto (reduce su base)."""
-    # Cobradores y supervisores pueden registrar gastos
-    user_box = crud_box.get_box_by_user_id(db, current_user.id)
-    if not user_box:
-        raise HTTPException(status_code=404, detail="Box not found")
+    def _run(commit: bool):
+        # Cobradores y supervisores pueden registrar gastos
+        user_box = crud_box.get_box_by_user_id(db, current_user.id)
+        if not user_box:
+            raise HTTPException(status_code=404, detail="Box not found")
 
-    crud_box.update_box_balance(db, user_box, -movement.amount)
-    crud_box.create_movement(db, user_box.id, -movement.amount, "EXPENSE", current_user.id, movement.description)
-    
-    return {"message": "Expense recorded"}
+        try:
+            ledger.move(
+                db, user_box.id, None, movement.amount, "EXPENSE",
+                performed_by_id=current_user.id,
+                from_description=movement.description,
+                commit=commit,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return {"message": "Expense recorded"}
+
+    # Con Idempotency-Key, un reintento no repite el gasto
+    return run_idempotent(
+        db, current_user.id, idempotency_key, "POST /box/expense", movement.model_dump(mode="json"), _run,
+    )
 
 @router.post("/withdraw", status_code=status.HTTP_200_OK)
 def withdraw_money(
     movement: BoxMovementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
 ):
     """
     Supervisor retira dinero de la caja del cobrador (ej. cierre del día).
     El dinero sale de la caja del cobrador y vuelve a la del supervisor.
     """
-    if current_user.role != RoleType.SUPERVISOR:
-        raise HTTPException(status_code=403, detail="Only supervisors can withdraw money")
+    def _run(commit: bool):
+        if current_user.role != RoleType.SUPERVISOR:
+            raise HTTPException(status_code=403, detail="Only supervisors can withdraw money")
 
-    if not movement.target_user_id:
-        raise HTTPException(status_code=400, detail="Target user required")
+        if not movement.target_user_id:
+            raise HTTPException(status_code=400, detail="Target user required")
 
-    target_user = crud_user.get_user(db, movement.target_user_id)
-    if not target_user or target_user.supervisor_id != current_user.id:
-        raise HTTPException(status_code=400, detail="Target user must be your subordinate")
+        target_user = crud_user.get_user(db, movement.target_user_id)
+        if not target_user or target_user.supervisor_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Target user must be your subordinate")
 
-    col_box = crud_box.get_box_by_user_id(db, target_user.id)
-    sup_box = crud_box.get_box_by_user_id(db, current_user.id)
+        col_box = crud_box.get_box_by_user_id(db, target_user.id)
+        sup_box = crud_box.get_box_by_user_id(db, current_user.id)
 
-    if not col_box:
-        raise HTTPException(status_code=404, detail="Collector box not found")
+        if not col_box:
+            raise HTTPException(status_code=404, detail="Collector box not found")
 
-    # 1. Restar de Cobrador
-    crud_box.update_box_balance(db, col_box, -movement.amount)
-    crud_box.create_movement(db, col_box.id, -movement.amount, "WITHDRAWAL", current_user.id, f"Withdrawal by {current_user.username}")
+        # Resta al cobrador y suma al supervisor (recuperación de base) en un solo commit
+        try:
+            ledger.move(
+                db, col_box.id, sup_box.id, movement.amount, "WITHDRAWAL",
+                performed_by_id=current_user.id,
+                from_description=f"Withdrawal by {current_user.username}",
+                to_description=f"Recovery from {target_user.username}",
+                commit=commit,
+            )
+        except ledger.InsufficientFundsError:
+            raise HTTPException(status_code=400, detail="Insufficient funds in collector box")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # 2. Sumar a Supervisor (Recuperación de base)
-    crud_box.update_box_balance(db, sup_box, movement.amount)
-    crud_box.create_movement(db, sup_box.id, movement.amount, "RECOVERY", current_user.id, f"Recovery from {target_user.username}")
+        return {"message": "Withdrawal successful"}
 
-    return {"message": "Withdrawal successful"}
+    # Con Idempotency-Key, un reintento no repite el retiro
+    return run_idempotent(
+        db, current_user.id, idempotency_key, "POST /box/withdraw", movement.model_dump(mode="json"), _run,
+    )
+
+@router.post("/close-team", response_model=TeamCloseResponse)
+def close_team(
+    request: TeamCloseRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
+):
+    """
+    Supervisor cierra el día de todo su equipo en una sola llamada: arqueo de cada cobrador,
+    retiro del saldo a su caja y cierre diario, todo en una transacción.
+    Devuelve el sobrante/faltante por cobrador.
+    """
+    def _run(commit: bool):
+        if current_user.role != RoleType.SUPERVISOR:
+            raise HTTPException(status_code=403, detail="Only supervisors can close team boxes")
+
+        user_ids = [item.user_id for item in request.closes]
+        if len(set(user_ids)) != len(user_ids):
+            raise HTTPException(status_code=400, detail="Duplicate user in team close")
+        # Todos deben ser subordinados (una sola consulta)
+        subordinates = {
+            u.id: u for u in db.query(User).filter(User.id.in_(user_ids), User.supervisor_id == current_user.id)
+        }
+        if len(subordinates) != len(user_ids):
+            raise HTTPException(status_code=400, detail="Target user must be your subordinate")
+
+        counts = {
+            item.user_id: {
+                "counted_balance": item.total_amount,
+                "denominations": item.model_dump(exclude={"user_id", "observations"}),
+                "observations": item.observations,
+            }
+            for item in request.closes
+        }
+        try:
+            results = crud_box.close_team(db, current_user.id, counts, withdraw=request.withdraw, commit=commit)
+        except crud_box.BoxAlreadyClosedError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ledger.InsufficientFundsError:
+            # Un movimiento entró entre la lectura de saldos y el retiro: no se guardó nada
+            raise HTTPException(status_code=409, detail="Box balance changed during close, retry")
+
+        report = [
+            TeamCloseReportItem(
+                close_id=close.id,
+                user_id=close.user_id,
+                username=subordinates[close.user_id].username,
+                system_balance=close.system_balance,
+                counted_balance=close.counted_balance,
+                difference=close.difference,
+                status=close.status,
+                withdrawn=withdrawn,
+            )
+            for close, withdrawn in results
+        ]
+        return TeamCloseResponse(
+            business_date=results[0][0].business_date,
+            closes=report,
+            total_system=sum(r.system_balance for r in report),
+            total_counted=sum(r.counted_balance for r in report),
+            total_difference=round(sum(r.difference for r in report), 2),
+            total_withdrawn=sum(r.withdrawn for r in report),
+        )
+
+    # Con Idempotency-Key, un reintento no repite retiros ni cierres
+    return run_idempotent(
+        db, current_user.id, idempotency_key, "POST /box/close-team", request.model_dump(mode="json"), _run,
+    )
 
 @router.put("/{user_id}", response_model=BoxSchema)
 def admin_update_box(
@@ -168,14 +356,14 @@ def admin_update_box(
         raise HTTPException(status_code=403, detail="Only admin can manually edit boxes")
     
     box = crud_box.get_box_by_user_id(db, user_id)
-    # Aquí implementarías la lógica de actualización directa si es necesario
-    # Por seguridad, es mejor hacerlo vía movimientos, pero si se pide edición directa:
-    if box_update.base_balance is not None:
-        box.base_balance = box_update.base_balance
-    if box_update.insurance_balance is not None:
-        box.insurance_balance = box_update.insurance_balance
-    
+    # La edición directa se registra como asiento de ajuste: el historial explica el nuevo saldo
+    targets = {
+        AccountType.PRINCIPAL: box_update.base_balance,
+        AccountType.MICROSEGURO: box_update.insurance_balance,
+    }
+    for account_type, target in targets.items():
+        if target is not None:
+            ledger.adjust_balance(db, user_id, account_type, target, performed_by_id=current_user.id, commit=False)
     db.commit()
     db.refresh(box)
     return box
-
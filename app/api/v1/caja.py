@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.models.caja import Caja, CajaTipo, CajaMovimiento, MovimientoTipo, TopePrestamo
+from app.models.caja import TopePrestamo
 from app.models.user import User, RoleType
 from app.models.client import Client
 from app.crud.caja import *
@@ -43,8 +43,10 @@ def registrar_retiro_api(caja_id: int, monto: float, usuario_id: int, destino_su
 
 @router.post("/caja/cierre")
 def registrar_cierre_caja_api(caja_id: int, usuario_id: int, saldo_final: float, observaciones: str = None, db: Session = Depends(get_db)):
-    registrar_cierre_caja(db, caja_id, usuario_id, saldo_final, observaciones)
-    return {"msg": "Cierre de caja registrado"}
+    cierre = registrar_cierre_caja(db, caja_id, usuario_id, saldo_final, observaciones)
+    if not cierre:
+        raise HTTPException(status_code=400, detail="Caja no encontrada o ya cerrada hoy")
+    return {"msg": "Cierre de caja registrado", "estado": cierre.status, "diferencia": cierre.difference}
 
 @router.post("/caja/volado")
 def marcar_cliente_volado_api(cliente_id: int, monto_bloqueado: float, usuario_id: int, observaciones: str = None, db: Session = Depends(get_db)):
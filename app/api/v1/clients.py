@@ -1,10 +1,15 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
-from app.core.cloudinary import upload_client_photo
+from app.core.cloudinary import upload_client_photo, enqueue_client_photo
+from app.core.config import settings
+from app.core.etag import conditional_list, etag_matches, list_etag, not_modified, set_etag, weak_etag
+from app.core.streaming import StreamMode, stream_list
+from app.core.visibility import VisibilityScope, get_visibility_scope
 from app.models.user import User, RoleType
 from app.models.client import Client as ClientModel
 from app.schemas.client import Client, ClientCreate, ClientUpdate
@@ -17,7 +22,7 @@ router = APIRouter()
 def count_clients(
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
     """Devuelve la cantidad total de clientes visibles para el usuario."""
     query = db.query(ClientModel)
@@ -25,92 +30,50 @@ def count_clients(
     if is_active is not None:
         query = query.filter(ClientModel.is_active == is_active)
 
-    # Admin: ve todo
-    if current_user.role == RoleType.ADMIN:
-        return {"total": query.count()}
-    
-    # Supervisor: ve clientes de sus cobradores + asignados + propios
-    elif current_user.role == RoleType.SUPERVISOR:
-        subordinate_ids = crud_client.get_subordinate_collector_ids(db, current_user.id)
-        
-        # Agregar IDs de usuarios asignados por nombre en assigned_routes
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                subordinate_ids.extend([u.id for u in extra_users])
-                
-        allowed_ids = subordinate_ids + [current_user.id]
-        
-        count = query.filter(ClientModel.collector_id.in_(allowed_ids)).count()
-        return {"total": count}
-    
-    # Cobrador: solo sus propios clientes
-    else:
-        count = query.filter(ClientModel.collector_id == current_user.id).count()
-        return {"total": count}
+    # Admin: ve todo. Supervisor: sus cobradores + asignados + propios. Cobrador: solo los suyos
+    if not scope.is_admin:
+        query = query.filter(ClientModel.collector_id.in_(scope.collector_ids))
+    return {"total": query.count()}
 
 
 @router.get("/", response_model=List[Client])
 def list_clients(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     collector_id: Optional[int] = None,
     is_active: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    stream: Optional[StreamMode] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
-    """Lista todos los clientes con filtros opcionales."""
-    # Admin: ve todo
-    if current_user.role == RoleType.ADMIN:
-        return crud_client.get_clients(
-            db,
-            skip=skip,
-            limit=limit,
-            collector_id=collector_id,
-            is_active=is_active
-        )
-    
-    # Supervisor: ve clientes de sus cobradores + sus propios clientes
-    elif current_user.role == RoleType.SUPERVISOR:
-        subordinate_ids = crud_client.get_subordinate_collector_ids(db, current_user.id)
-        # Incluye al supervisor mismo (puede tener clientes propios)
-        
-        # Agregar IDs de usuarios asignados por nombre en assigned_routes
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                subordinate_ids.extend([u.id for u in extra_users])
-                
-        allowed_ids = subordinate_ids + [current_user.id]
-        
-        clients = crud_client.get_clients(
-            db,
-            skip=0,  # Filtramos después
-            limit=10000,  # Traemos todo para filtrar
-            is_active=is_active
-        )
-        # Filtrar solo clientes de cobradores permitidos
-        filtered = [c for c in clients if c.collector_id in allowed_ids]
-        return filtered[skip:skip+limit]
-    
-    # Cobrador: solo sus propios clientes
-    else:
-        return crud_client.get_clients(
-            db,
-            skip=skip,
-            limit=limit,
-            collector_id=current_user.id,
-            is_active=is_active
-        )
+    """Lista todos los clientes con filtros opcionales.
+
+    Acepta `after_id` (id del último cliente recibido) para paginación keyset.
+    Responde 304 si If-None-Match coincide con el ETag de la página.
+    Con `stream=ndjson|json` la página se envía por lotes en vez de armarse en memoria.
+    """
+    # Admin: ve todo. Resto: el filtro por cobradores permitidos se aplica en SQL
+    stmt = crud_client.clients_select(
+        skip, limit, collector_id, is_active, collector_ids=scope.collector_ids, after_id=after_id
+    )
+    if stream:
+        etag = list_etag(db, stmt, request.url.query, scope.collector_ids)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return stream_list(db, stmt, Client, stream, etag=etag)
+    return conditional_list(db, response, stmt, if_none_match, request.url.query, scope.collector_ids)
 
 
 @router.post("/", response_model=Client, status_code=status.HTTP_201_CREATED)
 def create_new_client(
     client: ClientCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
     """Crea un nuevo cliente. Acceso para Admin, Supervisor y Cobrador."""
     
@@ -120,17 +83,8 @@ def create_new_client(
     elif current_user.role == RoleType.SUPERVISOR:
         if not client.collector_id:
             raise HTTPException(status_code=400, detail="Debe asignar un cobrador")
-        # Validar que el cobrador sea subordinado
-        subordinate_ids = crud_client.get_subordinate_collector_ids(db, current_user.id)
-        
-        # Agregar IDs de usuarios asignados por nombre
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                subordinate_ids.extend([u.id for u in extra_users])
-
-        if client.collector_id != current_user.id and client.collector_id not in subordinate_ids:
+        # Validar que el cobrador sea subordinado, asignado o el propio supervisor
+        if not scope.can_see(client.collector_id):
             raise HTTPException(status_code=400, detail="El cobrador no pertenece a su equipo")
     elif current_user.role == RoleType.ADMIN:
         if not client.collector_id:
@@ -150,10 +104,22 @@ def create_new_client(
 @router.get("/{client_id}", response_model=Client)
 def read_client(
     client_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
-    """Obtiene un cliente por ID."""
+    """Obtiene un cliente por ID (304 si If-None-Match coincide con el ETag)."""
+    db_client = get_visible_client(db, client_id, scope)
+    etag = weak_etag(db_client.id, db_client.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return db_client
+
+
+def get_visible_client(db: Session, client_id: int, scope: VisibilityScope) -> ClientModel:
+    """Carga el cliente validando que exista (404) y que el usuario pueda verlo (403)."""
     db_client = crud_client.get_client(db, client_id)
     if not db_client:
         raise HTTPException(
@@ -161,38 +127,13 @@ def read_client(
             detail="Client not found"
         )
     
-    # Admin: acceso total
-    if current_user.role == RoleType.ADMIN:
-        return db_client
-    
-    # Supervisor: ve clientes de sus cobradores + propios
-    elif current_user.role == RoleType.SUPERVISOR:
-        subordinate_ids = crud_client.get_subordinate_collector_ids(db, current_user.id)
-        
-        # Agregar IDs de usuarios asignados por nombre
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                subordinate_ids.extend([u.id for u in extra_users])
-                
-        allowed_ids = subordinate_ids + [current_user.id]
-        
-        if db_client.collector_id not in allowed_ids:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
-        return db_client
-    
-    # Cobrador: solo sus propios clientes
-    else:
-        if db_client.collector_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
-        return db_client
+    # Admin: acceso total. Supervisor: sus cobradores + propios. Cobrador: solo los suyos
+    if not scope.can_see(db_client.collector_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return db_client
 
 
 @router.put("/{client_id}", response_model=Client)
@@ -200,11 +141,12 @@ def update_existing_client(
     client_id: int,
     client: ClientUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
     """Actualiza un cliente. Requiere rol supervisor o admin."""
-    # Reutilizamos la lógica de read_client para verificar permisos de acceso primero
-    db_client = read_client(client_id=client_id, db=db, current_user=current_user)
+    # Verificamos existencia y permisos de acceso primero (misma lógica que read_client)
+    db_client = get_visible_client(db, client_id, scope)
 
     # Solo Admin y Supervisor pueden actualizar
     if current_user.role not in [RoleType.ADMIN, RoleType.SUPERVISOR]:
@@ -226,11 +168,12 @@ def update_existing_client(
 def remove_client(
     client_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
     """Desactiva un cliente (soft delete). Requiere rol supervisor o admin."""
-    # Reutilizamos la lógica de read_client para verificar permisos de acceso primero
-    db_client = read_client(client_id=client_id, db=db, current_user=current_user)
+    # Verificamos existencia y permisos de acceso primero (misma lógica que read_client)
+    db_client = get_visible_client(db, client_id, scope)
 
     # Solo Admin puede eliminar (Supervisor solo puede editar)
     if current_user.role != RoleType.ADMIN:
@@ -259,12 +202,13 @@ async def upload_house_photo(
     Upload house photo for a client.
     
     - Requires authentication (cobrador can upload for their clients, admin/supervisor for any)
-    - Max size: 5MB
+    - Max size: 5MB (settings.photo_max_bytes)
     - Allowed formats: JPEG, PNG, WEBP
-    - Returns the photo URL
+    - The photo is downsized and a thumbnail is generated before storage
+    - Returns both URLs (or status "pending" when uploads run in background)
     """
-    # Verificar que el cliente existe
-    db_client = crud_client.get_client(db, client_id)
+    # Verificar que el cliente existe (la sesión es síncrona: fuera del event loop)
+    db_client = await run_in_threadpool(crud_client.get_client, db, client_id)
     if not db_client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -278,18 +222,26 @@ async def upload_house_photo(
             detail="You can only upload photos for your own clients"
         )
     
-    # Upload to Cloudinary
-    photo_url = await upload_client_photo(file, client_id)
+    # Background mode: the client record is updated when the upload finishes
+    if settings.photo_upload_background:
+        await enqueue_client_photo(file, client_id)
+        return {
+            "client_id": client_id,
+            "photo_url": None,
+            "thumb_url": None,
+            "status": "pending",
+            "message": "Photo upload queued"
+        }
+
+    # Upload off the event loop (worker pool)
+    urls = await upload_client_photo(file, client_id)
     
-    # Update client record with photo URL
-    crud_client.update_client(
-        db,
-        client_id,
-        ClientUpdate(house_photo_url=photo_url)
-    )
+    # Update client record with photo URLs
+    await run_in_threadpool(crud_client.update_client, db, client_id, ClientUpdate(**urls))
     
     return {
         "client_id": client_id,
-        "photo_url": photo_url,
+        "photo_url": urls["house_photo_url"],
+        "thumb_url": urls["house_photo_thumb_url"],
         "message": "Photo uploaded successfully"
     }
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.export import ENCODERS, MEDIA_TYPES, available_formats
+from app.core.visibility import VisibilityScope, get_visibility_scope
+from app.crud.export import EXPORT_MODELS, export_select, iter_export_rows
+from app.models.credit import CreditStatus
+
+router = APIRouter()
+
+EXPORT_BATCH_SIZE = 1000
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: Literal["clients", "credits", "transactions"],
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    collector_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    client_id: Optional[int] = None,
+    status: Optional[CreditStatus] = None,
+    credit_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """
+    Exporta todas las filas visibles de clientes, créditos o transacciones en CSV
+    (o Parquet/Arrow si pyarrow está instalado), en streaming y por lotes.
+    Aplica el mismo alcance y los mismos filtros que los listados.
+    """
+    if format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"Formato {format} no disponible en este servidor (requiere pyarrow)")
+    stmt = export_select(
+        entity, scope.collector_ids,
+        collector_id=collector_id, is_active=is_active, client_id=client_id, status=status,
+        credit_id=credit_id, start_date=start_date, end_date=end_date,
+    )
+    columns = list(EXPORT_MODELS[entity].__table__.columns)
+    # La sesión del request se cierra antes de enviar la respuesta: el stream usa una propia
+    bind = db.get_bind()
+
+    def _stream():
+        with Session(bind=bind) as session:
+            yield from ENCODERS[format](columns, iter_export_rows(session, stmt, EXPORT_BATCH_SIZE))
+
+    return StreamingResponse(
+        _stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'},
+    )
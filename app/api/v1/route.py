@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.visibility import VisibilityScope, get_visibility_scope
+from app.crud import route as crud_route
+from app.core.dates import business_date
+from app.schemas.route import RouteStop, RouteToday
+
+router = APIRouter()
+
+
+@router.get("/today", response_model=RouteToday)
+def route_today(
+    collector_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """
+    Hoja de ruta del día: créditos activos con cuotas que vencen hoy o atrasadas, con los
+    datos del cliente, lo esperado, el atraso y el último pago, en el orden de la ruta.
+
+    Reemplaza descargar clientes y créditos completos para armar la ruta en el dispositivo.
+    Supervisores y admin pueden filtrar por `collector_id` dentro de su alcance.
+    """
+    collector_ids = scope.collector_ids
+    if collector_id is not None:
+        if not scope.can_see(collector_id):
+            raise HTTPException(status_code=403, detail="Not enough permissions for this collector")
+        collector_ids = [collector_id]
+
+    day = business_date()
+    stops = [RouteStop.model_validate(row) for row in crud_route.get_route(db, day, collector_ids)]
+    return RouteToday(
+        date=day,
+        stops=stops,
+        total_expected=round(sum(s.expected_amount for s in stops), 2),
+        total_arrears=round(sum(s.arrears_amount for s in stops), 2),
+    )
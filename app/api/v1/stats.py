@@ -1,28 +1,26 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import date
-from typing import Optional
+from typing import Callable, List, Literal, Optional
 
-from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.database import get_db, get_pool_stats
+from app.core.metrics import registry as metrics_registry
+from app.core.dependencies import get_current_user, get_current_active_admin
 from app.models.user import User, RoleType
 from app.crud import stats as crud_stats
-from app.crud import client as crud_client
+from app.core.visibility import VisibilityScope, get_visibility_scope, get_supervisor_collector_ids
 
 router = APIRouter()
 
-@router.get("/", tags=["stats"])
-def get_stats(
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    user_id: Optional[int] = Query(None),
-    supervisor_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Devuelve estadísticas reales filtradas por fecha y permisos de usuario.
-    """
+
+def resolve_stats_user_ids(
+    current_user: User,
+    scope: VisibilityScope,
+    user_id: Optional[int],
+    supervisor_id: Optional[int],
+    supervisor_scope: Callable[[int], List[int]],
+) -> Optional[List[int]]:
+    """IDs de usuarios a incluir según el rol (None = todos). Compartido por la versión async."""
     target_user_ids = None
 
     # 1. Definir el alcance (Scope) según el rol
@@ -32,13 +30,12 @@ def get_stats(
             target_user_ids = [user_id]
         elif supervisor_id:
             # Si admin filtra por supervisor, calculamos el alcance de ese supervisor
-            subordinates = crud_client.get_subordinate_collector_ids(db, supervisor_id)
+            subordinates = supervisor_scope(supervisor_id)
             target_user_ids = subordinates + [supervisor_id]
     
     elif current_user.role == RoleType.SUPERVISOR:
-        # Supervisor ve: Subordinados + Él mismo
-        subordinates = crud_client.get_subordinate_collector_ids(db, current_user.id)
-        allowed_ids = subordinates + [current_user.id]
+        # Supervisor ve: Subordinados + asignados + Él mismo
+        allowed_ids = scope.collector_ids
         
         # Si pide un usuario específico, validar que esté en su lista permitida
         if user_id:
@@ -52,9 +49,56 @@ def get_stats(
         # Cobrador solo se ve a sí mismo
         target_user_ids = [current_user.id]
 
+    return target_user_ids
+
+
+@router.get("/", tags=["stats"])
+def get_stats(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    user_id: Optional[int] = Query(None),
+    supervisor_id: Optional[int] = Query(None),
+    group_by: Optional[Literal["day", "collector", "supervisor"]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """
+    Devuelve estadísticas reales filtradas por fecha y permisos de usuario.
+
+    Con `group_by` (day | collector | supervisor) incluye además un desglose
+    (`breakdown`) calculado en la misma petición.
+    """
+    target_user_ids = resolve_stats_user_ids(
+        current_user, scope, user_id, supervisor_id,
+        supervisor_scope=lambda sid: get_supervisor_collector_ids(db, sid),
+    )
+
     return crud_stats.get_stats(
         db=db,
         start_date=start_date,
         end_date=end_date,
-        user_ids=target_user_ids
+        user_ids=target_user_ids,
+        group_by=group_by
     )
+
+@router.get("/db-pool", tags=["stats"])
+def get_db_pool_stats(
+    current_user: User = Depends(get_current_active_admin)
+):
+    """
+    Estado del pool de conexiones y métricas de espera (solo admin).
+    Si `timeouts` o `wait_seconds_max` crecen, el pool es chico para los workers.
+    """
+    return get_pool_stats()
+
+
+@router.get("/slow-queries", tags=["stats"])
+def get_slow_queries(
+    current_user: User = Depends(get_current_active_admin)
+):
+    """
+    Últimas consultas que superaron settings.metrics_slow_query_ms (solo admin).
+    El SQL se guarda sin parámetros ni literales.
+    """
+    return metrics_registry.slow_queries()
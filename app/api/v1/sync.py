@@ -0,0 +1,32 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.visibility import VisibilityScope, get_visibility_scope
+from app.crud import sync as crud_sync
+from app.schemas.sync import SyncResponse
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la sincronización anterior"),
+    db: Session = Depends(get_db),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """
+    Sincronización incremental para la app de cobro sin conexión.
+
+    Devuelve solo lo cambiado desde `since` dentro del alcance del usuario, más las
+    bajas en `deleted` (aplicarlas antes que los upserts). Sin `since` devuelve la
+    cartera completa. Guardar `cursor` y enviarlo en la próxima llamada.
+    """
+    since_at = None
+    if since:
+        try:
+            since_at = crud_sync.decode_cursor(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return crud_sync.get_changes(db, scope.collector_ids, since_at)
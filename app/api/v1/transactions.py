@@ -1,96 +1,116 @@
 from typing import List, Optional
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, get_current_active_admin
+from app.core.dependencies import get_current_user
 from app.models.user import User, RoleType
-from app.schemas.transaction import Transaction, TransactionCreate
-from app.crud.transaction import get_transaction, get_transactions, create_transaction
+from app.models.cash_transaction import TransactionType
+from app.schemas.transaction import Transaction, TransactionCreate, TransactionBatchCreate, TransactionBatchResult
+from app.crud.transaction import get_transaction, transactions_select, create_transaction, create_transactions_batch
 from app.crud.credit import get_credit as crud_get_credit
-from app.crud.client import get_subordinate_collector_ids
+from app.core.visibility import VisibilityScope, get_visibility_scope
+from app.core.idempotency import run_idempotent
+from app.core.etag import conditional_list, etag_matches, list_etag, not_modified, set_etag, weak_etag
+from app.core.streaming import StreamMode, stream_list
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Transaction])
 def list_transactions(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     credit_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    stream: Optional[StreamMode] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
-    if current_user.role == RoleType.ADMIN:
-        return get_transactions(db, skip=skip, limit=limit, credit_id=credit_id, start_date=start_date, end_date=end_date)
-    elif current_user.role == RoleType.SUPERVISOR:
-        allowed_ids = get_subordinate_collector_ids(db, current_user.id) + [current_user.id]
-        # Agregar IDs por nombre de usuario en assigned_routes
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                allowed_ids.extend([u.id for u in extra_users])
-        return get_transactions(db, skip=skip, limit=limit, credit_id=credit_id, user_ids=allowed_ids, start_date=start_date, end_date=end_date)
-    else:
-        return get_transactions(db, skip=skip, limit=limit, credit_id=credit_id, user_ids=[current_user.id], start_date=start_date, end_date=end_date)
+    stmt = transactions_select(
+        skip, limit, user_ids=scope.collector_ids, credit_id=credit_id, start_date=start_date, end_date=end_date
+    )
+    if stream:
+        etag = list_etag(db, stmt, request.url.query, scope.collector_ids)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return stream_list(db, stmt, Transaction, stream, etag=etag)
+    return conditional_list(db, response, stmt, if_none_match, request.url.query, scope.collector_ids)
 
 @router.post("/", response_model=Transaction, status_code=status.HTTP_201_CREATED)
 def create_new_transaction(
     tx: TransactionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_admin)
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
 ):
-    # Permisos: cualquier autenticado puede crear, pero si es collector solo dentro de su scope
-    # Para supervisor, dentro de sus cobradores y él mismo
-    if tx.credit_id is not None:
-        credit = crud_get_credit(db, tx.credit_id)
-        if not credit:
-            raise HTTPException(status_code=404, detail="Credit not found")
-        credit_collector_id = credit.client.collector_id if credit.client else None
-        if current_user.role == RoleType.COLLECTOR:
-            if credit_collector_id != current_user.id:
-                raise HTTPException(status_code=403, detail="Not enough permissions for this credit")
-        elif current_user.role == RoleType.SUPERVISOR:
-            allowed_ids = get_subordinate_collector_ids(db, current_user.id) + [current_user.id]
-            # Agregar IDs por nombre de usuario
-            if getattr(current_user, "assigned_routes", None):
-                assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-                if assigned_names:
-                    extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                    allowed_ids.extend([u.id for u in extra_users])
-            if credit_collector_id not in allowed_ids:
+    # Permisos: mismas reglas que el lote. Cualquier autenticado puede registrar pagos
+    # dentro de su scope; solo un admin registra depósitos, retiros y desembolsos.
+    if current_user.role != RoleType.ADMIN and tx.transaction_type != TransactionType.PAYMENT:
+        raise HTTPException(status_code=403, detail=f"Only admins can register {tx.transaction_type.value} transactions")
+
+    def _create(commit: bool):
+        if tx.credit_id is not None:
+            credit = crud_get_credit(db, tx.credit_id, with_client=True)
+            if not credit:
+                raise HTTPException(status_code=404, detail="Credit not found")
+            credit_collector_id = credit.client.collector_id if credit.client else None
+            if not scope.can_see(credit_collector_id):
                 raise HTTPException(status_code=403, detail="Not enough permissions for this credit")
-    try:
-        return create_transaction(db, user_id=current_user.id, tx=tx)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        try:
+            return create_transaction(db, user_id=current_user.id, tx=tx, commit=commit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Con Idempotency-Key, un reintento devuelve la transacción ya creada
+    return run_idempotent(
+        db, current_user.id, idempotency_key, "POST /transactions", tx.model_dump(mode="json"),
+        _create, response_model=Transaction, status_code=status.HTTP_201_CREATED,
+    )
+
+@router.post("/batch", response_model=TransactionBatchResult)
+def create_transactions_in_batch(
+    batch: TransactionBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    scope: VisibilityScope = Depends(get_visibility_scope)
+):
+    """
+    Sincronización de fin de ruta: registra muchos pagos en un solo viaje.
+    Cada ítem lleva un client_ref único; reenviar el lote no duplica pagos.
+    Igual que en el alta individual, solo un admin puede registrar movimientos que no son pagos.
+    """
+    results = create_transactions_batch(
+        db, user_id=current_user.id, items=batch.items, collector_ids=scope.collector_ids,
+        payments_only=current_user.role != RoleType.ADMIN,
+    )
+    return {
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+        "results": results,
+    }
 
 @router.get("/{tx_id}", response_model=Transaction)
 def read_transaction(
     tx_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: VisibilityScope = Depends(get_visibility_scope)
 ):
     t = get_transaction(db, tx_id)
     if not t:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    if current_user.role == RoleType.ADMIN:
-        return t
-    if current_user.role == RoleType.SUPERVISOR:
-        allowed_ids = get_subordinate_collector_ids(db, current_user.id) + [current_user.id]
-        # Agregar IDs por nombre de usuario
-        if getattr(current_user, "assigned_routes", None):
-            assigned_names = [name.strip() for name in current_user.assigned_routes.split(',') if name.strip()]
-            if assigned_names:
-                extra_users = db.query(User.id).filter(User.username.in_(assigned_names)).all()
-                allowed_ids.extend([u.id for u in extra_users])
-        if t.user_id not in allowed_ids:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-        return t
-    # collector
-    if t.user_id != current_user.id:
+    if not scope.can_see(t.user_id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
+    etag = weak_etag(t.id, t.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return t
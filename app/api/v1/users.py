@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, get_current_active_admin, get_current_active_supervisor
+from app.core.dependencies import get_current_user, get_current_user_model, get_current_active_admin, get_current_active_supervisor
 from app.models.user import User, RoleType
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
 from app.crud import user as crud_user
@@ -30,7 +30,7 @@ def delete_user(
 
 
 @router.get("/me", response_model=UserSchema)
-def read_user_me(current_user: User = Depends(get_current_user)):
+def read_user_me(current_user: User = Depends(get_current_user_model)):
     """Obtiene el perfil del usuario autenticado actual."""
     return current_user
 
@@ -61,7 +61,7 @@ def list_users(
     
     # Cobrador: solo se ve a sí mismo
     else:
-        return [current_user]
+        return [crud_user.get_user(db, current_user.id)]
 
 
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
@@ -139,7 +139,7 @@ def change_own_password(
     current_password: str,
     new_password: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_model)
 ):
     """Permite al usuario autenticado cambiar su propia contraseña."""
     # Restricción: Los cobradores no pueden cambiar su contraseña
@@ -1,11 +1,29 @@
 """
 Cloudinary configuration and utilities for image upload.
+
+Uploads never block the event loop: the request body is read in chunks (with the
+size limit enforced while reading) into a spooled temp file, and processing
+(downscale + thumbnail, see app.core.images) and upload run in a bounded worker pool. With settings.photo_upload_background the request
+returns immediately and the client record is updated when the upload finishes.
 """
+import asyncio
+import io
+import logging
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict
+
 import cloudinary
-import cloudinary.uploader
 from fastapi import UploadFile, HTTPException
 
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.images import process_photo
+from app.core.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
 # Configure Cloudinary
 cloudinary.config(
     cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
@@ -14,51 +32,114 @@ cloudinary.config(
     secure=True
 )
 
-async def upload_client_photo(file: UploadFile, client_id: int) -> str:
+ALLOWED_TYPES = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
+CHUNK_SIZE = 64 * 1024
+
+# Worker pool for blocking uploads (a slow upload only holds one of these threads)
+_upload_executor = ThreadPoolExecutor(max_workers=settings.photo_upload_workers, thread_name_prefix="photo-upload")
+
+
+async def read_upload_capped(file: UploadFile, max_bytes: int) -> BinaryIO:
+    """
+    Read an upload in chunks into a spooled temp file, enforcing max_bytes while reading.
+
+    Raises:
+        HTTPException: If the file type is invalid or the size limit is exceeded
+    """
+    if file.content_type not in ALLOWED_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_TYPES)}"
+        )
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size must be less than {max_bytes // (1024 * 1024)}MB"
+            )
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def _store_photo(fileobj: BinaryIO, client_id: int) -> Dict[str, str]:
+    """Process and upload both variants to the configured storage (runs in the worker pool)."""
+    try:
+        photo = process_photo(fileobj)
+    finally:
+        fileobj.close()
+    storage = get_storage()
+    return {
+        "house_photo_url": storage.save(io.BytesIO(photo.full), client_id, "house_photo"),
+        "house_photo_thumb_url": storage.save(io.BytesIO(photo.thumbnail), client_id, "house_photo_thumb"),
+    }
+
+
+def process_photo_upload(fileobj: BinaryIO, client_id: int, session_factory: Callable = SessionLocal) -> Dict[str, str]:
     """
-    Upload a client house photo to Cloudinary.
+    Background job: upload the photo and save its URLs on the client record.
+    Opens its own DB session because it outlives the request.
+    """
+    # Imported here to avoid a circular import (crud -> core)
+    from app.crud import client as crud_client
+    from app.schemas.client import ClientUpdate
+
+    urls = _store_photo(fileobj, client_id)
+    db = session_factory()
+    try:
+        crud_client.update_client(db, client_id, ClientUpdate(**urls))
+    finally:
+        db.close()
+    return urls
+
+
+async def upload_client_photo(file: UploadFile, client_id: int) -> Dict[str, str]:
+    """
+    Upload a client house photo (full size + thumbnail) to the configured storage.
     
     Args:
         file: The uploaded file from FastAPI
         client_id: The client ID for folder organization
         
     Returns:
-        The secure URL of the uploaded image
+        The URLs of both variants: house_photo_url and house_photo_thumb_url
         
     Raises:
         HTTPException: If upload fails or file type is invalid
     """
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
-        )
-    
-    # Validate file size (max 5MB)
-    file_content = await file.read()
-    if len(file_content) > 5 * 1024 * 1024:  # 5MB in bytes
-        raise HTTPException(status_code=400, detail="File size must be less than 5MB")
-    
+    fileobj = await read_upload_capped(file, settings.photo_max_bytes)
+    loop = asyncio.get_running_loop()
     try:
-        # Upload to Cloudinary with folder organization
-        result = cloudinary.uploader.upload(
-            file_content,
-            folder=f"trebolsoft/clients/{client_id}",
-            public_id=f"house_photo",
-            overwrite=True,
-            resource_type="image",
-            transformation=[
-                {"width": 1200, "height": 1200, "crop": "limit"},
-                {"quality": "auto:good"}
-            ]
-        )
-        
-        return result["secure_url"]
-    
-    except Exception as e:
+        return await loop.run_in_executor(_upload_executor, _store_photo, fileobj, client_id)
+    except HTTPException:
+        raise
+    except Exception:
+        # El detalle del proveedor de almacenamiento queda en el log, no en la respuesta
+        logger.exception("Photo upload for client %s failed", client_id)
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to upload image: {str(e)}"
+            detail="Failed to upload image"
         )
+
+
+async def enqueue_client_photo(file: UploadFile, client_id: int) -> None:
+    """
+    Read and validate the upload, then queue it; the client record is updated
+    when the upload finishes. Errors in the background job are logged.
+    """
+    fileobj = await read_upload_capped(file, settings.photo_max_bytes)
+    future = _upload_executor.submit(process_photo_upload, fileobj, client_id)
+
+    def _log_failure(f):
+        if f.exception() is not None:
+            logger.error("Photo upload for client %s failed: %s", client_id, f.exception())
+
+    future.add_done_callback(_log_failure)
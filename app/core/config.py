@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,11 +15,60 @@ class Settings(BaseSettings):
     
     # Base de datos
     database_url: str
+    # Pool de conexiones: dimensionar según workers x hilos (ver /api/v1/stats/db-pool)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0  # 0 = sin límite (solo Postgres)
+    db_expire_on_commit: bool = True
+    # SQLite (desarrollo/tests)
+    db_sqlite_wal: bool = True
+    db_sqlite_synchronous: str = "NORMAL"
+    db_sqlite_busy_timeout_seconds: int = 30
+    # Capa async (asyncpg/aiosqlite) para las lecturas de mayor tráfico
+    db_async_enabled: bool = False
+    async_database_url: Optional[str] = None  # por defecto, database_url con driver async
     
     # Seguridad / JWT
     secret_key: str = "change-me-in-production"
     algorithm: str = "HS256"
     access_token_expires_minutes: int = 30
+    # Costo de bcrypt; al cambiarlo, los hashes se actualizan en el siguiente login
+    bcrypt_rounds: int = 12
+    # Logins verificados en paralelo (pool acotado, fuera del event loop)
+    login_max_concurrency: int = 4
+
+    # Visibilidad (caché de cobradores visibles por supervisor)
+    visibility_cache_ttl_seconds: int = 30
+
+    # Caché de usuarios autenticados (evita cargar el usuario en cada request)
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_entries: int = 2048
+
+    # Idempotency-Key (tiempo que se guarda la respuesta de cada operación de dinero)
+    idempotency_ttl_hours: int = 24
+
+    # Sincronización incremental (GET /sync)
+    sync_overlap_seconds: int = 30  # margen para no perder escrituras confirmadas tarde
+    sync_history_days: int = 30  # historial de transacciones/movimientos en la sincronización completa
+    sync_tombstone_retention_days: int = 90  # cursores más viejos fuerzan sincronización completa
+
+    # Cierre diario de caja: el día hábil se cuenta en la zona horaria del negocio
+    business_timezone: str = "America/Bogota"
+    box_close_tolerance: float = 0.0  # diferencia contada vs sistema que se acepta como MATCH
+
+    # Métricas por endpoint (/metrics) y presupuestos por request. Desactivadas por defecto;
+    # /metrics solo responde con metrics_token definido ("Authorization: Bearer <token>")
+    metrics_enabled: bool = False
+    metrics_token: Optional[str] = None
+    metrics_slow_query_ms: int = 200
+    metrics_slow_query_samples: int = 50
+    metrics_sql_budget: int = 25
+    metrics_latency_budget_ms: int = 1000
+    # Presupuestos por ruta, ej: {"GET /api/v1/credits/": {"sql": 2, "ms": 200}}
+    metrics_route_budgets: Dict[str, Dict[str, float]] = {}
     
     # CORS - acepta string separado por comas o lista JSON
     cors_allowed_origins: Union[List[str], str] = "https://trebolsoft.com,https://app.trebolsoft.com,https://api.trebolsoft.com,http://localhost:8000,http://localhost:3000"
@@ -28,6 +77,18 @@ class Settings(BaseSettings):
     cloudinary_cloud_name: str = ""
     cloudinary_api_key: str = ""
     cloudinary_api_secret: str = ""
+
+    # Fotos de clientes: backend "cloudinary" o "local" (disco, para desarrollo y tests)
+    photo_storage_backend: str = "cloudinary"
+    photo_local_dir: str = "./media"
+    photo_local_base_url: str = "/media"
+    photo_max_bytes: int = 5 * 1024 * 1024
+    photo_max_dimension: int = 1200
+    photo_thumb_dimension: int = 240
+    photo_jpeg_quality: int = 80
+    photo_upload_workers: int = 4
+    # Si es True, la subida se encola y el cliente se actualiza al terminar
+    photo_upload_background: bool = False
     
     @field_validator('cors_allowed_origins', mode='before')
     @classmethod
@@ -1,14 +1,202 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
 
+
+class PoolMetrics:
+    """Contadores del pool de conexiones (checkouts, espera por conexión, timeouts)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada request por una conexión."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_metrics.record("timeouts")
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if settings.db_sqlite_wal:
+        # WAL: lecturas concurrentes mientras otra conexión escribe
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.db_sqlite_synchronous}")
+    cursor.close()
+
+
+def create_db_engine(database_url: Optional[str] = None, **overrides) -> Engine:
+    """
+    Crea el engine a partir de settings (pool, pre-ping, recycle, statement timeout,
+    pragmas de SQLite). `overrides` se pasa tal cual a create_engine (scripts/tests).
+    """
+    url = make_url(database_url or settings.database_url)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    connect_args = {}
+
+    if url.get_backend_name() == "sqlite":
+        connect_args["timeout"] = settings.db_sqlite_busy_timeout_seconds
+        in_memory = url.database in (None, "", ":memory:")
+        if not in_memory:
+            options.update(
+                poolclass=MeteredQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+            )
+    else:
+        options.update(
+            poolclass=MeteredQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+        if settings.db_statement_timeout_ms and url.get_backend_name() == "postgresql":
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    options["connect_args"] = {**connect_args, **overrides.pop("connect_args", {})}
+    options.update(overrides)
+    new_engine = create_engine(url, **options)
+
+    if url.get_backend_name() == "sqlite":
+        event.listen(new_engine, "connect", _sqlite_pragmas)
+    event.listen(new_engine, "connect", lambda *args: pool_metrics.record("connects"))
+    event.listen(new_engine, "checkin", lambda *args: pool_metrics.record("checkins"))
+    return new_engine
+
+
+def get_pool_stats(bind: Optional[Engine] = None) -> dict:
+    """Estado actual del pool más los contadores acumulados, para dimensionarlo según los workers."""
+    pool = (bind or engine).pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.db_max_overflow,
+        })
+    stats.update(pool_metrics.snapshot())
+    return stats
+
+
+# Drivers async equivalentes a los sync (asyncpg / aiosqlite)
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def get_async_database_url(database_url: Optional[str] = None) -> URL:
+    """URL async: settings.async_database_url o la URL sync con el driver async equivalente."""
+    if settings.async_database_url and not database_url:
+        return make_url(settings.async_database_url)
+    url = make_url(database_url or settings.database_url)
+    return url.set(drivername=_ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def create_async_db_engine(database_url: Optional[str] = None, **overrides) -> AsyncEngine:
+    """Versión async de create_db_engine (mismas opciones de pool y timeouts)."""
+    url = get_async_database_url(database_url)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    connect_args = {}
+
+    if url.get_backend_name() == "sqlite":
+        connect_args["timeout"] = settings.db_sqlite_busy_timeout_seconds
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+        if settings.db_statement_timeout_ms and url.get_backend_name() == "postgresql":
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+
+    options["connect_args"] = {**connect_args, **overrides.pop("connect_args", {})}
+    options.update(overrides)
+    new_engine = create_async_engine(url, **options)
+    if url.get_backend_name() == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _sqlite_pragmas)
+    return new_engine
+
+
 # Crear el engine de SQLAlchemy
-engine = create_engine(settings.database_url)
+engine = create_db_engine()
 
 # Crear la clase de sesión
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=settings.db_expire_on_commit,
+    bind=engine,
+)
+
+
+# Engine/sesiones async: se crean recién al primer uso (solo con settings.db_async_enabled)
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: en async no hay lazy loads implícitos al serializar
+        _async_session_factory = async_sessionmaker(
+            create_async_db_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
 
 
 # Base para los modelos
@@ -24,4 +212,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency para obtener una sesión async (routers de lectura async)."""
+    async with get_async_sessionmaker()() as db:
+        yield db
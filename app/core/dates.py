@@ -0,0 +1,23 @@
+"""
+Días hábiles en la zona horaria del negocio (settings.business_timezone).
+
+Los cierres de caja, la hoja de ruta y el cronograma de cuotas cuentan el día con
+estas funciones, así todos cortan a la misma hora.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+
+
+def business_date(moment: Optional[datetime] = None) -> date:
+    """Día hábil de un instante en la zona horaria del negocio (por defecto, ahora)."""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(ZoneInfo(settings.business_timezone)).date()
+
+
+def business_day_end(day: date) -> datetime:
+    """Fin del día hábil como instante UTC (inicio del día siguiente)."""
+    next_day = datetime.combine(day + timedelta(days=1), time.min, tzinfo=ZoneInfo(settings.business_timezone))
+    return next_day.astimezone(timezone.utc)
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.database import get_db
-from app.crud.user import get_user_by_username
+from app.core.principal import Principal, get_principal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
@@ -14,9 +14,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
     Obtiene el usuario actual desde el token JWT.
+    Devuelve un Principal (id, username, role, supervisor_id, is_active) desde la caché;
+    solo consulta `users` si el principal no está en caché o venció.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,7 +34,8 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=username)
+    # Los tokens nuevos traen el id ("uid") para cargar por PK en caso de fallo de caché
+    user = get_principal(db, username, user_id=payload.get("uid"))
     if user is None:
         raise credentials_exception
     
@@ -45,9 +48,26 @@ def get_current_user(
     return user
 
 
-def get_current_active_admin(
-    current_user: User = Depends(get_current_user)
+def get_current_user_model(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ) -> User:
+    """
+    Usuario actual como modelo ORM completo (perfil, cambio de contraseña).
+    """
+    user = db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+def get_current_active_admin(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Verifica que el usuario actual sea administrador.
     """
@@ -60,8 +80,8 @@ def get_current_active_admin(
 
 
 def get_current_active_supervisor(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Verifica que el usuario actual sea supervisor o admin.
     """
@@ -0,0 +1,101 @@
+"""
+ETags débiles y GET condicional para los listados y detalles que consultan los celulares.
+
+El ETag de un listado se calcula con una consulta agregada sobre la misma página que
+se devolvería (cantidad de filas, máximo updated_at y suma de ids), más los parámetros
+del request y el alcance del usuario. Si coincide con If-None-Match se responde 304
+sin cargar ni serializar las filas. Sin If-None-Match la página se carga igual, así que
+el ETag se calcula sobre las filas cargadas y la consulta agregada no se ejecuta.
+"""
+import hashlib
+from typing import Any, Optional, Sequence, Union
+
+from fastapi import Response
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# Respuestas por usuario: ningún caché compartido debe reutilizarlas y el cliente debe revalidar
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def weak_etag(*parts: Any) -> str:
+    """ETag débil (W/"...") a partir de cualquier combinación de valores con repr estable."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil contra el header If-None-Match (lista separada por comas o "*")."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers.update(CACHE_HEADERS)
+
+
+def version_select(stmt: Select) -> Select:
+    """(filas, máx. updated_at, suma de ids) de la página que devolvería `stmt`."""
+    page = stmt.subquery()
+    return select(func.count(), func.max(page.c.updated_at), func.coalesce(func.sum(page.c.id), 0)).select_from(page)
+
+
+def list_etag(db: Session, stmt: Optional[Select], *parts: Any) -> str:
+    """ETag de un listado; `stmt` None (alcance vacío) equivale a una página vacía."""
+    version = tuple(db.execute(version_select(stmt)).one()) if stmt is not None else (0, None, 0)
+    return weak_etag(version, *parts)
+
+
+async def list_etag_async(db: AsyncSession, stmt: Optional[Select], *parts: Any) -> str:
+    """Igual que list_etag, sobre una AsyncSession."""
+    version = tuple((await db.execute(version_select(stmt))).one()) if stmt is not None else (0, None, 0)
+    return weak_etag(version, *parts)
+
+
+def rows_version(rows: Sequence[Any]) -> tuple:
+    """Misma versión que version_select, calculada sobre las filas ya cargadas."""
+    updated = [row.updated_at for row in rows if row.updated_at is not None]
+    return (len(rows), max(updated, default=None), sum(row.id for row in rows))
+
+
+def conditional_list(
+    db: Session, response: Response, stmt: Optional[Select], if_none_match: Optional[str], *parts: Any
+) -> Union[list, Response]:
+    """
+    Ejecuta el listado `stmt` con GET condicional: 304 si If-None-Match coincide.
+
+    Solo consulta la versión agregada cuando el cliente manda If-None-Match; si no, carga
+    la página (una consulta) y calcula el ETag sobre sus filas.
+    """
+    etag = None
+    if if_none_match:
+        etag = list_etag(db, stmt, *parts)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    rows = list(db.scalars(stmt).all()) if stmt is not None else []
+    set_etag(response, etag or weak_etag(rows_version(rows), *parts))
+    return rows
+
+
+async def conditional_list_async(
+    db: AsyncSession, response: Response, stmt: Optional[Select], if_none_match: Optional[str], *parts: Any
+) -> Union[list, Response]:
+    """Igual que conditional_list, sobre una AsyncSession."""
+    etag = None
+    if if_none_match:
+        etag = await list_etag_async(db, stmt, *parts)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    rows = list((await db.scalars(stmt)).all()) if stmt is not None else []
+    set_etag(response, etag or weak_etag(rows_version(rows), *parts))
+    return rows
@@ -0,0 +1,134 @@
+"""
+Codificadores de exportación por lotes: CSV siempre; Parquet y Arrow (IPC stream)
+si pyarrow está instalado. Cada lote de filas se convierte en bytes y se entrega
+enseguida, así la memoria depende del tamaño del lote y no del total exportado.
+"""
+import csv
+import enum
+import io
+from datetime import date, datetime
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, Float, Integer
+
+try:  # Dependencia opcional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pq = None
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def available_formats() -> List[str]:
+    return ["csv", "parquet", "arrow"] if pa is not None else ["csv"]
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns: List[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for batch in batches:
+        writer.writerows([_csv_value(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_type(column: Column):
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _arrow_value(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _arrow_schema(columns: List[Column]):
+    return pa.schema([pa.field(column.name, _arrow_type(column)) for column in columns])
+
+
+def _record_batch(schema, batch: List[tuple]):
+    arrays = [
+        pa.array([_arrow_value(row[i]) for row in batch], type=field.type)
+        for i, field in enumerate(schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura que acumula bytes hasta que se retiran con take()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_parquet(columns: List[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Un row group por lote; el pie del archivo se escribe al final."""
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def iter_arrow(columns: List[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {"csv": iter_csv, "parquet": iter_parquet, "arrow": iter_arrow}
@@ -0,0 +1,62 @@
+"""
+Soporte de Idempotency-Key para endpoints que mueven dinero.
+
+Los reintentos desde redes móviles inestables repetían transacciones, créditos y
+movimientos de caja. Con el header Idempotency-Key, la primera ejecución guarda su
+respuesta y los reintentos la reciben tal cual (una búsqueda indexada) sin tocar las cajas.
+"""
+import json
+from typing import Any, Callable, Optional, Type
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.crud import idempotency as crud_idempotency
+
+
+def run_idempotent(
+    db: Session,
+    user_id: int,
+    key: Optional[str],
+    endpoint: str,
+    payload: Any,
+    handler: Callable[[bool], Any],
+    response_model: Optional[Type[BaseModel]] = None,
+    status_code: int = 200,
+) -> Any:
+    """
+    Ejecuta `handler(commit)` una sola vez por (usuario, key).
+
+    Sin key se comporta como una llamada normal: handler(commit=True). Con key se llama
+    con commit=False y la reserva, la operación y la respuesta guardada se confirman en un
+    único commit, así que nunca queda una clave confirmada sin respuesta. Si algo falla,
+    no se confirma nada y la clave queda libre para reintentar.
+    """
+    if not key:
+        return handler(commit=True)
+
+    req_hash = crud_idempotency.request_hash(endpoint, payload)
+    try:
+        record = crud_idempotency.reserve_key(db, user_id, key, req_hash)
+    except crud_idempotency.IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if record.status_code is not None:
+        return JSONResponse(
+            status_code=record.status_code,
+            content=json.loads(record.response_body),
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        result = handler(commit=False)
+        body = jsonable_encoder(response_model.model_validate(result) if response_model else result)
+        crud_idempotency.save_response(db, user_id, key, req_hash, status_code, body)
+        db.commit()
+    except Exception:
+        crud_idempotency.release_key(db, user_id, key)
+        raise
+    return result
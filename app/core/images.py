@@ -0,0 +1,52 @@
+"""
+Server-side image pipeline for client photos.
+
+Decodes the upload, applies the EXIF orientation and drops all metadata (GPS,
+camera), downsizes to settings.photo_max_dimension and produces a thumbnail of
+settings.photo_thumb_dimension. Both variants are re-encoded as JPEG. This is
+CPU-bound work: callers run it in the upload worker pool, not on the event loop.
+"""
+import io
+from typing import BinaryIO, NamedTuple
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+# Guard against decompression bombs (a small file that decodes to a huge bitmap)
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+class ProcessedPhoto(NamedTuple):
+    full: bytes
+    thumbnail: bytes
+
+
+def _encode_jpeg(image: Image.Image, max_dimension: int) -> bytes:
+    variant = image.copy()
+    variant.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    out = io.BytesIO()
+    # No exif= argument: the saved file carries no metadata
+    variant.save(out, format="JPEG", quality=settings.photo_jpeg_quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def process_photo(fileobj: BinaryIO) -> ProcessedPhoto:
+    """
+    Decode, normalize and downsize a photo into its full and thumbnail variants.
+
+    Raises:
+        HTTPException: If the file is not a decodable image
+    """
+    try:
+        with Image.open(fileobj) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            return ProcessedPhoto(
+                full=_encode_jpeg(image, settings.photo_max_dimension),
+                thumbnail=_encode_jpeg(image, settings.photo_thumb_dimension),
+            )
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
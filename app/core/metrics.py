@@ -0,0 +1,250 @@
+"""
+Métricas por endpoint: latencia, sentencias SQL, tiempo en SQL y tamaño de respuesta.
+
+`MetricsMiddleware` abre un contexto por request; los eventos del engine
+(`before/after_cursor_execute`, registrados una vez sobre la clase Engine, así
+cubren también el engine async) suman cada sentencia a ese contexto. Al terminar,
+el request se acumula en el registro (expuesto en formato Prometheus en /metrics),
+se escribe una línea de log JSON y se avisa si supera su presupuesto de SQL o latencia.
+
+Las consultas lentas se guardan como muestras sin parámetros: solo el SQL con sus
+placeholders y con los literales reemplazados por "?".
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites de los buckets del histograma de latencia, en segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def redact_sql(statement: str) -> str:
+    """Reemplaza literales de texto y números por "?" y compacta los espacios."""
+    return " ".join(_LITERALS.sub("?", statement).split())
+
+
+@dataclass
+class RequestStats:
+    """Acumulado de un request en curso (lo completan los eventos del engine)."""
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class _RouteSeries:
+    __slots__ = ("buckets", "count", "seconds", "sql_count", "sql_seconds", "response_bytes", "statuses", "slow_queries", "over_budget")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.slow_queries = 0
+        self.over_budget = 0
+
+
+class MetricsRegistry:
+    """Series por (método, ruta) más las últimas muestras de consultas lentas."""
+
+    def __init__(self, max_samples: int = 50):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _RouteSeries] = defaultdict(_RouteSeries)
+        self._slow_samples: deque = deque(maxlen=max_samples)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._slow_samples.clear()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats, response_bytes: int, over_budget: bool) -> None:
+        with self._lock:
+            series = self._series[(method, route)]
+            series.count += 1
+            series.seconds += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series.buckets[i] += 1
+            series.sql_count += stats.sql_count
+            series.sql_seconds += stats.sql_seconds
+            series.response_bytes += response_bytes
+            series.statuses[status] += 1
+            if over_budget:
+                series.over_budget += 1
+
+    def record_slow_query(self, method: Optional[str], route: Optional[str], statement: str, seconds: float) -> None:
+        sample = {
+            "method": method,
+            "route": route,
+            "duration_ms": round(seconds * 1000, 2),
+            "statement": redact_sql(statement),
+            "at": time.time(),
+        }
+        with self._lock:
+            self._slow_samples.append(sample)
+            if route is not None:
+                self._series[(method, route)].slow_queries += 1
+        logger.warning(json.dumps({"event": "slow_query", **sample}))
+
+    def slow_queries(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._slow_samples))
+
+    def render_prometheus(self) -> str:
+        """Texto en formato de exposición de Prometheus (version 0.0.4)."""
+        lines = [
+            "# HELP http_request_duration_seconds Latencia de los requests por ruta.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for (method, route), s in series:
+                labels = f'method="{method}",route="{route}"'
+                for bound, bucket in zip(LATENCY_BUCKETS, s.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {bucket}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {s.seconds:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {s.count}")
+            counters = [
+                ("http_requests_total", "Requests por ruta y código de estado.", None),
+                ("http_sql_statements_total", "Sentencias SQL ejecutadas por ruta.", "sql_count"),
+                ("http_sql_duration_seconds_total", "Tiempo total en SQL por ruta.", "sql_seconds"),
+                ("http_response_bytes_total", "Bytes de respuesta por ruta.", "response_bytes"),
+                ("http_slow_queries_total", "Consultas más lentas que el umbral por ruta.", "slow_queries"),
+                ("http_budget_exceeded_total", "Requests que superaron su presupuesto de SQL o latencia.", "over_budget"),
+            ]
+            for name, help_text, attr in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, route), s in series:
+                    labels = f'method="{method}",route="{route}"'
+                    if attr is None:
+                        for status, count in sorted(s.statuses.items()):
+                            lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+                    else:
+                        value = getattr(s, attr)
+                        lines.append(f"{name}{{{labels}}} {value:.6f}" if isinstance(value, float) else f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(max_samples=settings.metrics_slow_query_samples)
+
+
+def get_budget(method: str, route: str) -> Tuple[int, float]:
+    """(máx. sentencias SQL, máx. ms) para la ruta; settings.metrics_route_budgets pisa los valores por defecto."""
+    budget = settings.metrics_route_budgets.get(f"{method} {route}", {})
+    return (
+        int(budget.get("sql", settings.metrics_sql_budget)),
+        float(budget.get("ms", settings.metrics_latency_budget_ms)),
+    )
+
+
+# --- Eventos del engine ---------------------------------------------------
+
+_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def route_template(scope: dict) -> str:
+    """Plantilla de ruta ("/api/v1/credits/{credit_id}") para no crear una serie por id."""
+    return getattr(scope.get("route"), "path_format", None) or "unmatched"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+    if elapsed * 1000 >= settings.metrics_slow_query_ms:
+        scope = _scope.get()
+        if scope is None:
+            registry.record_slow_query(None, None, statement, elapsed)
+        else:
+            registry.record_slow_query(scope["method"], route_template(scope), statement, elapsed)
+
+
+# --- Middleware -----------------------------------------------------------
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada request HTTP y lo registra por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        stats_token = _current.set(stats)
+        scope_token = _scope.set(scope)
+        response = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(stats_token)
+            _scope.reset(scope_token)
+            self._record(scope, response["status"], elapsed, stats, response["bytes"])
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, stats: RequestStats, response_bytes: int) -> None:
+        method = scope["method"]
+        route = route_template(scope)
+        sql_budget, ms_budget = get_budget(method, route)
+        over_budget = stats.sql_count > sql_budget or elapsed * 1000 > ms_budget
+        registry.observe(method, route, status, elapsed, stats, response_bytes, over_budget)
+
+        record = {
+            "event": "request",
+            "method": method,
+            "route": route,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "sql_count": stats.sql_count,
+            "sql_ms": round(stats.sql_seconds * 1000, 2),
+            "response_bytes": response_bytes,
+        }
+        if over_budget:
+            record["budget"] = {"sql": sql_budget, "ms": ms_budget}
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
@@ -0,0 +1,100 @@
+"""
+Caché en memoria de usuarios autenticados (principals).
+
+Validar el token ya no carga el `User` completo en cada request: se guarda un
+principal liviano (id, username, rol, supervisor, activo) en una caché LRU con TTL,
+indexada por el `sub` del token. La caché se invalida cuando un usuario cambia de
+rol, estado, supervisor o username, o se elimina. Con varios workers cada proceso
+tiene su propia caché; el TTL acota cuánto puede tardar en verse un cambio.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User, RoleType
+
+_cache_lock = threading.Lock()
+_principal_cache: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+
+
+class Principal:
+    """Usuario autenticado, sin sesión de base de datos asociada.
+
+    Expone los atributos que usan los permisos (id, username, role, supervisor_id,
+    is_active). Para el perfil completo usar `get_current_user_model`.
+    """
+
+    __slots__ = ("id", "username", "role", "supervisor_id", "is_active")
+
+    def __init__(self, id: int, username: str, role: RoleType, supervisor_id: Optional[int], is_active: bool):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.supervisor_id = supervisor_id
+        self.is_active = is_active
+
+    def __repr__(self):
+        return f"<Principal {self.username}>"
+
+
+def load_principal(db: Session, username: str, user_id: Optional[int] = None) -> Optional[Principal]:
+    """Carga solo las columnas del principal (por PK si el token trae el id)."""
+    query = db.query(User.id, User.username, User.role, User.supervisor_id, User.is_active)
+    if user_id is not None:
+        row = query.filter(User.id == user_id).first()
+        if row is not None and row.username != username:
+            return None
+    else:
+        row = query.filter(User.username == username).first()
+    if row is None:
+        return None
+    return Principal(row.id, row.username, row.role, row.supervisor_id, bool(row.is_active))
+
+
+def get_principal(db: Session, username: str, user_id: Optional[int] = None) -> Optional[Principal]:
+    """Principal del `sub` del token, desde la caché o (si no está o venció) desde la base."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _principal_cache.get(username)
+        if entry and entry[0] > now:
+            _principal_cache.move_to_end(username)
+            return entry[1]
+
+    principal = load_principal(db, username, user_id)
+    if principal is None:
+        return None
+    with _cache_lock:
+        _principal_cache[username] = (now + settings.principal_cache_ttl_seconds, principal)
+        _principal_cache.move_to_end(username)
+        while len(_principal_cache) > settings.principal_cache_max_entries:
+            _principal_cache.popitem(last=False)
+    return principal
+
+
+def invalidate_principal(username: Optional[str] = None) -> None:
+    """Invalida el principal de un usuario, o toda la caché si no se indica usuario."""
+    with _cache_lock:
+        if username is None:
+            _principal_cache.clear()
+        else:
+            _principal_cache.pop(username, None)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    invalidate_principal(target.username)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[attr].history.has_changes() for attr in ("username", "role", "supervisor_id", "is_active")):
+        return
+    for username in {*(state.attrs.username.history.deleted or ()), target.username}:
+        if username is not None:
+            invalidate_principal(username)
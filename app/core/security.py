@@ -1,5 +1,9 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Any, Callable, Optional
 from jose import jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
@@ -12,7 +16,18 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expires_minutes
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Costo fijo: un hash con otro costo se considera desactualizado (rehash en el login)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+# bcrypt tarda ~200 ms por verificación; se corre en un pool acotado para no bloquear
+# el event loop ni dejar que un pico de logins acapare todos los hilos del servidor.
+_login_executor = ThreadPoolExecutor(max_workers=settings.login_max_concurrency, thread_name_prefix="login")
 
 
 class Token(BaseModel):
@@ -22,6 +37,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
     role: Optional[str] = None
 
 
@@ -32,6 +48,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash se generó con otro costo/esquema que el configurado."""
+    return pwd_context.needs_update(hashed_password)
+
+
+async def run_in_login_pool(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Ejecuta una función bloqueante (verificación de login) en el pool acotado de bcrypt."""
+    loop = asyncio.get_running_loop()
+    # Copia el contexto (contextvars) del request al hilo del pool, como hace run_in_threadpool
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_login_executor, partial(context.run, func, *args, **kwargs))
+
+
 def get_password_hash(password: str) -> str:
     # Pre-hash con SHA256 si el password es muy largo para bcrypt (>72 bytes)
     if len(password.encode('utf-8')) > 72:
@@ -0,0 +1,61 @@
+"""
+Storage backends for client photos.
+
+- "cloudinary": production backend (Cloudinary CDN).
+- "local": writes files under settings.photo_local_dir and serves them from
+  settings.photo_local_base_url. Used in development and tests.
+
+Images arrive already processed (JPEG, downsized) from app.core.images.
+
+Backends are synchronous (blocking I/O); callers run them off the event loop.
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO
+
+import cloudinary
+import cloudinary.uploader
+
+from app.core.config import settings
+
+
+class CloudinaryStorage:
+    """Uploads images to Cloudinary, organized by client folder."""
+
+    def save(self, fileobj: BinaryIO, client_id: int, name: str = "house_photo") -> str:
+        result = cloudinary.uploader.upload(
+            fileobj,
+            folder=f"trebolsoft/clients/{client_id}",
+            public_id=name,
+            overwrite=True,
+            resource_type="image",
+            # Already downsized and re-encoded by app.core.images
+        )
+        return result["secure_url"]
+
+
+class LocalDiskStorage:
+    """Stand-in backend that stores images on local disk."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, fileobj: BinaryIO, client_id: int, name: str = "house_photo") -> str:
+        folder = self.root / "clients" / str(client_id)
+        folder.mkdir(parents=True, exist_ok=True)
+        target = folder / f"{name}.jpg"
+        # Write to a temp file and rename, so readers never see a partial image
+        tmp = target.with_suffix(".part")
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        os.replace(tmp, target)
+        return f"{self.base_url}/clients/{client_id}/{target.name}"
+
+
+def get_storage():
+    """Returns the configured photo storage backend."""
+    if settings.photo_storage_backend == "local":
+        return LocalDiskStorage(settings.photo_local_dir, settings.photo_local_base_url)
+    return CloudinaryStorage()
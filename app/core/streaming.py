@@ -0,0 +1,95 @@
+"""
+Respuestas de listados en streaming (opt-in con `?stream=ndjson` o `?stream=json`).
+
+En vez de cargar la página completa y validar la lista entera con response_model,
+se recorre la consulta con un cursor del lado del servidor (yield_per) y cada fila se
+serializa con un TypeAdapter precompilado del esquema; cada lote se envía apenas está
+listo. La memoria queda acotada por el lote y el primer byte sale con el primer lote.
+"""
+from typing import AsyncIterator, Dict, Iterator, Literal, Optional, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.core.etag import CACHE_HEADERS
+
+StreamMode = Literal["ndjson", "json"]
+
+STREAM_BATCH_SIZE = 500
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+
+def get_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter del esquema, compilado una sola vez por proceso."""
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+
+def _encode_batch(adapter: TypeAdapter, rows, mode: StreamMode, first: bool) -> bytes:
+    items = [adapter.dump_json(adapter.validate_python(row, from_attributes=True)) for row in rows]
+    if mode == "ndjson":
+        return b"".join(item + b"\n" for item in items)
+    body = b",".join(items)
+    return body if first else b"," + body
+
+
+def _iter_json(adapter: TypeAdapter, partitions, mode: StreamMode) -> Iterator[bytes]:
+    if mode == "json":
+        yield b"["
+    first = True
+    for rows in partitions:
+        if rows:
+            yield _encode_batch(adapter, rows, mode, first)
+            first = False
+    if mode == "json":
+        yield b"]"
+
+
+def _headers(etag: Optional[str]) -> Optional[dict]:
+    return {"ETag": etag, **CACHE_HEADERS} if etag else None
+
+
+def stream_list(db: Session, stmt: Select, schema: Type[BaseModel], mode: StreamMode, etag: Optional[str] = None) -> StreamingResponse:
+    """StreamingResponse con las filas de `stmt` (ORM) serializadas con `schema`."""
+    adapter = get_adapter(schema)
+    # La sesión del request se cierra antes de enviar la respuesta: el stream usa una propia
+    bind = db.get_bind()
+
+    def _stream():
+        if stmt is None:
+            yield from _iter_json(adapter, [], mode)
+            return
+        with Session(bind=bind) as session:
+            result = session.scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+            yield from _iter_json(adapter, result.partitions(), mode)
+
+    return StreamingResponse(_stream(), media_type=MEDIA_TYPES[mode], headers=_headers(etag))
+
+
+def stream_list_async(stmt: Select, schema: Type[BaseModel], mode: StreamMode, etag: Optional[str] = None) -> StreamingResponse:
+    """Igual que stream_list, leyendo con una AsyncSession propia (stream_scalars)."""
+    from app.core.database import get_async_sessionmaker
+
+    adapter = get_adapter(schema)
+
+    async def _stream() -> AsyncIterator[bytes]:
+        if mode == "json":
+            yield b"["
+        if stmt is not None:
+            first = True
+            async with get_async_sessionmaker()() as session:
+                result = await session.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+                async for rows in result.partitions():
+                    if rows:
+                        yield _encode_batch(adapter, rows, mode, first)
+                        first = False
+        if mode == "json":
+            yield b"]"
+
+    return StreamingResponse(_stream(), media_type=MEDIA_TYPES[mode], headers=_headers(etag))
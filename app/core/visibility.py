@@ -0,0 +1,112 @@
+"""
+Resolución del alcance de visibilidad (qué cobradores puede ver cada usuario).
+
+Los cobradores visibles de un supervisor se calculan una vez por request y se
+guardan en una caché en memoria con TTL corto. La caché se invalida cuando
+cambia `users.supervisor_id` (o el rol/estado/username) de algún usuario.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.crud.client import get_visible_collector_ids
+from app.models.user import User, RoleType
+
+_cache_lock = threading.Lock()
+_scope_cache: Dict[Tuple[int, Optional[str]], Tuple[float, List[int]]] = {}
+
+
+def _parse_assigned_routes(assigned_routes: Optional[str]) -> List[str]:
+    if not assigned_routes:
+        return []
+    return [name.strip() for name in assigned_routes.split(',') if name.strip()]
+
+
+def get_supervisor_collector_ids(db: Session, supervisor_id: int, assigned_routes: Optional[str] = None) -> List[int]:
+    """IDs de cobradores visibles para un supervisor (subordinados + asignados por nombre), con caché."""
+    key = (supervisor_id, assigned_routes or None)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _scope_cache.get(key)
+    if entry and entry[0] > now:
+        return list(entry[1])
+
+    ids = get_visible_collector_ids(db, supervisor_id, _parse_assigned_routes(assigned_routes))
+    with _cache_lock:
+        _scope_cache[key] = (now + settings.visibility_cache_ttl_seconds, ids)
+    return list(ids)
+
+
+def invalidate_supervisor_scope(supervisor_id: Optional[int] = None) -> None:
+    """Invalida la caché de un supervisor, o toda la caché si no se indica supervisor."""
+    with _cache_lock:
+        if supervisor_id is None:
+            _scope_cache.clear()
+            return
+        for key in [k for k in _scope_cache if k[0] == supervisor_id]:
+            del _scope_cache[key]
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_insert_or_delete(mapper, connection, target):
+    if target.supervisor_id is not None:
+        invalidate_supervisor_scope(target.supervisor_id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.username.history.has_changes():
+        # Las rutas asignadas se resuelven por nombre de usuario
+        invalidate_supervisor_scope()
+        return
+    if not any(state.attrs[attr].history.has_changes() for attr in ("supervisor_id", "role", "is_active")):
+        return
+    history = state.attrs.supervisor_id.history
+    for supervisor_id in {*(history.deleted or ()), *(history.added or ()), target.supervisor_id}:
+        if supervisor_id is not None:
+            invalidate_supervisor_scope(supervisor_id)
+
+
+class VisibilityScope:
+    """Alcance de visibilidad del usuario actual.
+
+    `collector_ids` es None para admin (sin restricción); en otro caso es la lista
+    de cobradores cuyos clientes, créditos y transacciones puede ver el usuario.
+    """
+
+    def __init__(self, user: User, collector_ids: Optional[List[int]]):
+        self.user = user
+        self.collector_ids = collector_ids
+
+    @property
+    def is_admin(self) -> bool:
+        return self.collector_ids is None
+
+    def can_see(self, collector_id: Optional[int]) -> bool:
+        return self.collector_ids is None or collector_id in self.collector_ids
+
+
+def build_visibility_scope(db: Session, user: User) -> VisibilityScope:
+    if user.role == RoleType.ADMIN:
+        return VisibilityScope(user, None)
+    if user.role == RoleType.SUPERVISOR:
+        ids = get_supervisor_collector_ids(db, user.id, getattr(user, "assigned_routes", None))
+        return VisibilityScope(user, ids + [user.id])
+    return VisibilityScope(user, [user.id])
+
+
+def get_visibility_scope(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> VisibilityScope:
+    """Dependency: resuelve una vez por request los cobradores visibles del usuario."""
+    return build_visibility_scope(db, current_user)
@@ -1,198 +1,257 @@
-
+from datetime import date
+from typing import Optional
+from sqlalchemy import func, select, Select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.caja import Caja, CajaTipo
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.dates import business_date, business_day_end
+from app.crud import ledger
+from app.models.box import Box, BoxClose
+from app.models.ledger import AccountType, LedgerAccount, LedgerEntry, LedgerPosting
 
 # Busca la caja de un usuario. Si no existe, la crea y la retorna.
-def get_box_by_user_id(db: Session, user_id: int) -> Caja:
-    box = db.query(Caja).filter(Caja.user_id == user_id, Caja.tipo == CajaTipo.PRINCIPAL).first()
+def get_box_by_user_id(db: Session, user_id: int) -> Box:
+    box = db.query(Box).filter(Box.user_id == user_id).first()
     if not box:
-        # Crear caja principal si no existe
-        box = Caja(user_id=user_id, tipo=CajaTipo.PRINCIPAL, saldo=0.0)
+        # Crear caja si no existe (los saldos viven en las cuentas del libro mayor)
+        box = Box(user_id=user_id)
         db.add(box)
         db.commit()
         db.refresh(box)
     return box
 
+# Igual que get_box_by_user_id, sobre una AsyncSession
+async def get_box_by_user_id_async(db: AsyncSession, user_id: int) -> Box:
+    box = await db.scalar(select(Box).where(Box.user_id == user_id))
+    if not box:
+        box = Box(user_id=user_id)
+        db.add(box)
+        await db.commit()
+        await db.refresh(box)
+    return box
+
 # Alias para compatibilidad con el endpoint de creación de usuario
-def create_box(db: Session, user_id: int) -> Caja:
+def create_box(db: Session, user_id: int) -> Box:
     return get_box_by_user_id(db, user_id)
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.dependencies import get_current_user
-from app.models.user import User, RoleType
-from app.schemas.box import Box as BoxSchema, BoxMovementCreate, BoxUpdate, CashCount, BoxCloseResponse, BoxMovement
-from app.crud import box as crud_box
-from app.crud import user as crud_user
-
-router = APIRouter()
-
-@router.get("/{user_id}", response_model=BoxSchema)
-def get_user_box(
-    user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Obtiene la caja de un usuario específico con validación de permisos."""
-    target_box = crud_box.get_box_by_user_id(db, user_id)
-    if not target_box:
-        raise HTTPException(status_code=404, detail="Box not found for this user")
-
-    # Permisos
-    if current_user.role == RoleType.ADMIN:
-        pass # Admin ve todo
-    elif current_user.role == RoleType.SUPERVISOR:
-        # Supervisor ve la suya y la de sus subordinados
-        target_user = crud_user.get_user(db, user_id)
-        if target_user.id != current_user.id and target_user.supervisor_id != current_user.id:
-             raise HTTPException(status_code=403, detail="Not authorized to view this box")
-    else:
-        # Cobrador solo ve la suya
-        if current_user.id != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-            
-    return target_box
-
-@router.get("/{user_id}/history", response_model=List[BoxMovement])
-def get_box_history(
-    user_id: int,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Obtiene el historial de movimientos de la caja de un usuario."""
-    target_box = crud_box.get_box_by_user_id(db, user_id)
-    if not target_box:
-        raise HTTPException(status_code=404, detail="Box not found for this user")
-
-    # Permisos (Misma lógica que ver la caja)
-    if current_user.role == RoleType.ADMIN:
-        pass
-    elif current_user.role == RoleType.SUPERVISOR:
-        target_user = crud_user.get_user(db, user_id)
-        if target_user.id != current_user.id and target_user.supervisor_id != current_user.id:
-             raise HTTPException(status_code=403, detail="Not authorized to view this box")
-    else:
-        if current_user.id != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-            
-    return crud_box.get_box_movements(db, target_box.id, skip, limit)
-
-@router.post("/transfer", status_code=status.HTTP_200_OK)
-def transfer_money(
-    movement: BoxMovementCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+def box_movements_select(box_ids: Optional[list[int]] = None) -> Select:
+    """
+    Movimientos de cajas: las partidas del libro mayor sobre las cuentas de sus dueños,
+    con la forma del esquema BoxMovement (None = todas las cajas).
+    """
+    stmt = (
+        select(
+            LedgerPosting.id,
+            Box.id.label("box_id"),
+            LedgerPosting.amount,
+            LedgerPosting.movement_type,
+            LedgerPosting.description,
+            (LedgerAccount.account_type == AccountType.MICROSEGURO).label("is_insurance"),
+            LedgerPosting.created_at,
+            LedgerEntry.performed_by_id,
+        )
+        .join(LedgerAccount, LedgerAccount.id == LedgerPosting.account_id)
+        .join(Box, Box.user_id == LedgerAccount.user_id)
+        .join(LedgerEntry, LedgerEntry.id == LedgerPosting.entry_id)
+    )
+    if box_ids is not None:
+        stmt = stmt.where(Box.id.in_(box_ids))
+    return stmt
+
+def get_box_movements(db: Session, box_id: int, skip: int = 0, limit: int = 100) -> list:
+    """Historial de movimientos de una caja, del más reciente al más antiguo."""
+    stmt = (
+        box_movements_select([box_id])
+        .order_by(LedgerPosting.created_at.desc(), LedgerPosting.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return db.execute(stmt).all()
+
+
+class BoxAlreadyClosedError(ValueError):
+    """La caja ya tiene cierre para ese día (los cierres son inmutables)."""
+
+
+def close_status(difference: float) -> str:
+    if abs(difference) <= settings.box_close_tolerance:
+        return "MATCH"
+    return "SURPLUS" if difference > 0 else "SHORTAGE"
+
+def snapshot_balances(db: Session, user_ids: list[int]) -> dict[int, dict]:
     """
-    Supervisor transfiere dinero de su base a la base de un cobrador.
+    Saldos principal y de microseguro de varios usuarios y la última partida que los explica,
+    en una sola consulta agrupada: la misma sentencia lee saldo y partidas, así la foto es
+    consistente aunque entren movimientos en paralelo.
     """
-    if current_user.role != RoleType.SUPERVISOR:
-        raise HTTPException(status_code=403, detail="Only supervisors can transfer money")
-    
-    if not movement.target_user_id:
-        raise HTTPException(status_code=400, detail="Target user required for transfer")
-
-    # Validar que el destino sea subordinado
-    target_user = crud_user.get_user(db, movement.target_user_id)
-    if not target_user or target_user.supervisor_id != current_user.id:
-        raise HTTPException(status_code=400, detail="Target user must be your subordinate")
-
-    sup_box = crud_box.get_box_by_user_id(db, current_user.id)
-    col_box = crud_box.get_box_by_user_id(db, target_user.id)
-
-    if not sup_box or not col_box:
-        raise HTTPException(status_code=404, detail="Box not found")
-
-    if sup_box.base_balance < movement.amount:
-        raise HTTPException(status_code=400, detail="Insufficient funds in supervisor base")
-
-    # Ejecutar transferencia
-    # 1. Restar de Supervisor
-    crud_box.update_box_balance(db, sup_box, -movement.amount)
-    crud_box.create_movement(db, sup_box.id, -movement.amount, "TRANSFER_OUT", current_user.id, f"Transfer to {target_user.username}")
-
-    # 2. Sumar a Cobrador
-    crud_box.update_box_balance(db, col_box, movement.amount)
-    crud_box.create_movement(db, col_box.id, movement.amount, "TRANSFER_IN", current_user.id, f"Transfer from {current_user.username}")
-
-    return {"message": "Transfer successful"}
-
-@router.post("/expense", status_code=status.HTTP_200_OK)
-def record_expense(
-    movement: BoxMovementCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Cobrador registra un gasto (reduce su base)."""
-    # Cobradores y supervisores pueden registrar gastos
-    user_box = crud_box.get_box_by_user_id(db, current_user.id)
-    if not user_box:
-        raise HTTPException(status_code=404, detail="Box not found")
-
-    crud_box.update_box_balance(db, user_box, -movement.amount)
-    crud_box.create_movement(db, user_box.id, -movement.amount, "EXPENSE", current_user.id, movement.description)
-    
-    return {"message": "Expense recorded"}
-
-@router.post("/withdraw", status_code=status.HTTP_200_OK)
-def withdraw_money(
-    movement: BoxMovementCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+    snapshots = {
+        user_id: {AccountType.PRINCIPAL: 0.0, AccountType.MICROSEGURO: 0.0, "last_posting_id": None}
+        for user_id in user_ids
+    }
+    if not user_ids:
+        return snapshots
+    last_posting = (
+        select(func.max(LedgerPosting.id))
+        .where(LedgerPosting.account_id == LedgerAccount.id)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(LedgerAccount.user_id, LedgerAccount.account_type, LedgerAccount.balance, last_posting)
+        .where(LedgerAccount.user_id.in_(user_ids))
+    ).all()
+    for user_id, account_type, balance, last_posting_id in rows:
+        snapshot = snapshots[user_id]
+        snapshot[account_type] = balance
+        if last_posting_id is not None:
+            snapshot["last_posting_id"] = max(snapshot["last_posting_id"] or 0, last_posting_id)
+    return snapshots
+
+def build_close(
+    box: Box,
+    snapshot: dict,
+    day: date,
+    counted_balance: float,
+    denominations: Optional[dict] = None,
+    closed_by_id: Optional[int] = None,
+    observations: Optional[str] = None,
+) -> BoxClose:
+    """Cierre de una caja a partir de su foto de saldos (ver snapshot_balances)."""
+    system_balance = snapshot[AccountType.PRINCIPAL]
+    difference = round(counted_balance - system_balance, 2)
+    return BoxClose(
+        box_id=box.id,
+        user_id=box.user_id,
+        business_date=day,
+        system_balance=system_balance,
+        insurance_balance=snapshot[AccountType.MICROSEGURO],
+        counted_balance=counted_balance,
+        difference=difference,
+        status=close_status(difference),
+        denominations=denominations,
+        last_posting_id=snapshot["last_posting_id"],
+        closed_by_id=closed_by_id,
+        observations=observations,
+    )
+
+def save_closes(db: Session, closes: list[BoxClose], commit: bool = True) -> list[BoxClose]:
+    """Guarda cierres; si alguna caja ya cerró ese día no guarda ninguno (BoxAlreadyClosedError)."""
+    db.add_all(closes)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise BoxAlreadyClosedError("La caja ya tiene cierre para este día")
+    if commit:
+        db.commit()
+    return closes
+
+def close_box(
+    db: Session,
+    box: Box,
+    counted_balance: float,
+    denominations: Optional[dict] = None,
+    closed_by_id: Optional[int] = None,
+    observations: Optional[str] = None,
+    commit: bool = True,
+) -> BoxClose:
+    """
+    Cierre del día: compara lo contado con el saldo del sistema y guarda la foto inmutable
+    de los saldos de la caja (uno por caja por día hábil).
+    """
+    snapshot = snapshot_balances(db, [box.user_id])[box.user_id]
+    close = build_close(box, snapshot, business_date(), counted_balance, denominations, closed_by_id, observations)
+    return save_closes(db, [close], commit=commit)[0]
+
+def get_box_closes(db: Session, box_id: int, skip: int = 0, limit: int = 100) -> list[BoxClose]:
+    """Cierres de una caja, del más reciente al más antiguo."""
+    stmt = (
+        select(BoxClose)
+        .where(BoxClose.box_id == box_id)
+        .order_by(BoxClose.business_date.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
+
+def get_balance_as_of(db: Session, box: Box, day: date) -> tuple[dict, Optional[BoxClose]]:
+    """
+    Saldos de la caja al final de `day` y el cierre desde el que se calcularon.
+
+    Parte del último cierre hasta ese día y suma solo las partidas posteriores a él (en el
+    mismo día, p. ej. el retiro del cierre de equipo); sin cierres, suma el historial completo.
     """
-    Supervisor retira dinero de la caja del cobrador (ej. cierre del día).
-    El dinero sale de la caja del cobrador y vuelve a la del supervisor.
+    close = db.scalar(
+        select(BoxClose)
+        .where(BoxClose.box_id == box.id, BoxClose.business_date <= day)
+        .order_by(BoxClose.business_date.desc())
+        .limit(1)
+    )
+    balances = {
+        AccountType.PRINCIPAL: close.system_balance if close else 0.0,
+        AccountType.MICROSEGURO: close.insurance_balance if close else 0.0,
+    }
+    stmt = (
+        select(LedgerAccount.account_type, func.sum(LedgerPosting.amount))
+        .join(LedgerAccount, LedgerAccount.id == LedgerPosting.account_id)
+        .where(LedgerAccount.user_id == box.user_id, LedgerPosting.created_at < business_day_end(day))
+        .group_by(LedgerAccount.account_type)
+    )
+    if close is not None and close.last_posting_id is not None:
+        stmt = stmt.where(LedgerPosting.id > close.last_posting_id)
+    for account_type, total in db.execute(stmt):
+        balances[account_type] += total or 0.0
+    return balances, close
+
+def close_team(
+    db: Session,
+    supervisor_id: int,
+    counts: dict[int, dict],
+    withdraw: bool = True,
+    commit: bool = True,
+) -> list[tuple[BoxClose, float]]:
     """
-    if current_user.role != RoleType.SUPERVISOR:
-        raise HTTPException(status_code=403, detail="Only supervisors can withdraw money")
-
-    if not movement.target_user_id:
-        raise HTTPException(status_code=400, detail="Target user required")
-
-    target_user = crud_user.get_user(db, movement.target_user_id)
-    if not target_user or target_user.supervisor_id != current_user.id:
-        raise HTTPException(status_code=400, detail="Target user must be your subordinate")
-
-    col_box = crud_box.get_box_by_user_id(db, target_user.id)
-    sup_box = crud_box.get_box_by_user_id(db, current_user.id)
-
-    if not col_box:
-        raise HTTPException(status_code=404, detail="Collector box not found")
-
-    # 1. Restar de Cobrador
-    crud_box.update_box_balance(db, col_box, -movement.amount)
-    crud_box.create_movement(db, col_box.id, -movement.amount, "WITHDRAWAL", current_user.id, f"Withdrawal by {current_user.username}")
-
-    # 2. Sumar a Supervisor (Recuperación de base)
-    crud_box.update_box_balance(db, sup_box, movement.amount)
-    crud_box.create_movement(db, sup_box.id, movement.amount, "RECOVERY", current_user.id, f"Recovery from {target_user.username}")
-
-    return {"message": "Withdrawal successful"}
-
-@router.put("/{user_id}", response_model=BoxSchema)
-def admin_update_box(
-    user_id: int,
-    box_update: BoxUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Admin modifica directamente la base o seguro (Correcciones)."""
-    if current_user.role != RoleType.ADMIN:
-        raise HTTPException(status_code=403, detail="Only admin can manually edit boxes")
-    
-    box = crud_box.get_box_by_user_id(db, user_id)
-    # Aquí implementarías la lógica de actualización directa si es necesario
-    # Por seguridad, es mejor hacerlo vía movimientos, pero si se pide edición directa:
-    if box_update.base_balance is not None:
-        box.base_balance = box_update.base_balance
-    if box_update.insurance_balance is not None:
-        box.insurance_balance = box_update.insurance_balance
-    
-    db.commit()
-    db.refresh(box)
-    return box
\ No newline at end of file
+    Cierre del día de varias cajas (el equipo de un supervisor) en una sola transacción.
+
+    `counts` va de user_id a {"counted_balance", "denominations", "observations"}. Lee los
+    saldos de todas las cajas en una consulta agrupada, y con `withdraw` pasa el saldo del
+    sistema de cada caja a la del supervisor en un único asiento (una partida por caja).
+    Devuelve (cierre, monto retirado) por caja, en el orden de `counts`. Si alguna caja ya
+    cerró ese día o no alcanza el saldo no se guarda nada. Con commit=False solo hace flush.
+    """
+    user_ids = list(counts)
+    boxes = {box.user_id: box for box in db.scalars(select(Box).where(Box.user_id.in_(user_ids)))}
+    missing = [Box(user_id=user_id) for user_id in user_ids if user_id not in boxes]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        boxes.update({box.user_id: box for box in missing})
+
+    snapshots = snapshot_balances(db, user_ids)
+    day = business_date()
+    closes = [
+        build_close(
+            boxes[user_id], snapshots[user_id], day, count["counted_balance"],
+            count.get("denominations"), supervisor_id, count.get("observations"),
+        )
+        for user_id, count in counts.items()
+    ]
+    withdrawals = {
+        user_id: snapshots[user_id][AccountType.PRINCIPAL] if withdraw else 0.0
+        for user_id in user_ids
+    }
+    to_withdraw = {user_id: amount for user_id, amount in withdrawals.items() if amount > 0}
+    if to_withdraw:
+        keys = [(user_id, AccountType.PRINCIPAL) for user_id in [*to_withdraw, supervisor_id]]
+        accounts = ledger.get_accounts(db, keys)
+        legs = [
+            ledger.Leg(accounts[(user_id, AccountType.PRINCIPAL)], -amount, "WITHDRAWAL", "Retiro por cierre del día")
+            for user_id, amount in to_withdraw.items()
+        ]
+        legs.append(ledger.Leg(
+            accounts[(supervisor_id, AccountType.PRINCIPAL)], sum(to_withdraw.values()), "RECOVERY",
+            f"Cierre de equipo ({len(to_withdraw)} cajas)",
+        ))
+        ledger.post(db, "WITHDRAWAL", legs, description="Cierre de equipo", performed_by_id=supervisor_id, commit=False)
+    save_closes(db, closes, commit=commit)
+    return [(close, withdrawals[close.user_id]) for close in closes]
@@ -1,95 +1,110 @@
 from sqlalchemy.orm import Session
-from app.models.caja import Caja, CajaMovimiento, CajaTipo, MovimientoTipo, TopePrestamo
-from app.models.user import User
-from app.models.credit import Credit
+from app.crud import box as crud_box
+from app.crud import ledger
+from app.models.caja import TopePrestamo
 from app.models.client import Client
-from datetime import datetime
+from app.models.ledger import AccountType, LedgerAccount, LedgerEntry, USER_ACCOUNT_TYPES
+
+# Las cajas son cuentas del libro mayor: caja_id es el id de la cuenta (app/crud/ledger.py)
 
 # Crear caja principal y microseguro para usuario
 
 def create_cajas_for_user(db: Session, user_id: int):
-    for tipo in [CajaTipo.PRINCIPAL, CajaTipo.MICROSEGURO]:
-        caja = Caja(user_id=user_id, tipo=tipo, saldo=0.0)
-        db.add(caja)
+    for tipo in USER_ACCOUNT_TYPES:
+        ledger.get_account(db, user_id, tipo)
     db.commit()
 
-# Registrar movimiento en caja
-
-def registrar_movimiento(db: Session, caja_id: int, tipo: MovimientoTipo, monto: float, descripcion: str = None, usuario_origen_id: int = None, usuario_destino_id: int = None, credito_id: int = None, cliente_id: int = None, observaciones: str = None):
-    movimiento = CajaMovimiento(
-        caja_id=caja_id,
-        tipo=tipo,
-        monto=monto,
-        descripcion=descripcion,
-        usuario_origen_id=usuario_origen_id,
-        usuario_destino_id=usuario_destino_id,
-        credito_id=credito_id,
-        cliente_id=cliente_id,
-        observaciones=observaciones,
-        created_at=datetime.utcnow()
-    )
-    db.add(movimiento)
+def _get_caja(db: Session, caja_id: int, tipo: AccountType = None):
+    caja = db.get(LedgerAccount, caja_id)
+    if caja is None or caja.user_id is None or (tipo is not None and caja.account_type != tipo):
+        return None
+    return caja
+
+def _registrar(db: Session, tipo: str, legs: list, descripcion: str, usuario_id: int) -> bool:
+    try:
+        ledger.post(db, tipo, legs, description=descripcion, performed_by_id=usuario_id)
+    except ValueError:
+        return False
+    return True
+
+# Registrar un evento sin movimiento de dinero (cliente volado)
+
+def registrar_evento(db: Session, tipo: str, descripcion: str, usuario_id: int = None):
+    entry = LedgerEntry(entry_type=tipo, description=descripcion, performed_by_id=usuario_id)
+    db.add(entry)
     db.commit()
-    return movimiento
+    return entry
 
 # Transferir base de supervisor a cobrador
 
 def transferir_base(db: Session, supervisor_id: int, cobrador_id: int, monto: float):
-    supervisor_caja = db.query(Caja).filter_by(user_id=supervisor_id, tipo=CajaTipo.PRINCIPAL).first()
-    cobrador_caja = db.query(Caja).filter_by(user_id=cobrador_id, tipo=CajaTipo.PRINCIPAL).first()
-    if supervisor_caja and cobrador_caja and supervisor_caja.saldo >= monto:
-        supervisor_caja.saldo -= monto
-        cobrador_caja.saldo += monto
-        db.commit()
-        registrar_movimiento(db, supervisor_caja.id, MovimientoTipo.TRANSFERENCIA, -monto, f"Transferencia a cobrador {cobrador_id}", usuario_origen_id=supervisor_id, usuario_destino_id=cobrador_id)
-        registrar_movimiento(db, cobrador_caja.id, MovimientoTipo.INGRESO, monto, f"Recibido de supervisor {supervisor_id}", usuario_origen_id=supervisor_id, usuario_destino_id=cobrador_id)
-        return True
-    return False
+    if monto <= 0:
+        return False
+    origen = ledger.get_account(db, supervisor_id, AccountType.PRINCIPAL)
+    destino = ledger.get_account(db, cobrador_id, AccountType.PRINCIPAL)
+    return _registrar(db, "TRANSFER", [
+        ledger.Leg(origen, -monto, "TRANSFER_OUT", f"Transferencia a cobrador {cobrador_id}"),
+        ledger.Leg(destino, monto, "TRANSFER_IN", f"Recibido de supervisor {supervisor_id}"),
+    ], f"Transferencia a cobrador {cobrador_id}", supervisor_id)
 
 # Registrar gasto
 
 def registrar_gasto(db: Session, caja_id: int, monto: float, descripcion: str, usuario_id: int):
-    caja = db.query(Caja).filter_by(id=caja_id).first()
-    if caja and caja.saldo >= monto:
-        caja.saldo -= monto
-        db.commit()
-        registrar_movimiento(db, caja.id, MovimientoTipo.GASTO, -monto, descripcion, usuario_origen_id=usuario_id)
-        return True
-    return False
+    caja = _get_caja(db, caja_id)
+    if not caja or monto <= 0:
+        return False
+    gastos = ledger.get_system_account(db, AccountType.GASTOS)
+    return _registrar(db, "EXPENSE", [
+        ledger.Leg(caja, -monto, "EXPENSE", descripcion),
+        ledger.Leg(gastos, monto, "EXPENSE", descripcion),
+    ], descripcion, usuario_id)
 
 # Registrar microseguro
 
 def registrar_microseguro(db: Session, caja_id: int, monto: float, cliente_id: int, usuario_id: int):
-    caja = db.query(Caja).filter_by(id=caja_id, tipo=CajaTipo.MICROSEGURO).first()
-    if caja:
-        caja.saldo += monto
-        db.commit()
-        registrar_movimiento(db, caja.id, MovimientoTipo.MICROSEGURO, monto, "Microseguro cobrado", usuario_origen_id=usuario_id, cliente_id=cliente_id)
-        return True
-    return False
+    caja = _get_caja(db, caja_id, AccountType.MICROSEGURO)
+    if not caja or monto <= 0:
+        return False
+    capital = ledger.get_system_account(db, AccountType.CAPITAL)
+    descripcion = f"Microseguro cobrado (cliente {cliente_id})"
+    return _registrar(db, "MICROSEGURO", [
+        ledger.Leg(caja, monto, "MICROSEGURO", descripcion),
+        ledger.Leg(capital, -monto, "MICROSEGURO", descripcion),
+    ], descripcion, usuario_id)
 
 # Registrar retiro
 
 def registrar_retiro(db: Session, caja_id: int, monto: float, usuario_id: int, destino_supervisor: bool = False):
-    caja = db.query(Caja).filter_by(id=caja_id).first()
-    if caja and caja.saldo >= monto:
-        caja.saldo -= monto
-        db.commit()
-        registrar_movimiento(db, caja.id, MovimientoTipo.RETIRO, -monto, "Retiro de caja", usuario_origen_id=usuario_id)
-        if destino_supervisor:
-            # El dinero pasa a la caja del supervisor
-            supervisor_caja = db.query(Caja).filter_by(user_id=usuario_id, tipo=CajaTipo.PRINCIPAL).first()
-            if supervisor_caja:
-                supervisor_caja.saldo += monto
-                db.commit()
-                registrar_movimiento(db, supervisor_caja.id, MovimientoTipo.INGRESO, monto, "Recibido por retiro de cobrador", usuario_origen_id=usuario_id)
-        return True
-    return False
+    caja = _get_caja(db, caja_id)
+    if not caja or monto <= 0:
+        return False
+    if destino_supervisor:
+        # El dinero pasa a la caja principal del supervisor
+        destino = ledger.get_account(db, usuario_id, AccountType.PRINCIPAL)
+        destino_tipo, destino_desc = "RECOVERY", "Recibido por retiro de cobrador"
+    else:
+        destino = ledger.get_system_account(db, AccountType.CAPITAL)
+        destino_tipo, destino_desc = "WITHDRAWAL", "Retiro de caja"
+    if destino.id == caja.id:
+        return False
+    return _registrar(db, "WITHDRAWAL", [
+        ledger.Leg(caja, -monto, "WITHDRAWAL", "Retiro de caja"),
+        ledger.Leg(destino, monto, destino_tipo, destino_desc),
+    ], "Retiro de caja", usuario_id)
 
-# Registrar cierre de caja
+# Registrar cierre de caja (foto diaria de saldos, ver app/crud/box.py)
 
 def registrar_cierre_caja(db: Session, caja_id: int, usuario_id: int, saldo_final: float, observaciones: str = None):
-    registrar_movimiento(db, caja_id, MovimientoTipo.CIERRE, saldo_final, "Cierre de caja", usuario_origen_id=usuario_id, observaciones=observaciones)
+    caja = _get_caja(db, caja_id)
+    if not caja:
+        return None
+    try:
+        return crud_box.close_box(
+            db, crud_box.get_box_by_user_id(db, caja.user_id), saldo_final,
+            closed_by_id=usuario_id, observations=observaciones,
+        )
+    except crud_box.BoxAlreadyClosedError:
+        return None
 
 # Marcar cliente como volado
 
@@ -97,8 +112,10 @@ def marcar_cliente_volado(db: Session, cliente_id: int, monto_bloqueado: float,
     cliente = db.query(Client).filter_by(id=cliente_id).first()
     if cliente:
         cliente.estado = "volado"
-        db.commit()
-        registrar_movimiento(db, None, MovimientoTipo.VOLADO, monto_bloqueado, "Cliente volado", usuario_origen_id=usuario_id, cliente_id=cliente_id, observaciones=observaciones)
+        descripcion = f"Cliente volado {cliente_id}: monto bloqueado {monto_bloqueado:,.2f}"
+        if observaciones:
+            descripcion = f"{descripcion} ({observaciones})"
+        registrar_evento(db, "VOLADO", descripcion, usuario_id)
         return True
     return False
 
@@ -1,5 +1,7 @@
 from typing import Optional, List
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, select, Select
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.client import Client
 from app.models.user import User
 from app.schemas.client import ClientCreate, ClientUpdate
@@ -15,6 +17,18 @@ def get_subordinate_collector_ids(db: Session, supervisor_id: int) -> List[int]:
     return [c.id for c in collectors]
 
 
+def get_visible_collector_ids(db: Session, supervisor_id: int, assigned_names: Optional[List[str]] = None) -> List[int]:
+    """Obtiene en una sola consulta los cobradores bajo un supervisor más los asignados por nombre."""
+    condition = and_(
+        User.supervisor_id == supervisor_id,
+        User.role == "COLLECTOR",
+        User.is_active == True
+    )
+    if assigned_names:
+        condition = or_(condition, User.username.in_(assigned_names))
+    return [u.id for u in db.query(User.id).filter(condition).all()]
+
+
 def get_client(db: Session, client_id: int) -> Optional[Client]:
     return db.query(Client).filter(Client.id == client_id).first()
 
@@ -22,23 +36,79 @@ def get_client_by_dni(db: Session, dni: str) -> Optional[Client]:
     """Obtiene un cliente por DNI."""
     return db.query(Client).filter(Client.dni == dni).first()
 
-def get_clients(
-    db: Session,
+def clients_select(
     skip: int = 0,
     limit: int = 100,
     collector_id: Optional[int] = None,
-    is_active: Optional[bool] = None
-) -> list[Client]:
-    """Lista clientes con filtros opcionales."""
-    query = db.query(Client)
+    is_active: Optional[bool] = None,
+    *,
+    collector_ids: Optional[List[int]] = None,
+    after_id: Optional[int] = None,
+) -> Optional[Select]:
+    """Consulta del listado de clientes (compartida por las versiones sync y async).
+
+    Devuelve None si el alcance es vacío (no hay nada que consultar).
+    """
+    stmt = select(Client)
     
     if collector_id is not None:
-        query = query.filter(Client.collector_id == collector_id)
+        stmt = stmt.where(Client.collector_id == collector_id)
+
+    if collector_ids is not None:
+        if len(collector_ids) == 0:
+            return None
+        stmt = stmt.where(Client.collector_id.in_(collector_ids))
     
     if is_active is not None:
-        query = query.filter(Client.is_active == is_active)
+        stmt = stmt.where(Client.is_active == is_active)
+
+    # El listado no usa relaciones: cualquier carga perezosa es un N+1 y falla en vez de consultar
+    stmt = stmt.options(raiseload("*", sql_only=True)).order_by(Client.id)
+    if after_id is not None:
+        # Paginación keyset: usa el índice en vez de recorrer las filas saltadas
+        return stmt.where(Client.id > after_id).limit(limit)
     
-    return query.offset(skip).limit(limit).all()
+    return stmt.offset(skip).limit(limit)
+
+def get_clients(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    collector_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    *,
+    collector_ids: Optional[List[int]] = None,
+    after_id: Optional[int] = None,
+) -> list[Client]:
+    """Lista clientes con filtros opcionales.
+
+    - collector_ids: IDs de cobradores permitidos (alcance del usuario), filtrado en SQL
+    - after_id: cursor keyset; devuelve clientes con id > after_id (ignora skip)
+    """
+    stmt = clients_select(
+        skip, limit, collector_id, is_active, collector_ids=collector_ids, after_id=after_id
+    )
+    if stmt is None:
+        return []
+    return list(db.scalars(stmt).all())
+
+async def get_clients_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    collector_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    *,
+    collector_ids: Optional[List[int]] = None,
+    after_id: Optional[int] = None,
+) -> list[Client]:
+    """Igual que get_clients, sobre una AsyncSession."""
+    stmt = clients_select(
+        skip, limit, collector_id, is_active, collector_ids=collector_ids, after_id=after_id
+    )
+    if stmt is None:
+        return []
+    return list((await db.scalars(stmt)).all())
 
 def create_client(db: Session, client: ClientCreate) -> Client:
     db_client = Client(
@@ -52,6 +122,7 @@ def create_client(db: Session, client: ClientCreate) -> Client:
         address=client.address,
         latitude=client.latitude,
         longitude=client.longitude,
+        route_order=client.route_order,
         house_photo_url=client.house_photo_url,
         collector_id=client.collector_id
     )
@@ -1,13 +1,50 @@
+from datetime import date, datetime, time, timedelta
 from typing import Optional, List
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.models.credit import Credit, CreditStatus
+from sqlalchemy.orm import Session, joinedload, raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select, update, Select
+from app.models.credit import Credit, CreditStatus, CreditInstallment, InstallmentStatus
 from app.models.client import Client
 from app.schemas.credit import CreditCreate, CreditUpdate
+from app.core.dates import business_date
 
+_TOLERANCE = 1e-9
 
-def get_credit(db: Session, credit_id: int) -> Optional[Credit]:
-    return db.query(Credit).filter(Credit.id == credit_id).first()
+
+def get_credit(db: Session, credit_id: int, *, with_client: bool = False) -> Optional[Credit]:
+    """Obtiene un crédito; con with_client carga además `credit.client.collector_id` en la misma consulta."""
+    stmt = select(Credit).where(Credit.id == credit_id)
+    if with_client:
+        # Solo lo necesario del cliente para validar permisos: un JOIN en vez de un SELECT extra
+        stmt = stmt.options(joinedload(Credit.client).load_only(Client.id, Client.collector_id))
+    return db.scalars(stmt).first()
+
+
+def credits_select(
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    client_id: Optional[int] = None,
+    collector_ids: Optional[List[int]] = None,
+    status: Optional[CreditStatus] = None,
+) -> Optional[Select]:
+    """Consulta del listado de créditos (compartida por las versiones sync y async).
+
+    Devuelve None si el alcance es vacío.
+    """
+    stmt = select(Credit)
+    if client_id is not None:
+        stmt = stmt.where(Credit.client_id == client_id)
+    if collector_ids is not None:
+        if len(collector_ids) == 0:
+            return None
+        # Join con Client para filtrar por collector_id permitido
+        stmt = stmt.join(Client, Client.id == Credit.client_id).where(Client.collector_id.in_(collector_ids))
+    if status is not None:
+        stmt = stmt.where(Credit.status == status)
+    # El listado no usa relaciones: cualquier carga perezosa es un N+1 y falla en vez de consultar
+    # Orden estable por id: la paginación (skip/limit) no repite ni salta créditos
+    return stmt.options(raiseload("*", sql_only=True)).order_by(Credit.id).offset(skip).limit(limit)
 
 
 def get_credits(
@@ -25,24 +62,54 @@ def get_credits(
     - collector_ids: IDs de cobradores permitidos (se aplica via relación Client.collector_id)
     - status: estado del crédito
     """
-    query = db.query(Credit)
-    if client_id is not None:
-        query = query.filter(Credit.client_id == client_id)
-    if collector_ids is not None:
-        if len(collector_ids) == 0:
-            return []
-        # Join con Client para filtrar por collector_id permitido
-        query = query.join(Client, Client.id == Credit.client_id).filter(Client.collector_id.in_(collector_ids))
-    if status is not None:
-        query = query.filter(Credit.status == status)
-    return query.offset(skip).limit(limit).all()
+    stmt = credits_select(skip, limit, client_id=client_id, collector_ids=collector_ids, status=status)
+    if stmt is None:
+        return []
+    return list(db.scalars(stmt).all())
 
 
-def create_credit(db: Session, credit: CreditCreate) -> Credit:
+async def get_credits_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    client_id: Optional[int] = None,
+    collector_ids: Optional[List[int]] = None,
+    status: Optional[CreditStatus] = None,
+) -> list[Credit]:
+    """Igual que get_credits, sobre una AsyncSession."""
+    stmt = credits_select(skip, limit, client_id=client_id, collector_ids=collector_ids, status=status)
+    if stmt is None:
+        return []
+    return list((await db.scalars(stmt)).all())
+
+
+def build_schedule(total: float, daily: float, term_days: int, start: date) -> list[dict]:
+    """
+    Plan de cuotas diarias desde el día siguiente a `start` (sin plazo, una sola cuota).
+    Los montos van redondeados a centavos; la última cuota absorbe el redondeo.
+    """
+    term = term_days if term_days and term_days > 0 else 1
+    amount = round(daily if term > 1 else total, 2)
+    return [
+        {
+            "number": n,
+            "due_date": start + timedelta(days=n),
+            "amount": amount if n < term else round(total - amount * (term - 1), 2),
+            "paid_amount": 0.0,
+            "status": InstallmentStatus.pending,
+        }
+        for n in range(1, term + 1)
+    ]
+
+
+def create_credit(db: Session, credit: CreditCreate, commit: bool = True) -> Credit:
+    # Con commit=False solo hace flush (p. ej. para confirmar junto con la clave de idempotencia)
     # calcular pagos sencillos: total_amount y daily_payment
     insurance = float(credit.insurance_amount or 0)
     total = credit.amount * (1 + credit.interest_rate / 100) + insurance
     daily = total / credit.term_days if credit.term_days else total
+    schedule = build_schedule(total, daily, credit.term_days, business_date())
     db_credit = Credit(
         client_id=credit.client_id,
         amount=credit.amount,
@@ -51,14 +118,90 @@ def create_credit(db: Session, credit: CreditCreate) -> Credit:
         insurance_amount=insurance,
         total_amount=total,
         remaining_amount=total,
-        daily_payment=daily
+        daily_payment=daily,
+        end_date=datetime.combine(schedule[-1]["due_date"], time.min),
     )
     db.add(db_credit)
-    db.commit()
-    db.refresh(db_credit)
+    db.flush()
+    # Plan de cuotas en un solo INSERT (executemany), en el mismo commit que el crédito
+    db.execute(insert(CreditInstallment), [{"credit_id": db_credit.id, **row} for row in schedule])
+    if commit:
+        db.commit()
+        db.refresh(db_credit)
     return db_credit
 
 
+def get_schedule(db: Session, credit_id: int) -> list[CreditInstallment]:
+    stmt = select(CreditInstallment).where(CreditInstallment.credit_id == credit_id).order_by(CreditInstallment.number)
+    return list(db.scalars(stmt))
+
+
+def apply_payments_to_schedule(db: Session, payments: dict[int, float], paid_at: Optional[datetime] = None) -> None:
+    """
+    Aplica pagos (credit_id -> monto) a las cuotas abiertas más antiguas de cada crédito.
+
+    Lee las cuotas abiertas de todos los créditos en una consulta y actualiza las que
+    cambian en un UPDATE en bloque; no confirma (va en el commit del pago).
+    """
+    payments = {credit_id: amount for credit_id, amount in payments.items() if amount > _TOLERANCE}
+    if not payments:
+        return
+    paid_at = paid_at or datetime.utcnow()
+    rows = db.execute(
+        select(CreditInstallment.id, CreditInstallment.credit_id, CreditInstallment.amount, CreditInstallment.paid_amount)
+        .where(CreditInstallment.credit_id.in_(payments), CreditInstallment.status != InstallmentStatus.paid)
+        .order_by(CreditInstallment.credit_id, CreditInstallment.number)
+    ).all()
+    changes = []
+    for row in rows:
+        left = payments[row.credit_id]
+        if left <= _TOLERANCE:
+            continue
+        applied = min(left, row.amount - row.paid_amount)
+        payments[row.credit_id] = left - applied
+        paid = round(row.paid_amount + applied, 2)
+        fully_paid = paid >= row.amount - 0.005
+        changes.append({
+            "id": row.id,
+            "paid_amount": paid,
+            "status": InstallmentStatus.paid if fully_paid else InstallmentStatus.partial,
+            "paid_at": paid_at if fully_paid else None,
+        })
+    if changes:
+        # UPDATE en bloque por clave primaria
+        db.execute(update(CreditInstallment), changes)
+
+
+def sync_schedule(db: Session, credit: Credit, paid_at: Optional[datetime] = None) -> None:
+    """
+    Rehace lo pagado de cada cuota a partir del saldo del crédito (total - restante),
+    aplicado a las cuotas más antiguas. Se usa cuando el restante se corrige a mano; no
+    confirma y solo actualiza las cuotas que cambian.
+    """
+    if credit.total_amount is None or credit.remaining_amount is None:
+        return
+    left = max(0.0, credit.total_amount - credit.remaining_amount)
+    paid_at = paid_at or datetime.utcnow()
+    changes = []
+    for row in get_schedule(db, credit.id):
+        applied = round(min(left, row.amount), 2)
+        left = max(0.0, left - applied)
+        fully_paid = applied >= row.amount - 0.005
+        status = InstallmentStatus.paid if fully_paid else (
+            InstallmentStatus.partial if applied > _TOLERANCE else InstallmentStatus.pending
+        )
+        if applied == row.paid_amount and status == row.status:
+            continue
+        changes.append({
+            "id": row.id,
+            "paid_amount": applied,
+            "status": status,
+            "paid_at": (row.paid_at or paid_at) if fully_paid else None,
+        })
+    if changes:
+        db.execute(update(CreditInstallment), changes)
+
+
 def update_credit(db: Session, credit_id: int, payload: CreditUpdate | dict) -> Optional[Credit]:
     db_credit = get_credit(db, credit_id)
     if not db_credit:
@@ -76,6 +219,8 @@ def update_credit(db: Session, credit_id: int, payload: CreditUpdate | dict) ->
         # Actualizar estado si queda en cero
         if remaining == 0:
             db_credit.status = CreditStatus.completed
+        # El plan de cuotas (y la hoja de ruta) debe reflejar el nuevo saldo
+        sync_schedule(db, db_credit)
     if "status" in data and data["status"] is not None:
         db_credit.status = data["status"]
     db.commit()
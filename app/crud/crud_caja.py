@@ -1,25 +1,71 @@
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from app.crud import ledger
 from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.ledger import AccountType
 from app.schemas.caja import CashTransactionCreate
 
-def get_user_balance(db: Session, user_id: int) -> float:
+# Tipos que suman al saldo; el resto (WITHDRAWAL, DISBURSEMENT) restan
+INCOME_TYPES = [TransactionType.DEPOSIT, TransactionType.PAYMENT]
+EXPENSE_TYPES = [TransactionType.WITHDRAWAL, TransactionType.DISBURSEMENT]
+
+# Contrapartida en el libro mayor: los pagos y desembolsos son de la cartera de préstamos
+COUNTER_ACCOUNTS = {
+    TransactionType.PAYMENT: AccountType.CARTERA,
+    TransactionType.DISBURSEMENT: AccountType.CARTERA,
+    TransactionType.DEPOSIT: AccountType.CAPITAL,
+    TransactionType.WITHDRAWAL: AccountType.CAPITAL,
+}
+
+def _cash_entry(accounts: dict, user_id: int, transaction_type: TransactionType, amount: float, credit_id: Optional[int], description: Optional[str]) -> ledger.Entry:
+    """Asiento de un movimiento de caja: cuenta principal del usuario contra su contrapartida."""
+    delta = amount if transaction_type in INCOME_TYPES else -amount
+    principal = accounts[(user_id, AccountType.PRINCIPAL)]
+    counter = accounts[(None, COUNTER_ACCOUNTS[transaction_type])]
+    movement_type = transaction_type.name
+    return ledger.Entry(
+        movement_type,
+        [ledger.Leg(principal, delta, movement_type, description), ledger.Leg(counter, -delta, movement_type, description)],
+        description=description,
+        performed_by_id=user_id,
+        credit_id=credit_id,
+    )
+
+def _post(db: Session, entries: List[ledger.Entry], check_funds: bool) -> None:
+    try:
+        ledger.post_many(db, entries, check_funds=check_funds, commit=False)
+    except ledger.InsufficientFundsError:
+        raise ValueError("Saldo insuficiente para realizar la operación.")
+
+def apply_cash_transaction(db: Session, user_id: int, transaction_type: TransactionType, amount: float, check_funds: bool = True, credit_id: Optional[int] = None, description: Optional[str] = None) -> None:
     """
-    Calcula y devuelve el saldo de un usuario basado en las transacciones de caja.
-    - Suman: Depósitos (DEPOSIT) y Pagos de clientes (PAYMENT).
-    - Restan: Retiros (WITHDRAWAL) y Desembolsos de créditos (DISBURSEMENT).
+    Registra la transacción en la cuenta principal del usuario en el libro mayor, sin hacer commit.
+
+    Debe confirmarse en el mismo commit que la inserción en el historial. Con check_funds,
+    retiros y desembolsos verifican fondos en el mismo UPDATE (ValueError si no alcanzan).
     """
-    total_income = db.query(func.sum(CashTransaction.amount)).filter(
-        CashTransaction.user_id == user_id,
-        CashTransaction.transaction_type.in_([TransactionType.DEPOSIT, TransactionType.PAYMENT])
-    ).scalar() or 0.0
+    keys = [(user_id, AccountType.PRINCIPAL), (None, COUNTER_ACCOUNTS[transaction_type])]
+    accounts = ledger.get_accounts(db, keys)
+    _post(db, [_cash_entry(accounts, user_id, transaction_type, amount, credit_id, description)], check_funds)
 
-    total_expense = db.query(func.sum(CashTransaction.amount)).filter(
-        CashTransaction.user_id == user_id,
-        CashTransaction.transaction_type.in_([TransactionType.WITHDRAWAL, TransactionType.DISBURSEMENT])
-    ).scalar() or 0.0
+def apply_cash_transactions(db: Session, user_id: int, transactions: List[CashTransaction], check_funds: bool = True) -> None:
+    """
+    Registra varias transacciones del usuario en el libro mayor, sin hacer commit.
+
+    Un asiento por transacción (con su crédito y descripción), escritos juntos con
+    `ledger.post_many`: las cuentas se leen una vez y cada saldo se actualiza con el neto.
+    """
+    keys = [(user_id, AccountType.PRINCIPAL)] + [(None, COUNTER_ACCOUNTS[tx.transaction_type]) for tx in transactions]
+    accounts = ledger.get_accounts(db, keys)
+    entries = [
+        _cash_entry(accounts, user_id, tx.transaction_type, tx.amount, tx.credit_id, tx.description)
+        for tx in transactions
+    ]
+    _post(db, entries, check_funds)
 
-    return total_income - total_expense
+def get_user_balance(db: Session, user_id: int) -> float:
+    """Devuelve el saldo de la cuenta principal del usuario (una lectura indexada)."""
+    return ledger.get_balance(db, user_id, AccountType.PRINCIPAL)
 
 def get_cash_transactions_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     """
@@ -30,6 +76,8 @@ def get_cash_transactions_by_user(db: Session, user_id: int, skip: int = 0, limi
 def create_cash_transaction(db: Session, transaction_data: CashTransactionCreate, user_id: int):
     """
     Crea una nueva transacción de caja para un usuario de forma segura.
+    Registra el movimiento en el libro mayor en el mismo commit; lanza ValueError si
+    un retiro o desembolso supera el saldo disponible.
     """
     # Convierte el string del tipo de transacción al Enum correspondiente
     try:
@@ -38,6 +86,12 @@ def create_cash_transaction(db: Session, transaction_data: CashTransactionCreate
         # Esto no debería ocurrir si la validación está en el router, pero es una salvaguarda
         return None
 
+    try:
+        apply_cash_transaction(db, user_id, transaction_type_enum, transaction_data.amount, description=transaction_data.description)
+    except ValueError:
+        db.rollback()
+        raise
+
     db_transaction = CashTransaction(
         user_id=user_id,
         amount=transaction_data.amount,
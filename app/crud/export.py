@@ -0,0 +1,59 @@
+"""
+Consultas de exportación: mismas reglas de alcance y filtros que los listados, sin
+paginar, leyendo columnas (no objetos ORM) desde un cursor del lado del servidor.
+"""
+from datetime import date
+from typing import Iterator, List, Optional
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.crud.client import clients_select
+from app.crud.credit import credits_select
+from app.crud.transaction import transactions_select
+from app.models.cash_transaction import CashTransaction
+from app.models.client import Client
+from app.models.credit import Credit, CreditStatus
+
+EXPORT_MODELS = {"clients": Client, "credits": Credit, "transactions": CashTransaction}
+
+
+def export_select(
+    entity: str,
+    collector_ids: Optional[List[int]] = None,
+    *,
+    collector_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    client_id: Optional[int] = None,
+    status: Optional[CreditStatus] = None,
+    credit_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Optional[Select]:
+    """Consulta de todas las filas visibles de `entity`; None si el alcance es vacío."""
+    if entity == "clients":
+        stmt = clients_select(0, None, collector_id, is_active, collector_ids=collector_ids)
+    elif entity == "credits":
+        stmt = credits_select(0, None, client_id=client_id, collector_ids=collector_ids, status=status)
+    elif entity == "transactions":
+        stmt = transactions_select(
+            0, None, user_ids=collector_ids, credit_id=credit_id, start_date=start_date, end_date=end_date
+        )
+        if stmt is not None:
+            # Orden estable por id (el listado ordena por fecha descendente)
+            stmt = stmt.order_by(None).order_by(CashTransaction.id)
+    else:
+        raise ValueError(f"Entidad no exportable: {entity}")
+    if stmt is None:
+        return None
+    # Solo columnas: sin identity map ni objetos ORM por fila
+    return stmt.with_only_columns(*EXPORT_MODELS[entity].__table__.columns).limit(None).offset(None)
+
+
+def iter_export_rows(db: Session, stmt: Optional[Select], batch_size: int = 1000) -> Iterator[List[tuple]]:
+    """Recorre la consulta en lotes de `batch_size` filas (stream_results en Postgres)."""
+    if stmt is None:
+        return
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
@@ -0,0 +1,108 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+
+
+class IdempotencyConflict(Exception):
+    """La clave ya se usó con otro contenido o la operación original sigue en curso."""
+
+
+def request_hash(endpoint: str, payload: Any) -> str:
+    """Huella del request (endpoint + cuerpo) para detectar claves reutilizadas con otro contenido."""
+    raw = json.dumps({"endpoint": endpoint, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_idempotency_key(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    # Una sola búsqueda por el índice único (user_id, key)
+    return db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).first()
+
+
+def _new_record(user_id: int, key: str, req_hash: str, now: datetime) -> IdempotencyKey:
+    return IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=req_hash,
+        expires_at=now + timedelta(hours=settings.idempotency_ttl_hours),
+    )
+
+
+def reserve_key(db: Session, user_id: int, key: str, req_hash: str) -> IdempotencyKey:
+    """
+    Busca la clave; si no existe (o expiró) la reserva en la sesión actual, sin commit,
+    para que se confirme junto con la operación de dinero.
+
+    Si la fila devuelta tiene status_code, es un reintento: hay que responder lo guardado.
+    Lanza IdempotencyConflict si la clave se usó con otro contenido o sigue en curso.
+    """
+    now = datetime.utcnow()
+    record = get_idempotency_key(db, user_id, key)
+    if record is not None and record.expires_at <= now:
+        db.delete(record)
+        db.flush()
+        record = None
+
+    if record is None:
+        record = _new_record(user_id, key, req_hash, now)
+        try:
+            with db.begin_nested():
+                db.add(record)
+            return record
+        except IntegrityError:
+            # Un request concurrente con la misma clave se confirmó primero
+            record = get_idempotency_key(db, user_id, key)
+            if record is None:
+                raise IdempotencyConflict("Idempotency-Key en uso, reintente más tarde")
+
+    if record.request_hash != req_hash:
+        raise IdempotencyConflict("Idempotency-Key ya usada con otro contenido")
+    if record.status_code is None:
+        raise IdempotencyConflict("La operación con esta Idempotency-Key sigue en curso")
+    return record
+
+
+def save_response(db: Session, user_id: int, key: str, req_hash: str, status_code: int, body: Any) -> None:
+    """
+    Guarda la respuesta de la operación en la misma transacción, sin commit.
+
+    Si el handler hizo rollback (p. ej. reintentó tras un IntegrityError) la reserva se
+    perdió con él y se vuelve a insertar junto con la respuesta.
+    """
+    updated = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    ).update(
+        {IdempotencyKey.status_code: status_code, IdempotencyKey.response_body: json.dumps(body)},
+        synchronize_session=False,
+    )
+    if not updated:
+        record = _new_record(user_id, key, req_hash, datetime.utcnow())
+        record.status_code = status_code
+        record.response_body = json.dumps(body)
+        db.add(record)
+
+
+def release_key(db: Session, user_id: int, key: str) -> None:
+    """Libera una reserva sin respuesta (la operación falló) para que el cliente pueda reintentar."""
+    db.rollback()
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None),
+    ).delete(synchronize_session=False)
+    if deleted:
+        db.commit()
+
+
+def purge_expired(db: Session) -> int:
+    """Elimina las claves vencidas. Devuelve cuántas se borraron."""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,345 @@
+"""
+Libro mayor de partida doble: única fuente de saldos e historial de dinero.
+
+Cada usuario tiene cuentas tipadas (principal y microseguro); las cuentas del sistema
+(capital, cartera, gastos) son la contrapartida de lo que entra o sale de las cajas.
+Toda operación que mueve dinero pasa por `post`, que valida que las partidas sumen
+cero, actualiza los saldos de las cuentas de usuario en orden de id (evita deadlocks
+entre operaciones cruzadas), valida fondos en el mismo UPDATE que descuenta y escribe
+el asiento con sus partidas en un único commit (`post_many` registra varios a la vez).
+`move` es la versión por cajas que usa la API.
+
+Las cuentas del sistema no materializan saldo: todas las operaciones pasan por ellas y
+actualizarlas serializaría cada pago sobre una misma fila. Su saldo es la suma de sus partidas.
+"""
+from typing import NamedTuple, Optional
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.box import Box
+from app.models.ledger import AccountType, LedgerAccount, LedgerEntry, LedgerPosting, USER_ACCOUNT_TYPES
+
+# Tipo de operación -> (tipo de movimiento en la caja origen, tipo en la caja destino)
+MOVEMENT_KINDS = {
+    "TRANSFER": ("TRANSFER_OUT", "TRANSFER_IN"),
+    "WITHDRAWAL": ("WITHDRAWAL", "RECOVERY"),
+    "EXPENSE": ("EXPENSE", None),
+    "LOAN_DISBURSEMENT": ("LOAN_DISBURSEMENT", None),
+    "DEPOSIT": (None, "DEPOSIT"),
+}
+
+# Cuenta del sistema que hace de contrapartida cuando la operación tiene una sola caja
+COUNTER_ACCOUNTS = {
+    "WITHDRAWAL": AccountType.CAPITAL,
+    "EXPENSE": AccountType.GASTOS,
+    "LOAN_DISBURSEMENT": AccountType.CARTERA,
+    "DEPOSIT": AccountType.CAPITAL,
+}
+
+_TOLERANCE = 1e-9
+
+AccountKey = tuple[Optional[int], AccountType]
+
+
+class InsufficientFundsError(ValueError):
+    """La cuenta origen no tiene saldo suficiente para el movimiento."""
+
+
+class Leg(NamedTuple):
+    """Partida a registrar: cuenta, monto con signo y su etiqueta en el historial."""
+    account: LedgerAccount
+    amount: float
+    movement_type: str
+    description: Optional[str] = None
+
+
+def get_accounts(db: Session, keys: list[AccountKey]) -> dict[AccountKey, LedgerAccount]:
+    """
+    Cuentas por (user_id, tipo) en una sola consulta; user_id None son las del sistema.
+    Crea las que todavía no existen.
+    """
+    keys = list(dict.fromkeys(keys))
+    conditions = [
+        and_(LedgerAccount.user_id.is_(None) if user_id is None else LedgerAccount.user_id == user_id,
+             LedgerAccount.account_type == account_type)
+        for user_id, account_type in keys
+    ]
+    found: dict[AccountKey, LedgerAccount] = {}
+    for account in db.scalars(select(LedgerAccount).where(or_(*conditions)).order_by(LedgerAccount.id)):
+        found.setdefault((account.user_id, account.account_type), account)
+
+    for user_id, account_type in keys:
+        if (user_id, account_type) in found:
+            continue
+        try:
+            with db.begin_nested():
+                account = LedgerAccount(user_id=user_id, account_type=account_type, balance=0.0)
+                db.add(account)
+            found[(user_id, account_type)] = account
+        except IntegrityError:
+            # Otra petición la creó en paralelo; usamos la suya
+            found[(user_id, account_type)] = get_accounts(db, [(user_id, account_type)])[(user_id, account_type)]
+    return found
+
+
+def get_account(db: Session, user_id: Optional[int], account_type: AccountType) -> LedgerAccount:
+    """Cuenta del usuario (o del sistema con user_id None); la crea si todavía no existe."""
+    return get_accounts(db, [(user_id, account_type)])[(user_id, account_type)]
+
+
+def get_system_account(db: Session, account_type: AccountType) -> LedgerAccount:
+    if account_type in USER_ACCOUNT_TYPES:
+        raise ValueError(f"{account_type.value} no es una cuenta del sistema")
+    return get_account(db, None, account_type)
+
+
+def get_balances(db: Session, user_ids: list[int]) -> dict[int, dict[AccountType, float]]:
+    """Saldos por usuario y tipo de cuenta en una sola consulta (0 si la cuenta no existe)."""
+    balances = {user_id: {t: 0.0 for t in USER_ACCOUNT_TYPES} for user_id in user_ids}
+    if user_ids:
+        rows = db.execute(
+            select(LedgerAccount.user_id, LedgerAccount.account_type, LedgerAccount.balance)
+            .where(LedgerAccount.user_id.in_(user_ids))
+        ).all()
+        for user_id, account_type, balance in rows:
+            balances[user_id][account_type] = balance
+    return balances
+
+
+def get_balance(db: Session, user_id: int, account_type: AccountType = AccountType.PRINCIPAL) -> float:
+    return get_balances(db, [user_id])[user_id][account_type]
+
+
+def get_system_balance(db: Session, account_type: AccountType) -> float:
+    """Saldo de una cuenta del sistema: la suma de sus partidas."""
+    return db.scalar(
+        select(func.coalesce(func.sum(LedgerPosting.amount), 0.0))
+        .join(LedgerAccount, LedgerAccount.id == LedgerPosting.account_id)
+        .where(LedgerAccount.user_id.is_(None), LedgerAccount.account_type == account_type)
+    ) or 0.0
+
+
+class Entry(NamedTuple):
+    """Asiento pendiente de registrar con `post_many`."""
+    entry_type: str
+    legs: list[Leg]
+    description: Optional[str] = None
+    performed_by_id: Optional[int] = None
+    credit_id: Optional[int] = None
+
+
+def post(
+    db: Session,
+    entry_type: str,
+    legs: list[Leg],
+    *,
+    description: Optional[str] = None,
+    performed_by_id: Optional[int] = None,
+    credit_id: Optional[int] = None,
+    check_funds: bool = True,
+    commit: bool = True,
+) -> LedgerEntry:
+    """
+    Registra un asiento con sus partidas y actualiza los saldos de las cuentas de usuario.
+
+    Las partidas deben sumar cero. Con check_funds, una cuenta de usuario no puede quedar
+    en negativo (InsufficientFundsError); ValueError si los datos son inválidos. En ambos
+    casos no se escribe nada. Con commit=False deja la operación pendiente para
+    confirmarla junto con otros cambios (p. ej. crear el crédito); si falla, no hace
+    rollback y el llamador debe descartar la transacción.
+    """
+    entry = Entry(entry_type, legs, description, performed_by_id, credit_id)
+    return post_many(db, [entry], check_funds=check_funds, commit=commit)[0]
+
+
+def post_many(
+    db: Session,
+    entries: list[Entry],
+    *,
+    check_funds: bool = True,
+    commit: bool = True,
+) -> list[LedgerEntry]:
+    """
+    Registra varios asientos en un solo viaje: un UPDATE por cuenta de usuario con el
+    neto de todos ellos, los asientos en un único flush y todas las partidas en un INSERT.
+
+    Cada asiento conserva su tipo, descripción y crédito. Mismas validaciones, errores y
+    uso de commit que `post`; con check_funds se valida el neto de cada cuenta.
+    """
+    for entry in entries:
+        if len(entry.legs) < 2:
+            raise ValueError("Un asiento necesita al menos dos partidas")
+        if any(leg.amount is None or leg.amount == 0 for leg in entry.legs):
+            raise ValueError("Las partidas deben tener monto distinto de cero")
+        if abs(sum(leg.amount for leg in entry.legs)) > _TOLERANCE:
+            raise ValueError("Las partidas del asiento no suman cero")
+
+    deltas: dict[int, float] = {}
+    accounts: dict[int, LedgerAccount] = {}
+    for entry in entries:
+        for leg in entry.legs:
+            if leg.account.user_id is not None:
+                deltas[leg.account.id] = deltas.get(leg.account.id, 0.0) + leg.amount
+                accounts[leg.account.id] = leg.account
+
+    try:
+        # El UPDATE bloquea la fila hasta el commit; siempre en orden ascendente de id
+        for account_id in sorted(deltas):
+            delta = deltas[account_id]
+            if abs(delta) <= _TOLERANCE:
+                continue
+            stmt = update(LedgerAccount).where(LedgerAccount.id == account_id)
+            if check_funds and delta < 0:
+                # Descuento y validación de fondos en la misma sentencia
+                stmt = stmt.where(LedgerAccount.balance + delta >= 0)
+            result = db.execute(
+                stmt.values(balance=LedgerAccount.balance + delta, updated_at=func.now()),
+                execution_options={"synchronize_session": False},
+            )
+            if result.rowcount != 1:
+                if check_funds and delta < 0:
+                    raise InsufficientFundsError("Fondos insuficientes en la caja de origen")
+                raise ValueError(f"Cuenta no encontrada (ID: {account_id})")
+
+        rows = [
+            LedgerEntry(
+                entry_type=entry.entry_type,
+                description=entry.description,
+                performed_by_id=entry.performed_by_id,
+                credit_id=entry.credit_id,
+            )
+            for entry in entries
+        ]
+        db.add_all(rows)
+        db.flush()
+        # Partidas en un solo INSERT (executemany), sin recargarlas
+        db.execute(insert(LedgerPosting), [
+            {"entry_id": row.id, "account_id": leg.account.id, "amount": leg.amount,
+             "movement_type": leg.movement_type, "description": leg.description}
+            for row, entry in zip(rows, entries)
+            for leg in entry.legs
+        ])
+
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+    except Exception:
+        # Con commit=False la transacción es del llamador: él decide el rollback
+        if commit:
+            db.rollback()
+        raise
+    # Los saldos se actualizaron con UPDATE directo: las cuentas cargadas deben releerse
+    for account in accounts.values():
+        db.expire(account)
+    return rows
+
+
+def move(
+    db: Session,
+    from_box: Optional[int],
+    to_box: Optional[int],
+    amount: float,
+    kind: str,
+    *,
+    performed_by_id: Optional[int] = None,
+    from_description: Optional[str] = None,
+    to_description: Optional[str] = None,
+    is_insurance: bool = False,
+    commit: bool = True,
+) -> LedgerEntry:
+    """
+    Mueve `amount` de la caja `from_box` a la caja `to_box` (ids; cualquiera puede ser None).
+
+    La caja faltante se reemplaza por la cuenta del sistema que corresponde al tipo de
+    operación. Devuelve el asiento. Mismos errores y uso de commit que `post`.
+    """
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Tipo de movimiento no válido: {kind}")
+    if amount is None or amount <= 0:
+        raise ValueError("El monto debe ser positivo")
+    if from_box is None and to_box is None:
+        raise ValueError("Se requiere al menos una caja")
+    if from_box is not None and from_box == to_box:
+        raise ValueError("La caja origen y destino deben ser distintas")
+
+    box_ids = [box_id for box_id in (from_box, to_box) if box_id is not None]
+    owners = dict(db.execute(select(Box.id, Box.user_id).where(Box.id.in_(box_ids))).all())
+    for box_id in box_ids:
+        if box_id not in owners:
+            raise ValueError(f"Caja no encontrada (ID: {box_id})")
+
+    account_type = AccountType.MICROSEGURO if is_insurance else AccountType.PRINCIPAL
+    keys = [
+        (None, COUNTER_ACCOUNTS[kind]) if box_id is None else (owners[box_id], account_type)
+        for box_id in (from_box, to_box)
+    ]
+    accounts = get_accounts(db, keys)
+    out_type, in_type = MOVEMENT_KINDS[kind]
+    legs = [
+        Leg(accounts[keys[0]], -amount, out_type or kind, from_description),
+        Leg(accounts[keys[1]], amount, in_type or kind, to_description),
+    ]
+    return post(
+        db, kind, legs,
+        description=from_description or to_description,
+        performed_by_id=performed_by_id,
+        commit=commit,
+    )
+
+
+def adjust_balance(
+    db: Session,
+    user_id: int,
+    account_type: AccountType,
+    target: float,
+    *,
+    performed_by_id: Optional[int] = None,
+    commit: bool = True,
+) -> Optional[LedgerEntry]:
+    """Lleva la cuenta del usuario al saldo `target` con un asiento de ajuste contra capital."""
+    accounts = get_accounts(db, [(user_id, account_type), (None, AccountType.CAPITAL)])
+    account, capital = accounts[(user_id, account_type)], accounts[(None, AccountType.CAPITAL)]
+    delta = target - account.balance
+    if abs(delta) <= _TOLERANCE:
+        return None
+    return post(
+        db, "ADJUSTMENT",
+        [Leg(account, delta, "ADJUSTMENT", "Corrección manual"), Leg(capital, -delta, "ADJUSTMENT")],
+        description="Corrección manual de saldo",
+        performed_by_id=performed_by_id,
+        check_funds=False,
+        commit=commit,
+    )
+
+
+def reconcile(db: Session, fix: bool = False, tolerance: float = 1e-6) -> list[dict]:
+    """
+    Compara el saldo materializado de cada cuenta de usuario con la suma de sus partidas.
+    Devuelve las diferencias encontradas; con fix=True corrige los saldos y hace commit.
+    """
+    totals = dict(
+        db.execute(
+            select(LedgerPosting.account_id, func.coalesce(func.sum(LedgerPosting.amount), 0.0))
+            .group_by(LedgerPosting.account_id)
+        ).all()
+    )
+    drifts = []
+    for account in db.scalars(select(LedgerAccount).where(LedgerAccount.user_id.is_not(None)).order_by(LedgerAccount.id)):
+        expected = totals.get(account.id, 0.0) or 0.0
+        if abs(account.balance - expected) <= tolerance:
+            continue
+        drifts.append({
+            "account_id": account.id,
+            "user_id": account.user_id,
+            "account_type": account.account_type.value,
+            "stored": account.balance,
+            "ledger": expected,
+            "drift": account.balance - expected,
+        })
+        if fix:
+            account.balance = expected
+    if fix and drifts:
+        db.commit()
+    return drifts
@@ -0,0 +1,83 @@
+"""
+Hoja de ruta del día (GET /route/today): créditos con cuotas vencidas o que vencen hoy.
+
+Una sola consulta parte del índice (due_date, status) de credit_installments, agrupa las
+cuotas abiertas por crédito y trae los datos del cliente y la fecha del último pago.
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.client import Client
+from app.models.credit import Credit, CreditInstallment, CreditStatus, InstallmentStatus
+
+OPEN_STATUSES = (InstallmentStatus.pending, InstallmentStatus.partial)
+
+
+def route_select(day: date, collector_ids: Optional[List[int]] = None) -> Optional[Select]:
+    """
+    Paradas de la ruta al día `day` dentro del alcance (collector_ids None = admin),
+    ordenadas por cobrador y orden de ruta (los clientes sin orden van al final).
+
+    Devuelve None si el alcance es vacío.
+    """
+    if collector_ids is not None and len(collector_ids) == 0:
+        return None
+    open_amount = CreditInstallment.amount - CreditInstallment.paid_amount
+    due = (
+        select(
+            CreditInstallment.credit_id,
+            func.sum(open_amount).label("expected_amount"),
+            func.sum(case((CreditInstallment.due_date < day, open_amount), else_=0.0)).label("arrears_amount"),
+            func.sum(case((CreditInstallment.due_date < day, 1), else_=0)).label("overdue_installments"),
+            func.min(CreditInstallment.due_date).label("oldest_due_date"),
+        )
+        .where(CreditInstallment.due_date <= day, CreditInstallment.status.in_(OPEN_STATUSES))
+        .group_by(CreditInstallment.credit_id)
+        .subquery()
+    )
+    # Usa el índice (credit_id, created_at) de cash_transactions
+    last_payment = (
+        select(func.max(CashTransaction.created_at))
+        .where(CashTransaction.credit_id == Credit.id, CashTransaction.transaction_type == TransactionType.PAYMENT)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            Credit.id.label("credit_id"),
+            Client.id.label("client_id"),
+            Client.full_name.label("client_name"),
+            Client.phone,
+            Client.address,
+            Client.city,
+            Client.latitude,
+            Client.longitude,
+            Client.collector_id,
+            Client.route_order,
+            Credit.daily_payment,
+            Credit.remaining_amount,
+            due.c.expected_amount,
+            due.c.arrears_amount,
+            due.c.overdue_installments,
+            due.c.oldest_due_date,
+            last_payment.label("last_payment_at"),
+        )
+        .join(Credit, Credit.id == due.c.credit_id)
+        .join(Client, Client.id == Credit.client_id)
+        .where(Credit.status == CreditStatus.active, Client.is_active == True)
+    )
+    if collector_ids is not None:
+        stmt = stmt.where(Client.collector_id.in_(collector_ids))
+    return stmt.order_by(
+        Client.collector_id, Client.route_order.is_(None), Client.route_order, Client.id, Credit.id,
+    )
+
+
+def get_route(db: Session, day: date, collector_ids: Optional[List[int]] = None) -> list:
+    stmt = route_select(day, collector_ids)
+    if stmt is None:
+        return []
+    return db.execute(stmt).all()
@@ -1,45 +1,159 @@
-from sqlalchemy import func
+from sqlalchemy import func, case, select, literal, true, union_all
 from app.models.cash_transaction import CashTransaction
 from app.models.client import Client
 from app.models.credit import Credit, CreditStatus
+from app.models.user import User, RoleType
+from app.crud.transaction import created_at_range
 
-def get_stats(db, start_date=None, end_date=None, user_ids=None):
-    # Consultas base
-    tx_query = db.query(CashTransaction)
-    client_query = db.query(Client)
-    credit_query = db.query(Credit)
-    
-    # 1. Filtrar por usuarios (si se especifica lista)
+
+def _tx_filters(start_date=None, end_date=None, user_ids=None):
+    filters = []
+    if user_ids is not None:
+        filters.append(CashTransaction.user_id.in_(user_ids))
+    # Filtrar por fechas (Aplica principalmente a transacciones/cobros)
+    filters.extend(created_at_range(start_date, end_date))
+    return filters
+
+
+def _supervisor_key():
+    # Un supervisor agrupa sus propios movimientos bajo su id; un cobrador, bajo su supervisor
+    return case((User.role == RoleType.SUPERVISOR, User.id), else_=User.supervisor_id)
+
+
+def _breakdown_select(group_by, start_date=None, end_date=None, user_ids=None):
+    """Desglose por día, cobrador o supervisor en una sola consulta agrupada."""
+    tx_filters = _tx_filters(start_date, end_date, user_ids)
+
+    if group_by == "day":
+        day = func.date(CashTransaction.created_at)
+        return (
+            select(
+                day.label("key"),
+                func.count(CashTransaction.id).label("total_cobranzas"),
+                func.coalesce(func.sum(CashTransaction.amount), 0).label("monto_total"),
+            )
+            .where(*tx_filters)
+            .group_by(day)
+            .order_by(day)
+        )
+
+    client_filters = [Client.is_active == True]
+    if user_ids is not None:
+        client_filters.append(Client.collector_id.in_(user_ids))
+
+    # Cada tabla aporta filas con la misma forma; luego se agrupan por clave
+    tx_part = select(
+        CashTransaction.user_id.label("collector_id"),
+        CashTransaction.amount.label("monto"),
+        literal(1).label("cobranza"),
+        literal(0).label("cliente"),
+        literal(0).label("pendiente"),
+        literal(0).label("realizada"),
+    ).where(*tx_filters)
+    client_part = select(
+        Client.collector_id.label("collector_id"),
+        literal(0.0).label("monto"),
+        literal(0).label("cobranza"),
+        literal(1).label("cliente"),
+        literal(0).label("pendiente"),
+        literal(0).label("realizada"),
+    ).where(*client_filters)
+    credit_part = select(
+        Client.collector_id.label("collector_id"),
+        literal(0.0).label("monto"),
+        literal(0).label("cobranza"),
+        literal(0).label("cliente"),
+        case((Credit.status == CreditStatus.active, 1), else_=0).label("pendiente"),
+        case((Credit.status == CreditStatus.completed, 1), else_=0).label("realizada"),
+    ).outerjoin(Client, Client.id == Credit.client_id)
     if user_ids is not None:
-        tx_query = tx_query.filter(CashTransaction.user_id.in_(user_ids))
-        client_query = client_query.filter(Client.collector_id.in_(user_ids))
-        # Para créditos, filtramos por el cobrador del cliente asociado
-        credit_query = credit_query.join(Client).filter(Client.collector_id.in_(user_ids))
-
-    # 2. Filtrar por fechas (Aplica principalmente a transacciones/cobros)
-    if start_date:
-        tx_query = tx_query.filter(func.date(CashTransaction.created_at) >= start_date)
-    if end_date:
-        tx_query = tx_query.filter(func.date(CashTransaction.created_at) <= end_date)
-
-    # 3. Calcular totales
-    # Total cobrado (suma de montos)
-    total_cobrado = tx_query.with_entities(func.sum(CashTransaction.amount)).scalar() or 0
-    
-    # Cantidad de cobros realizados
-    total_transacciones = tx_query.count()
-    
-    # Totales de clientes y créditos (estos suelen ser totales históricos, no por rango de fecha, salvo creación)
+        credit_part = credit_part.where(Client.collector_id.in_(user_ids))
+
+    parts = union_all(tx_part, client_part, credit_part).subquery()
+    if group_by == "collector":
+        key = parts.c.collector_id
+        stmt = select(key.label("key"))
+    else:
+        key = _supervisor_key()
+        stmt = select(key.label("key")).join(User, User.id == parts.c.collector_id)
+
+    return (
+        stmt.add_columns(
+            func.sum(parts.c.cobranza).label("total_cobranzas"),
+            func.sum(parts.c.cliente).label("total_clientes"),
+            func.sum(parts.c.pendiente).label("total_pendientes"),
+            func.sum(parts.c.realizada).label("total_realizadas"),
+            func.coalesce(func.sum(parts.c.monto), 0).label("monto_total"),
+        )
+        .select_from(parts)
+        .group_by(key)
+        .order_by(key)
+    )
+
+
+def _breakdown_result(group_by, rows):
+    if group_by == "day":
+        return [
+            {"key": str(r.key), "total_cobranzas": r.total_cobranzas, "monto_total": r.monto_total}
+            for r in rows
+        ]
+    return [dict(r._mapping) for r in rows]
+
+
+def _totals_select(start_date=None, end_date=None, user_ids=None):
+    # 1. Agregados por tabla (una fila cada uno), unidos en una única consulta
+    tx_agg = select(
+        func.count(CashTransaction.id).label("total_cobranzas"),
+        func.coalesce(func.sum(CashTransaction.amount), 0).label("monto_total"),
+    ).where(*_tx_filters(start_date, end_date, user_ids)).subquery()
+
     # Solo contamos clientes ACTIVOS para que el número sea real
-    total_clientes = client_query.filter(Client.is_active == True).count()
-    active_credits = credit_query.filter(Credit.status == CreditStatus.active).count()
-    completed_credits = credit_query.filter(Credit.status == CreditStatus.completed).count()
+    client_agg = select(func.count(Client.id).label("total_clientes")).where(Client.is_active == True)
+
+    # Para créditos, filtramos por el cobrador del cliente asociado
+    credit_agg = select(
+        func.coalesce(func.sum(case((Credit.status == CreditStatus.active, 1), else_=0)), 0).label("total_pendientes"),
+        func.coalesce(func.sum(case((Credit.status == CreditStatus.completed, 1), else_=0)), 0).label("total_realizadas"),
+    )
+
+    if user_ids is not None:
+        client_agg = client_agg.where(Client.collector_id.in_(user_ids))
+        credit_agg = credit_agg.join(Client, Client.id == Credit.client_id).where(Client.collector_id.in_(user_ids))
+    client_agg = client_agg.subquery()
+    credit_agg = credit_agg.subquery()
+
+    return (
+        select(tx_agg, client_agg, credit_agg)
+        .select_from(tx_agg.join(client_agg, true()).join(credit_agg, true()))
+    )
 
-        # Cambio automático forzado por sincronización (Copilot 2025-12-31)
+
+def _totals_result(totals):
     return {
-        "total_cobranzas": total_transacciones,
-        "total_clientes": total_clientes,
-        "total_pendientes": active_credits,
-        "total_realizadas": completed_credits,
-        "monto_total": total_cobrado,
+        "total_cobranzas": totals.total_cobranzas,
+        "total_clientes": totals.total_clientes,
+        "total_pendientes": totals.total_pendientes,
+        "total_realizadas": totals.total_realizadas,
+        "monto_total": totals.monto_total,
     }
+
+
+def get_stats(db, start_date=None, end_date=None, user_ids=None, group_by=None):
+    result = _totals_result(db.execute(_totals_select(start_date, end_date, user_ids)).one())
+
+    # 2. Desglose opcional (segunda consulta agrupada)
+    if group_by:
+        rows = db.execute(_breakdown_select(group_by, start_date, end_date, user_ids)).all()
+        result["group_by"] = group_by
+        result["breakdown"] = _breakdown_result(group_by, rows)
+    return result
+
+
+async def get_stats_async(db, start_date=None, end_date=None, user_ids=None, group_by=None):
+    """Igual que get_stats, sobre una AsyncSession."""
+    result = _totals_result((await db.execute(_totals_select(start_date, end_date, user_ids))).one())
+    if group_by:
+        rows = (await db.execute(_breakdown_select(group_by, start_date, end_date, user_ids))).all()
+        result["group_by"] = group_by
+        result["breakdown"] = _breakdown_result(group_by, rows)
+    return result
@@ -0,0 +1,116 @@
+"""
+Cambios para la sincronización incremental de los dispositivos (GET /sync).
+
+El cursor es el instante (UTC) en que empezó la sincronización anterior. Cada
+consulta toma las filas con updated_at (o created_at, para movimientos) desde el
+cursor menos `settings.sync_overlap_seconds`: así no se pierden escrituras que
+se confirmaron después de leerse el cursor, a costa de reenviar algunas filas
+(el dispositivo hace upsert por id).
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, raiseload
+
+from app.core.config import settings
+from app.models.box import Box
+from app.models.cash_transaction import CashTransaction
+from app.models.client import Client
+from app.models.credit import Credit
+from app.models.ledger import LedgerPosting
+from app.models.sync import SyncTombstone
+from app.crud.box import box_movements_select
+
+_CURSOR_PREFIX = "v1:"
+
+
+def encode_cursor(moment: datetime) -> str:
+    return base64.urlsafe_b64encode((_CURSOR_PREFIX + moment.isoformat()).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """Instante de un cursor emitido por encode_cursor; ValueError si no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if not raw.startswith(_CURSOR_PREFIX):
+        raise ValueError("Cursor inválido")
+    return datetime.fromisoformat(raw[len(_CURSOR_PREFIX):])
+
+
+def _scoped(stmt, column, collector_ids: Optional[List[int]]):
+    return stmt if collector_ids is None else stmt.where(column.in_(collector_ids))
+
+
+def get_changes(db: Session, collector_ids: Optional[List[int]], since: Optional[datetime]) -> dict:
+    """
+    Clientes, créditos, transacciones, cajas y movimientos cambiados desde `since`
+    dentro del alcance (collector_ids None = admin), más las bajas (tombstones).
+
+    Sin `since`, o con un cursor más viejo que la retención de tombstones, devuelve la
+    cartera activa completa y el historial de los últimos `settings.sync_history_days`
+    días (`full_resync`). El dispositivo aplica primero las bajas y después los upserts.
+    """
+    now = datetime.utcnow()
+    retention = timedelta(days=settings.sync_tombstone_retention_days)
+    full_resync = since is None or since < now - retention
+    if full_resync:
+        since = None
+        history_since = now - timedelta(days=settings.sync_history_days)
+    else:
+        since = since - timedelta(seconds=settings.sync_overlap_seconds)
+        history_since = since
+    # Columnas con zona horaria (server_default now()): comparar con un instante UTC explícito
+    history_since_tz = history_since.replace(tzinfo=timezone.utc)
+
+    no_lazy = raiseload("*", sql_only=True)
+    clients_stmt = _scoped(select(Client), Client.collector_id, collector_ids).where(Client.is_active == True)
+    credits_stmt = _scoped(
+        select(Credit).join(Client, Client.id == Credit.client_id), Client.collector_id, collector_ids
+    ).where(Client.is_active == True)
+    boxes_stmt = _scoped(select(Box), Box.user_id, collector_ids)
+    if since is not None:
+        clients_stmt = clients_stmt.where(Client.updated_at >= since)
+        credits_stmt = credits_stmt.where(Credit.updated_at >= since)
+        boxes_stmt = boxes_stmt.where(Box.last_updated >= since.replace(tzinfo=timezone.utc))
+    transactions_stmt = _scoped(select(CashTransaction), CashTransaction.user_id, collector_ids).where(
+        CashTransaction.updated_at >= history_since
+    )
+    movements_stmt = _scoped(box_movements_select(), Box.user_id, collector_ids).where(
+        LedgerPosting.created_at >= history_since_tz
+    )
+
+    deleted = {"clients": [], "credits": []}
+    if since is not None:
+        tombstones = db.execute(
+            _scoped(
+                select(SyncTombstone.entity_type, SyncTombstone.entity_id), SyncTombstone.collector_id, collector_ids
+            ).where(SyncTombstone.deleted_at >= since).order_by(SyncTombstone.id)
+        ).all()
+        for entity_type, entity_id in tombstones:
+            bucket = deleted[f"{entity_type}s"]
+            if entity_id not in bucket:
+                bucket.append(entity_id)
+
+    return {
+        "cursor": encode_cursor(now),
+        "full_resync": full_resync,
+        "clients": db.scalars(clients_stmt.options(no_lazy).order_by(Client.id)).all(),
+        "credits": db.scalars(credits_stmt.options(no_lazy).order_by(Credit.id)).all(),
+        "transactions": db.scalars(transactions_stmt.options(no_lazy).order_by(CashTransaction.id)).all(),
+        "boxes": db.scalars(boxes_stmt.options(no_lazy).order_by(Box.id)).all(),
+        "box_movements": db.execute(movements_stmt.order_by(LedgerPosting.id)).all(),
+        "deleted": deleted,
+    }
+
+
+def purge_tombstones(db: Session) -> int:
+    """Elimina los tombstones más viejos que la retención; devuelve cuántos borró."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.sync_tombstone_retention_days)
+    deleted = db.query(SyncTombstone).filter(SyncTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -1,18 +1,37 @@
+from collections import defaultdict
 from typing import Optional, List
-from datetime import date
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from datetime import date, datetime, time, timedelta
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, update, select, Select
+from sqlalchemy.exc import IntegrityError
 from app.models.cash_transaction import CashTransaction, TransactionType
 from app.models.credit import Credit, CreditStatus
-from app.schemas.transaction import TransactionCreate
+from app.models.client import Client
+from app.schemas.transaction import TransactionCreate, TransactionBatchItem
+from app.crud.crud_caja import apply_cash_transaction, apply_cash_transactions
+from app.crud.credit import apply_payments_to_schedule
+
+
+def created_at_range(start_date: Optional[date] = None, end_date: Optional[date] = None) -> list:
+    """Filtros por fecha como rango semiabierto [start, end + 1 día) sobre created_at.
+
+    Compara la columna directamente (sin func.date) para que el motor pueda usar
+    los índices (user_id, created_at) y (credit_id, created_at).
+    """
+    filters = []
+    if start_date:
+        filters.append(CashTransaction.created_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        filters.append(CashTransaction.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    return filters
 
 
 def get_transaction(db: Session, tx_id: int) -> Optional[CashTransaction]:
     return db.query(CashTransaction).filter(CashTransaction.id == tx_id).first()
 
 
-def get_transactions(
-    db: Session,
+def transactions_select(
     skip: int = 0,
     limit: int = 100,
     *,
@@ -20,36 +39,90 @@ def get_transactions(
     credit_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-) -> list[CashTransaction]:
-    query = db.query(CashTransaction)
+) -> Optional[Select]:
+    """Consulta del listado de transacciones (compartida por las versiones sync y async).
+
+    Devuelve None si el alcance es vacío.
+    """
+    stmt = select(CashTransaction)
     if user_ids is not None:
         if len(user_ids) == 0:
-            return []
-        query = query.filter(CashTransaction.user_id.in_(user_ids))
+            return None
+        stmt = stmt.where(CashTransaction.user_id.in_(user_ids))
     if credit_id is not None:
-        query = query.filter(CashTransaction.credit_id == credit_id)
-    if start_date:
-        query = query.filter(func.date(CashTransaction.created_at) >= start_date)
-    if end_date:
-        query = query.filter(func.date(CashTransaction.created_at) <= end_date)
-    return query.order_by(CashTransaction.created_at.desc()).offset(skip).limit(limit).all()
+        stmt = stmt.where(CashTransaction.credit_id == credit_id)
+    stmt = stmt.where(*created_at_range(start_date, end_date))
+    # El listado no usa relaciones: cualquier carga perezosa es un N+1 y falla en vez de consultar
+    stmt = stmt.options(raiseload("*", sql_only=True))
+    return stmt.order_by(CashTransaction.created_at.desc()).offset(skip).limit(limit)
+
+
+def get_transactions(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    user_ids: Optional[List[int]] = None,
+    credit_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> list[CashTransaction]:
+    stmt = transactions_select(
+        skip, limit, user_ids=user_ids, credit_id=credit_id, start_date=start_date, end_date=end_date
+    )
+    if stmt is None:
+        return []
+    return list(db.scalars(stmt).all())
+
+
+async def get_transactions_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    user_ids: Optional[List[int]] = None,
+    credit_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> list[CashTransaction]:
+    """Igual que get_transactions, sobre una AsyncSession."""
+    stmt = transactions_select(
+        skip, limit, user_ids=user_ids, credit_id=credit_id, start_date=start_date, end_date=end_date
+    )
+    if stmt is None:
+        return []
+    return list((await db.scalars(stmt)).all())
+
 
+def _check_payment(amount: float, remaining: float) -> None:
+    if amount <= 0:
+        raise ValueError("Payment amount must be positive")
+    if amount > remaining + 1e-9:
+        raise ValueError("Payment amount exceeds remaining balance")
 
-def create_transaction(db: Session, user_id: int, tx: TransactionCreate) -> CashTransaction:
-    """Crea una transacción y aplica efectos colaterales si corresponde (ej: pago de crédito)."""
+
+def create_transaction(db: Session, user_id: int, tx: TransactionCreate, commit: bool = True) -> CashTransaction:
+    """
+    Crea una transacción y aplica efectos colaterales si corresponde (ej: pago de crédito).
+    Con commit=False solo hace flush y deja la confirmación al llamador.
+    """
     # Validaciones básicas
     if tx.transaction_type == TransactionType.PAYMENT:
         if not tx.credit_id:
             raise ValueError("Payment transactions require credit_id")
-        credit = db.query(Credit).filter(Credit.id == tx.credit_id).first()
+        # db.get reutiliza el crédito si el endpoint ya lo cargó para validar permisos
+        credit = db.get(Credit, tx.credit_id)
         if not credit:
             raise ValueError("Credit not found")
         if credit.remaining_amount is None:
             credit.remaining_amount = credit.total_amount or 0.0
-        if tx.amount <= 0:
-            raise ValueError("Payment amount must be positive")
-        if tx.amount > credit.remaining_amount + 1e-9:
-            raise ValueError("Payment amount exceeds remaining balance")
+        _check_payment(tx.amount, credit.remaining_amount)
+
+    # Asiento en el libro mayor, en el mismo commit que la transacción
+    apply_cash_transaction(
+        db, user_id, tx.transaction_type, tx.amount, check_funds=False,
+        credit_id=tx.credit_id, description=tx.description,
+    )
 
     db_tx = CashTransaction(
         user_id=user_id,
@@ -60,14 +133,147 @@ def create_transaction(db: Session, user_id: int, tx: TransactionCreate) -> Cash
     )
     db.add(db_tx)
 
-    # Efecto: si es pago, reducir saldo y cerrar si llega a cero
-    if tx.transaction_type == TransactionType.PAYMENT and tx.credit_id:
-        credit = db.query(Credit).filter(Credit.id == tx.credit_id).first()
-        if credit:
-            credit.remaining_amount = max(0.0, (credit.remaining_amount or 0.0) - tx.amount)
-            if credit.remaining_amount == 0.0:
-                credit.status = CreditStatus.completed
+    # Efecto: si es pago, reducir saldo y cerrar si llega a cero (el crédito ya está cargado)
+    if tx.transaction_type == TransactionType.PAYMENT:
+        credit.remaining_amount = max(0.0, (credit.remaining_amount or 0.0) - tx.amount)
+        if credit.remaining_amount == 0.0:
+            credit.status = CreditStatus.completed
+        # Plan de cuotas: el pago cubre las cuotas abiertas más antiguas
+        apply_payments_to_schedule(db, {credit.id: tx.amount})
 
-    db.commit()
-    db.refresh(db_tx)
+    if commit:
+        db.commit()
+        db.refresh(db_tx)
+    else:
+        db.flush()
     return db_tx
+
+
+def create_transactions_batch(
+    db: Session,
+    user_id: int,
+    items: List[TransactionBatchItem],
+    collector_ids: Optional[List[int]] = None,
+    payments_only: bool = False,
+    _retry: bool = True,
+) -> list[dict]:
+    """Registra un lote de transacciones con un único commit y devuelve un resultado por ítem.
+
+    - Los `client_ref` ya registrados por el usuario (reintentos del dispositivo) o repetidos
+      dentro del lote se devuelven como "duplicate" con el id existente, sin volver a aplicarse.
+    - Los créditos referenciados se cargan (y bloquean) en una sola consulta IN; los
+      saldos restantes y estados se actualizan en bloque.
+    - Un ítem inválido se reporta como "error" sin afectar al resto del lote.
+    - collector_ids limita los créditos permitidos (None = sin restricción).
+    - payments_only rechaza los ítems que no son pagos (usuarios que no son admin).
+    """
+    results: list[Optional[dict]] = [None] * len(items)
+
+    # 1. Claves ya registradas por este usuario en una sola consulta (índice user_id, client_ref)
+    refs = {item.client_ref for item in items}
+    existing = dict(
+        db.query(CashTransaction.client_ref, CashTransaction.id)
+        .filter(CashTransaction.user_id == user_id, CashTransaction.client_ref.in_(refs))
+        .all()
+    )
+
+    # 2. Créditos referenciados en una sola consulta, bloqueados hasta el commit
+    credit_ids = {item.credit_id for item in items if item.credit_id is not None}
+    credits = {}
+    if credit_ids:
+        rows = (
+            db.query(Credit.id, Credit.remaining_amount, Credit.total_amount, Credit.status, Client.collector_id)
+            .outerjoin(Client, Client.id == Credit.client_id)
+            .filter(Credit.id.in_(credit_ids))
+            .with_for_update(of=Credit)
+            .all()
+        )
+        credits = {
+            r.id: {
+                "remaining": r.remaining_amount if r.remaining_amount is not None else (r.total_amount or 0.0),
+                "status": r.status,
+                "collector_id": r.collector_id,
+            }
+            for r in rows
+        }
+
+    # 3. Validación en memoria, acumulando el saldo restante de cada crédito
+    first_index = {}
+    new_txs = []
+    paid = defaultdict(float)
+    touched = set()
+    for i, item in enumerate(items):
+        if item.client_ref in existing:
+            results[i] = {"client_ref": item.client_ref, "status": "duplicate", "transaction_id": existing[item.client_ref]}
+            continue
+        if item.client_ref in first_index:
+            results[i] = {"client_ref": item.client_ref, "status": "duplicate"}
+            continue
+        first_index[item.client_ref] = i
+
+        try:
+            if payments_only and item.transaction_type != TransactionType.PAYMENT:
+                raise ValueError(f"Only admins can register {item.transaction_type.value} transactions")
+            credit = None
+            if item.credit_id is not None:
+                credit = credits.get(item.credit_id)
+                if credit is None:
+                    raise ValueError("Credit not found")
+                if collector_ids is not None and credit["collector_id"] not in collector_ids:
+                    raise ValueError("Not enough permissions for this credit")
+            if item.transaction_type == TransactionType.PAYMENT:
+                if credit is None:
+                    raise ValueError("Payment transactions require credit_id")
+                _check_payment(item.amount, credit["remaining"])
+            elif item.amount <= 0:
+                raise ValueError("Amount must be positive")
+        except ValueError as e:
+            results[i] = {"client_ref": item.client_ref, "status": "error", "detail": str(e)}
+            continue
+
+        if item.transaction_type == TransactionType.PAYMENT:
+            credit["remaining"] = max(0.0, credit["remaining"] - item.amount)
+            if credit["remaining"] == 0.0:
+                credit["status"] = CreditStatus.completed
+            touched.add(item.credit_id)
+            paid[item.credit_id] += item.amount
+        new_txs.append((i, CashTransaction(
+            user_id=user_id,
+            credit_id=item.credit_id,
+            amount=item.amount,
+            transaction_type=item.transaction_type,
+            description=item.description,
+            client_ref=item.client_ref,
+        )))
+
+    if not new_txs:
+        db.rollback()  # libera los bloqueos de créditos
+    else:
+        try:
+            # 4. Libro mayor: un asiento por ítem, escritos juntos (un UPDATE de saldo y dos INSERT)
+            apply_cash_transactions(db, user_id, [tx for _, tx in new_txs], check_funds=False)
+            db.add_all([tx for _, tx in new_txs])
+            if touched:
+                # UPDATE en bloque por clave primaria
+                db.execute(update(Credit), [
+                    {"id": cid, "remaining_amount": credits[cid]["remaining"], "status": credits[cid]["status"]}
+                    for cid in touched
+                ])
+                apply_payments_to_schedule(db, paid)
+            db.flush()
+            ids = {tx.client_ref: tx.id for _, tx in new_txs}
+            db.commit()
+        except IntegrityError:
+            # Otro envío del mismo lote se confirmó en paralelo: reprocesar ve sus claves
+            db.rollback()
+            if not _retry:
+                raise
+            return create_transactions_batch(db, user_id, items, collector_ids, payments_only, _retry=False)
+        for i, tx in new_txs:
+            results[i] = {"client_ref": tx.client_ref, "status": "created", "transaction_id": ids[tx.client_ref]}
+
+    # Repetidos dentro del lote apuntan a la transacción de su primera aparición
+    for i, result in enumerate(results):
+        if result["status"] == "duplicate" and "transaction_id" not in result:
+            result["transaction_id"] = results[first_index[result["client_ref"]]].get("transaction_id")
+    return results
@@ -2,7 +2,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_password, password_needs_rehash
 from app.schemas.user import UserCreate
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
@@ -43,4 +43,9 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     if not verify_password(password, user.hashed_password):
         return None
+    # Si cambió el costo de bcrypt, se actualiza el hash aprovechando el password en claro
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = get_password_hash(password)
+        db.commit()
+        db.refresh(user)
     return user
\ No newline at end of file
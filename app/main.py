@@ -1,11 +1,19 @@
-from fastapi import FastAPI
+import os
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from app.core import settings
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
 from app.api.v1 import items_router, users_router, clients_router, credits_router, transactions_router
 from app.api.v1.box import router as caja_router
 from app.api.v1.auth import router as auth_router
 from app.api.v1.stats import router as stats_router
+from app.api.v1.sync import router as sync_router
+from app.api.v1.export import router as export_router
+from app.api.v1.route import router as route_router
 
 # Nota: La creación de tablas la maneja Alembic vía migraciones en el arranque
 # (ver entrypoint.sh que ejecuta `alembic upgrade head`). Evitamos `create_all`
@@ -48,10 +56,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 print("CORS_ALLOWED_ORIGINS (Active):", origins)
 
+# Latencia, SQL y tamaño de respuesta por ruta (ver /metrics)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Fotos guardadas en disco (backend local, solo desarrollo/tests)
+if settings.photo_storage_backend == "local":
+    os.makedirs(settings.photo_local_dir, exist_ok=True)
+    app.mount(settings.photo_local_base_url, StaticFiles(directory=settings.photo_local_dir), name="media")
+
 # Endpoints
 @app.get("/")
 def root():
@@ -68,7 +86,21 @@ def health_check():
     """Endpoint de healthcheck."""
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def metrics(authorization: Optional[str] = Header(None)):
+    """Métricas por ruta en formato Prometheus (requiere METRICS_ENABLED y METRICS_TOKEN)."""
+    # Sin token no se expone: las rutas y consultas lentas no son públicas
+    if not settings.metrics_enabled or not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Incluir rutas de la API v1
+# Lecturas async: se registran primero para que atiendan las mismas rutas que las sync
+if settings.db_async_enabled:
+    from app.api.v1.async_reads import router as async_reads_router
+    app.include_router(async_reads_router, prefix="/api/v1")
 app.include_router(items_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])  # Compatibilidad adicional
@@ -78,3 +110,6 @@ app.include_router(credits_router, prefix="/api/v1/credits", tags=["credits"])
 app.include_router(transactions_router, prefix="/api/v1/transactions", tags=["transactions"])
 app.include_router(stats_router, prefix="/api/v1/stats", tags=["stats"])
 app.include_router(caja_router, prefix="/api/v1/box", tags=["box"])
+app.include_router(sync_router, prefix="/api/v1/sync", tags=["sync"])
+app.include_router(export_router, prefix="/api/v1/export", tags=["export"])
+app.include_router(route_router, prefix="/api/v1/route", tags=["route"])
@@ -1,7 +1,11 @@
 from app.models.user import User, RoleType
 from app.models.client import Client
-from app.models.credit import Credit, CreditStatus
+from app.models.credit import Credit, CreditStatus, CreditInstallment, InstallmentStatus
 from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.ledger import AccountType, LedgerAccount, LedgerEntry, LedgerPosting
+from app.models.box import Box, BoxClose
+from app.models.idempotency import IdempotencyKey
+from app.models.sync import SyncTombstone
  
 
 __all__ = [
@@ -10,6 +14,16 @@ __all__ = [
     "Client",
     "Credit",
     "CreditStatus",
+    "CreditInstallment",
+    "InstallmentStatus",
     "CashTransaction",
     "TransactionType",
+    "AccountType",
+    "LedgerAccount",
+    "LedgerEntry",
+    "LedgerPosting",
+    "Box",
+    "BoxClose",
+    "IdempotencyKey",
+    "SyncTombstone",
 ]
\ No newline at end of file
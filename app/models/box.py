@@ -1,2 +1,68 @@
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, JSON, UniqueConstraint, func, select
+from sqlalchemy.orm import relationship, column_property
 
+from app.core.database import Base
+from app.models.ledger import AccountType, LedgerAccount
 
+
+def _account_balance(user_id, account_type: AccountType):
+    return func.coalesce(
+        select(LedgerAccount.balance)
+        .where(LedgerAccount.user_id == user_id, LedgerAccount.account_type == account_type)
+        .scalar_subquery(),
+        0.0,
+    )
+
+
+class Box(Base):
+    """Caja de un usuario: base de trabajo y saldo de microseguros.
+
+    Los saldos no se guardan en la caja: se leen de las cuentas del libro mayor
+    (app/models/ledger.py) del usuario, en la misma consulta que la caja.
+    """
+    __tablename__ = "boxes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+
+    base_balance = column_property(_account_balance(user_id, AccountType.PRINCIPAL))
+    insurance_balance = column_property(_account_balance(user_id, AccountType.MICROSEGURO))
+    last_updated = column_property(
+        select(func.max(LedgerAccount.updated_at)).where(LedgerAccount.user_id == user_id).scalar_subquery()
+    )
+
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<Box {self.id} - User {self.user_id}>"
+
+
+class BoxClose(Base):
+    """Cierre diario de una caja: foto inmutable de los saldos al cerrar el día.
+
+    `last_posting_id` es la última partida incluida en la foto; el saldo a una fecha
+    parte del cierre más cercano y suma solo las partidas posteriores.
+    """
+    __tablename__ = "box_closes"
+    __table_args__ = (
+        # Un cierre por caja por día; también sirve para buscar el último cierre a una fecha
+        UniqueConstraint("box_id", "business_date", name="uq_box_closes_box_id_business_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    box_id = Column(Integer, ForeignKey("boxes.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    business_date = Column(Date, nullable=False)
+    system_balance = Column(Float, nullable=False)
+    insurance_balance = Column(Float, nullable=False)
+    counted_balance = Column(Float, nullable=False)
+    difference = Column(Float, nullable=False)
+    status = Column(String, nullable=False)  # MATCH, SURPLUS, SHORTAGE
+    denominations = Column(JSON, nullable=True)
+    last_posting_id = Column(Integer, nullable=True)
+    closed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    observations = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<BoxClose {self.id} - Box {self.box_id} {self.business_date} {self.status}>"
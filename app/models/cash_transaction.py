@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -13,6 +13,15 @@ class TransactionType(str, enum.Enum):
 
 class CashTransaction(Base):
     __tablename__ = "cash_transactions"
+    __table_args__ = (
+        # Historial y estadísticas filtradas por rango de fechas
+        Index("ix_cash_transactions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_cash_transactions_credit_id_created_at", "credit_id", "created_at"),
+        # Sincronización incremental (GET /sync)
+        Index("ix_cash_transactions_user_id_updated_at", "user_id", "updated_at"),
+        # Clave del dispositivo única por usuario: cada cobrador genera sus propios client_ref
+        Index("ix_cash_transactions_user_id_client_ref", "user_id", "client_ref", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -20,6 +29,7 @@ class CashTransaction(Base):
     amount = Column(Float)
     transaction_type = Column(Enum(TransactionType))
     description = Column(String, nullable=True)
+    client_ref = Column(String(64), nullable=True)  # Clave del dispositivo (lotes)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -29,3 +39,4 @@ class CashTransaction(Base):
 
     def __repr__(self):
         return f"<CashTransaction {self.id} - {self.transaction_type}>"
+
@@ -1,11 +1,17 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Listados por alcance de cobrador con paginación keyset (collector_id IN (...) AND id > :after_id)
+        Index("ix_clients_collector_id_id", "collector_id", "id"),
+        # Sincronización incremental (GET /sync): cambios por cobrador desde un cursor
+        Index("ix_clients_collector_id_updated_at", "collector_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     dni = Column(String, unique=True, index=True)  # Mantenemos DNI por compatibilidad
@@ -21,9 +27,11 @@ class Client(Base):
     address = Column(String)  # Dirección
     latitude = Column(Float, nullable=True)  # Latitud para Google Maps
     longitude = Column(Float, nullable=True)  # Longitud para Google Maps
+    route_order = Column(Integer, nullable=True)  # Orden de visita en la ruta del cobrador (None = al final)
     
     # Foto de la vivienda (opcional)
     house_photo_url = Column(String, nullable=True)
+    house_photo_thumb_url = Column(String, nullable=True)  # Miniatura para listados
     
     # Sistema
     is_active = Column(Boolean, default=True)
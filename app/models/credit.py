@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 
@@ -11,8 +11,17 @@ class CreditStatus(str, enum.Enum):
     completed = "completed"
     defaulted = "defaulted"
 
+class InstallmentStatus(str, enum.Enum):
+    pending = "pending"
+    partial = "partial"
+    paid = "paid"
+
 class Credit(Base):
     __tablename__ = "credits"
+    __table_args__ = (
+        # Sincronización incremental (GET /sync): créditos de los clientes visibles cambiados desde un cursor
+        Index("ix_credits_client_id_updated_at", "client_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
@@ -34,6 +43,38 @@ class Credit(Base):
     # Relaciones
     client = relationship("Client", back_populates="credits")
     payments = relationship("CashTransaction", back_populates="credit")
+    installments = relationship(
+        "CreditInstallment", back_populates="credit", cascade="all, delete-orphan",
+        order_by="CreditInstallment.number",
+    )
 
     def __repr__(self):
         return f"<Credit {self.id} - Client {self.client_id}>"
+
+
+class CreditInstallment(Base):
+    """Cuota del plan de pagos de un crédito.
+
+    Se genera completa al desembolsar y cada pago se aplica a las cuotas abiertas más
+    antiguas; una cuota vencida es la que tiene due_date pasada y no está pagada.
+    """
+    __tablename__ = "credit_installments"
+    __table_args__ = (
+        UniqueConstraint("credit_id", "number", name="uq_credit_installments_credit_id_number"),
+        # "Quién debe pagar hoy" (y vencidos): due_date <= hoy y status abierto, por índice
+        Index("ix_credit_installments_due_date_status", "due_date", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    credit_id = Column(Integer, ForeignKey("credits.id"), nullable=False)
+    number = Column(Integer, nullable=False)
+    due_date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    paid_amount = Column(Float, nullable=False, default=0.0)
+    status = Column(Enum(InstallmentStatus), nullable=False, default=InstallmentStatus.pending)
+    paid_at = Column(DateTime, nullable=True)
+
+    credit = relationship("Credit", back_populates="installments")
+
+    def __repr__(self):
+        return f"<CreditInstallment {self.credit_id}#{self.number} {self.due_date} {self.status}>"
@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
+
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    """Respuesta guardada de una operación de dinero, indexada por (usuario, Idempotency-Key).
+
+    La fila se inserta en la misma transacción que la operación; un reintento con la
+    misma clave devuelve la respuesta guardada sin volver a tocar las cajas.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(128), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 de endpoint + cuerpo
+    status_code = Column(Integer, nullable=True)       # None mientras la operación está en curso
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} user={self.user_id}>"
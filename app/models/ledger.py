@@ -0,0 +1,84 @@
+import enum
+
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class AccountType(str, enum.Enum):
+    # Cuentas de usuario
+    PRINCIPAL = "principal"      # Base de trabajo y cobranza en efectivo
+    MICROSEGURO = "microseguro"  # Microseguros cobrados
+    # Cuentas del sistema (sin usuario): contrapartida de cada asiento
+    CAPITAL = "capital"          # Dinero que entra o sale del negocio (depósitos, retiros, ajustes)
+    CARTERA = "cartera"          # Préstamos: desembolsos y cobros de cuotas
+    GASTOS = "gastos"
+
+
+USER_ACCOUNT_TYPES = (AccountType.PRINCIPAL, AccountType.MICROSEGURO)
+
+
+class LedgerAccount(Base):
+    """Cuenta del libro mayor.
+
+    Las cuentas de usuario guardan su saldo materializado (la suma de sus partidas), que se
+    actualiza en el mismo commit que cada asiento; en las del sistema queda en 0 y el saldo
+    se calcula sumando sus partidas.
+    """
+    __tablename__ = "ledger_accounts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "account_type", name="uq_ledger_accounts_user_id_account_type"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    account_type = Column(Enum(AccountType), nullable=False)
+    balance = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<LedgerAccount {self.id} - {self.account_type} user={self.user_id} balance={self.balance}>"
+
+
+class LedgerEntry(Base):
+    """Asiento: una operación de dinero; sus partidas suman cero."""
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entry_type = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    performed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    credit_id = Column(Integer, ForeignKey("credits.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    postings = relationship("LedgerPosting", back_populates="entry")
+
+    def __repr__(self):
+        return f"<LedgerEntry {self.id} - {self.entry_type}>"
+
+
+class LedgerPosting(Base):
+    """Partida de un asiento sobre una cuenta (positivo entra, negativo sale)."""
+    __tablename__ = "ledger_postings"
+    __table_args__ = (
+        # Historial por cuenta (caja), saldo a una fecha y sincronización incremental
+        Index("ix_ledger_postings_account_id_created_at", "account_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entry_id = Column(Integer, ForeignKey("ledger_entries.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("ledger_accounts.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    movement_type = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    entry = relationship("LedgerEntry", back_populates="postings")
+    account = relationship("LedgerAccount")
+
+    def __repr__(self):
+        return f"<LedgerPosting {self.id} - {self.movement_type} {self.amount}>"
@@ -0,0 +1,69 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index, event, inspect, insert, literal, select
+
+from app.core.database import Base
+from app.models.client import Client
+from app.models.credit import Credit
+
+class SyncTombstone(Base):
+    """Registro de que un cliente o crédito dejó de ser visible para un cobrador.
+
+    Lo consume GET /sync para que los dispositivos borren de su copia local los
+    clientes desactivados, reasignados a otro cobrador o eliminados, y los créditos eliminados
+    o de esos clientes desactivados o reasignados.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_collector_id_deleted_at", "collector_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String(16), nullable=False)  # "client" | "credit"
+    entity_id = Column(Integer, nullable=False)
+    collector_id = Column(Integer, nullable=True)  # Cobrador que deja de verlo
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SyncTombstone {self.entity_type} {self.entity_id}>"
+
+
+def _write_tombstone(connection, entity_type: str, entity_id: int, collector_id) -> None:
+    # Misma conexión (y transacción) que el cambio que lo origina
+    connection.execute(insert(SyncTombstone.__table__).values(
+        entity_type=entity_type, entity_id=entity_id, collector_id=collector_id, deleted_at=datetime.utcnow(),
+    ))
+
+
+def _write_client_tombstones(connection, client_id: int, collector_id) -> None:
+    # El cliente y, en un solo INSERT ... SELECT, todos sus créditos: el cobrador deja de ver ambos
+    _write_tombstone(connection, "client", client_id, collector_id)
+    connection.execute(insert(SyncTombstone.__table__).from_select(
+        ["entity_type", "entity_id", "collector_id", "deleted_at"],
+        select(
+            literal("credit", String), Credit.id, literal(collector_id, Integer), literal(datetime.utcnow(), DateTime),
+        ).where(Credit.client_id == client_id),
+    ))
+
+
+@event.listens_for(Client, "after_update")
+def _tombstone_client_on_update(mapper, connection, target):
+    state = inspect(target)
+    # Reasignado: el cobrador anterior deja de verlo (también si además se desactiva)
+    reassigned = state.attrs.collector_id.history
+    previous = reassigned.deleted[0] if reassigned.deleted and reassigned.added else None
+    deactivated = state.attrs.is_active.history
+    if deactivated.added and deactivated.added[0] is False:
+        _write_client_tombstones(connection, target.id, previous if previous is not None else target.collector_id)
+    elif previous is not None:
+        _write_client_tombstones(connection, target.id, previous)
+
+
+@event.listens_for(Client, "after_delete")
+def _tombstone_client_on_delete(mapper, connection, target):
+    _write_tombstone(connection, "client", target.id, target.collector_id)
+
+
+@event.listens_for(Credit, "after_delete")
+def _tombstone_credit_on_delete(mapper, connection, target):
+    collector_id = connection.scalar(select(Client.collector_id).where(Client.id == target.client_id))
+    _write_tombstone(connection, "credit", target.id, collector_id)
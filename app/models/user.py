@@ -38,7 +38,6 @@ class User(Base):
         )
     )
     cash_transactions = relationship("CashTransaction", back_populates="user", cascade="all, delete-orphan")
-    cajas = relationship("Caja", back_populates="user", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<User {self.username}>"
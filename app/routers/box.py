@@ -49,13 +49,11 @@ def create_nuevo_movimiento_caja(
     if transaction.type not in valid_transaction_types:
         raise HTTPException(status_code=400, detail=f"Tipo de transacción no válido. Tipos permitidos: {valid_transaction_types}")
 
-    # Si es un retiro o desembolso, verificar que haya saldo suficiente
-    if transaction.type in [TransactionType.WITHDRAWAL.value, TransactionType.DISBURSEMENT.value]:
-        current_balance = crud_caja.get_user_balance(db, user_id=current_user.id)
-        if current_balance < transaction.amount:
-            raise HTTPException(status_code=400, detail="Saldo insuficiente para realizar la operación.")
-
-    new_transaction = crud_caja.create_cash_transaction(db=db, transaction_data=transaction, user_id=current_user.id)
+    # Si es un retiro o desembolso, el saldo se verifica al aplicar el movimiento (fila bloqueada)
+    try:
+        new_transaction = crud_caja.create_cash_transaction(db=db, transaction_data=transaction, user_id=current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not new_transaction:
         raise HTTPException(status_code=400, detail="Error al crear la transacción.")
@@ -1,6 +1,6 @@
 from typing import Optional, List
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field
 
 class BoxMovementBase(BaseModel):
     amount: float
@@ -38,31 +38,40 @@ class Box(BoxBase):
     class Config:
         orm_mode = True
 
+# Valor de cada denominación del arqueo (campo -> pesos)
+DENOMINATIONS = {
+    "bill_100000": 100000,
+    "bill_50000": 50000,
+    "bill_20000": 20000,
+    "bill_10000": 10000,
+    "bill_5000": 5000,
+    "bill_2000": 2000,
+    "coin_1000": 1000,
+    "coin_500": 500,
+    "coin_200": 200,
+    "coin_100": 100,
+    "coin_50": 50,
+}
+
 class CashCount(BaseModel):
-    bill_100000: int = 0
-    bill_50000: int = 0
-    bill_20000: int = 0
-    bill_10000: int = 0
-    bill_5000: int = 0
-    bill_2000: int = 0
-    coin_1000: int = 0
-    coin_500: int = 0
-    coin_200: int = 0
-    coin_100: int = 0
-    coin_50: int = 0
+    bill_100000: int = Field(0, ge=0)
+    bill_50000: int = Field(0, ge=0)
+    bill_20000: int = Field(0, ge=0)
+    bill_10000: int = Field(0, ge=0)
+    bill_5000: int = Field(0, ge=0)
+    bill_2000: int = Field(0, ge=0)
+    coin_1000: int = Field(0, ge=0)
+    coin_500: int = Field(0, ge=0)
+    coin_200: int = Field(0, ge=0)
+    coin_100: int = Field(0, ge=0)
+    coin_50: int = Field(0, ge=0)
 
     @property
     def total_amount(self) -> float:
-        return (
-            self.bill_100000 * 100000 +
-            self.bill_50000 * 50000 +
-            self.bill_20000 * 20000 +
-            self.bill_10000 * 10000 +
-            self.bill_5000 * 5000 +
-            self.bill_2000 * 2000 +
-            self.coin_1000 * 1000 +
-            self.coin_50 * 50
-        )
+        return float(sum(getattr(self, field) * value for field, value in DENOMINATIONS.items()))
+
+class BoxCloseCreate(CashCount):
+    observations: Optional[str] = None
 
 class BoxCloseResponse(BaseModel):
     system_balance: float
@@ -70,3 +79,45 @@ class BoxCloseResponse(BaseModel):
     difference: float
     status: str  # MATCH, SURPLUS, SHORTAGE
 
+class BoxClose(BoxCloseResponse):
+    id: int
+    box_id: int
+    user_id: int
+    business_date: date
+    insurance_balance: float
+    denominations: Optional[dict] = None
+    closed_by_id: Optional[int] = None
+    observations: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class BoxBalanceAsOf(BaseModel):
+    user_id: int
+    as_of: date
+    base_balance: float
+    insurance_balance: float
+    close_date: Optional[date] = None  # cierre desde el que se calculó (None = desde el inicio)
+
+class TeamCloseItem(CashCount):
+    user_id: int
+    observations: Optional[str] = None
+
+class TeamCloseRequest(BaseModel):
+    closes: List[TeamCloseItem] = Field(..., min_length=1)
+    withdraw: bool = True  # pasa el saldo de cada caja a la del supervisor
+
+class TeamCloseReportItem(BoxCloseResponse):
+    close_id: int
+    user_id: int
+    username: str
+    withdrawn: float
+
+class TeamCloseResponse(BaseModel):
+    business_date: date
+    closes: List[TeamCloseReportItem]
+    total_system: float
+    total_counted: float
+    total_difference: float
+    total_withdrawn: float
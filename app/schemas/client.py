@@ -16,9 +16,11 @@ class ClientBase(BaseModel):
     address: Optional[str] = None  # Dirección (opcional - puede ser None en BD)
     latitude: Optional[float] = None  # Latitud para Google Maps
     longitude: Optional[float] = None  # Longitud para Google Maps
+    route_order: Optional[int] = None  # Orden de visita en la ruta del cobrador
     
     # Foto de la vivienda (opcional)
     house_photo_url: Optional[str] = None
+    house_photo_thumb_url: Optional[str] = None  # Miniatura para listados
 
 class ClientCreate(ClientBase):
     collector_id: Optional[int] = None
@@ -32,7 +34,9 @@ class ClientUpdate(BaseModel):
     collector_id: Optional[int] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    route_order: Optional[int] = None
     house_photo_url: Optional[str] = None
+    house_photo_thumb_url: Optional[str] = None
 
 class Client(ClientBase):
     id: int
@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
 from typing import Optional
-from app.models.credit import CreditStatus
+from app.models.credit import CreditStatus, InstallmentStatus
 
 class CreditBase(BaseModel):
     client_id: int
@@ -30,3 +30,16 @@ class Credit(CreditBase):
 
     class Config:
         from_attributes = True
+
+class CreditInstallment(BaseModel):
+    id: int
+    credit_id: int
+    number: int
+    due_date: date
+    amount: float
+    paid_amount: float
+    status: InstallmentStatus
+    paid_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
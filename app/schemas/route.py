@@ -0,0 +1,33 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class RouteStop(BaseModel):
+    credit_id: int
+    client_id: int
+    client_name: str
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    collector_id: Optional[int] = None
+    route_order: Optional[int] = None
+    daily_payment: Optional[float] = None
+    remaining_amount: Optional[float] = None
+    expected_amount: float  # Cuotas abiertas que vencen hasta hoy (incluye atrasos)
+    arrears_amount: float  # Parte vencida antes de hoy
+    overdue_installments: int
+    oldest_due_date: date
+    last_payment_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RouteToday(BaseModel):
+    date: date
+    stops: List[RouteStop]
+    total_expected: float
+    total_arrears: float
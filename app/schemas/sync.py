@@ -0,0 +1,21 @@
+from typing import List
+from pydantic import BaseModel
+
+from app.schemas.client import Client
+from app.schemas.credit import Credit
+from app.schemas.transaction import Transaction
+from app.schemas.box import Box, BoxMovement
+
+class SyncDeleted(BaseModel):
+    clients: List[int] = []  # Desactivados, reasignados a otro cobrador o eliminados
+    credits: List[int] = []
+
+class SyncResponse(BaseModel):
+    cursor: str          # Enviar como `since` en la próxima sincronización
+    full_resync: bool    # True si se ignoró `since` (primera vez o cursor vencido): reemplazar la copia local
+    clients: List[Client]
+    credits: List[Credit]
+    transactions: List[Transaction]
+    boxes: List[Box]
+    box_movements: List[BoxMovement]
+    deleted: SyncDeleted
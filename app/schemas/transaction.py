@@ -1,6 +1,6 @@
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from app.models.cash_transaction import TransactionType
 
 class TransactionBase(BaseModel):
@@ -15,8 +15,29 @@ class TransactionCreate(TransactionBase):
 class Transaction(TransactionBase):
     id: int
     user_id: int
+    client_ref: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+# --- Carga en lote (sincronización de fin de ruta) ---
+
+class TransactionBatchItem(TransactionCreate):
+    client_ref: str = Field(..., min_length=1, max_length=64)  # Clave única generada en el dispositivo
+
+class TransactionBatchCreate(BaseModel):
+    items: List[TransactionBatchItem] = Field(..., min_length=1, max_length=1000)
+
+class TransactionBatchItemResult(BaseModel):
+    client_ref: str
+    status: Literal["created", "duplicate", "error"]
+    transaction_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class TransactionBatchResult(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    results: List[TransactionBatchItemResult]
@@ -0,0 +1,28 @@
+"""
+Elimina las Idempotency-Key vencidas (ver settings.idempotency_ttl_hours).
+
+Uso (ej. desde cron, una vez por hora):
+    python scripts/purge_idempotency_keys.py
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.crud.idempotency import purge_expired
+
+
+def main():
+    db = SessionLocal()
+    try:
+        deleted = purge_expired(db)
+        print(f"✅ {deleted} clave(s) vencida(s) eliminada(s).")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Elimina las bajas de sincronización más viejas que settings.sync_tombstone_retention_days.
+Los dispositivos con un cursor anterior reciben una sincronización completa.
+
+Uso (ej. desde cron, una vez por día):
+    python scripts/purge_sync_tombstones.py
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.crud.sync import purge_tombstones
+
+
+def main():
+    db = SessionLocal()
+    try:
+        deleted = purge_tombstones(db)
+        print(f"✅ {deleted} baja(s) de sincronización eliminada(s).")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Concilia el saldo materializado de cada cuenta del libro mayor (ledger_accounts)
+con la suma de sus partidas (ledger_postings).
+
+Uso:
+    python scripts/reconcile_cash_balances.py          # solo reporta diferencias
+    python scripts/reconcile_cash_balances.py --fix    # además corrige los saldos
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.crud.ledger import reconcile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concilia ledger_accounts contra ledger_postings")
+    parser.add_argument("--fix", action="store_true", help="Corrige los saldos con diferencias")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drifts = reconcile(db, fix=args.fix)
+        if not drifts:
+            print("✅ Todos los saldos coinciden con el historial.")
+            return 0
+        print(f"⚠️  {len(drifts)} saldo(s) con diferencias:")
+        for d in drifts:
+            owner = "sistema" if d["user_id"] is None else f"user_id={d['user_id']}"
+            print(f"   cuenta={d['account_id']} ({owner}, {d['account_type']}): guardado={d['stored']:,.2f} "
+                  f"historial={d['ledger']:,.2f} diferencia={d['drift']:,.2f}")
+        if args.fix:
+            print("✅ Saldos corregidos.")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
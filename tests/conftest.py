@@ -0,0 +1,102 @@
+"""
+Fixtures compartidas: una base SQLite temporal con el esquema completo y la app
+apuntando a ella (get_db sobreescrito, cachés de principal y alcance limpias).
+
+Cada módulo carga sus propios datos con sqlite_api.Session() y después llama a
+sqlite_api.load_users() para poder armar los headers de autenticación.
+"""
+import os
+from contextlib import contextmanager
+
+import pytest
+
+# Antes de importar app: la configuración exige una URL de base de datos
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_ledger.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+# app.main registra todos los modelos en Base.metadata antes de crear las tablas
+from app.main import app
+from app.core.database import Base, get_db
+from app.core.principal import invalidate_principal
+from app.core.security import create_access_token
+from app.core.visibility import invalidate_supervisor_scope
+from app.models.user import User
+
+
+def sqlite_engine_at(path) -> Engine:
+    """Motor SQLite en un archivo con todas las tablas creadas (compartible entre hilos)."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+class SQLiteApi:
+    """La app servida sobre una base SQLite temporal."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.client = TestClient(app)
+        self.users: dict[str, int] = {}
+
+    def load_users(self) -> dict[str, int]:
+        """Lee username -> id de los usuarios cargados (se llama después de sembrar datos)."""
+        db = self.Session()
+        try:
+            self.users = {username: user_id for username, user_id in db.query(User.username, User.id)}
+        finally:
+            db.close()
+        return self.users
+
+    def headers(self, username: str) -> dict[str, str]:
+        token = create_access_token({"sub": username, "uid": self.users[username]})
+        return {"Authorization": f"Bearer {token}"}
+
+    def get_db(self):
+        session = self.Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+
+@contextmanager
+def serve(engine: Engine):
+    """Apunta get_db de la app a `engine` mientras dura el bloque."""
+    api = SQLiteApi(engine)
+    invalidate_principal()
+    invalidate_supervisor_scope()
+    app.dependency_overrides[get_db] = api.get_db
+    try:
+        yield api
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        invalidate_principal()
+        invalidate_supervisor_scope()
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Base SQLite temporal por prueba (un módulo puede redefinirla, p. ej. con otro pool)."""
+    engine = sqlite_engine_at(tmp_path / "test.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite_api(sqlite_engine):
+    with serve(sqlite_engine) as api:
+        yield api
+
+
+@pytest.fixture(scope="module")
+def module_sqlite_api(tmp_path_factory):
+    """Como sqlite_api, pero compartida por todas las pruebas del módulo."""
+    engine = sqlite_engine_at(tmp_path_factory.mktemp("api") / "test.db")
+    with serve(engine) as api:
+        yield api
+    engine.dispose()
@@ -0,0 +1,77 @@
+"""
+Benchmark: throughput de las lecturas calientes con la capa sync vs la async.
+
+Levanta dos instancias del backend contra la misma base (una con DB_ASYNC_ENABLED=false
+y otra con DB_ASYNC_ENABLED=true) y las satura con BENCH_CONCURRENCY conexiones
+concurrentes (por defecto 200) durante BENCH_DURATION_S segundos. Reporta
+peticiones/s y p99 de cada una. Requiere:
+    BENCH_SYNC_URL=http://127.0.0.1:8000 BENCH_ASYNC_URL=http://127.0.0.1:8001 \
+    BENCH_USERNAME=... BENCH_PASSWORD=... pytest -s tests/test_async_benchmark.py
+"""
+import asyncio
+import itertools
+import os
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+SYNC_URL = os.getenv("BENCH_SYNC_URL")
+ASYNC_URL = os.getenv("BENCH_ASYNC_URL")
+USERNAME = os.getenv("BENCH_USERNAME")
+PASSWORD = os.getenv("BENCH_PASSWORD")
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "200"))
+DURATION_S = float(os.getenv("BENCH_DURATION_S", "10"))
+HOT_PATHS = [
+    "/api/v1/clients/",
+    "/api/v1/credits/",
+    "/api/v1/transactions/",
+    "/api/v1/stats/",
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _run_load(base_url):
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        r = await client.post("/api/v1/auth/token", data={"username": USERNAME, "password": PASSWORD})
+        assert r.status_code == 200, r.text
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        paths = itertools.cycle(HOT_PATHS)
+        latencies_ms = []
+        errors = []
+        deadline = time.perf_counter() + DURATION_S
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                resp = await client.get(next(paths), headers=headers)
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+                if resp.status_code != 200:
+                    errors.append(resp.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    return len(latencies_ms) / elapsed, _percentile(latencies_ms, 99), errors
+
+
+@pytest.mark.skipif(
+    not (SYNC_URL and ASYNC_URL and USERNAME and PASSWORD),
+    reason="Falta variable de entorno: BENCH_SYNC_URL/BENCH_ASYNC_URL/BENCH_USERNAME/BENCH_PASSWORD",
+)
+def test_async_hot_reads_throughput():
+    results = {}
+    for label, url in (("sync", SYNC_URL), ("async", ASYNC_URL)):
+        rps, p99, errors = asyncio.run(_run_load(url))
+        assert not errors, f"{label}: {len(errors)} respuestas con error ({sorted(set(errors))})"
+        results[label] = rps
+        print(f"\n{label:>5}: {rps:.0f} req/s | p99={p99:.1f}ms | {CONCURRENCY} conexiones, {DURATION_S:.0f}s")
+    print(f"async/sync: {results['async'] / results['sync']:.2f}x")
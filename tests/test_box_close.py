@@ -0,0 +1,150 @@
+"""
+Cierre diario de caja (POST /box/{user_id}/close) y saldo a una fecha sobre una base SQLite temporal.
+"""
+from datetime import timedelta
+
+import pytest
+
+from app.core.dates import business_date
+from app.crud import ledger
+from app.models.box import Box, BoxClose
+from app.models.user import User, RoleType
+from app.schemas.box import CashCount
+
+
+@pytest.fixture
+def api(sqlite_api):
+    Session = sqlite_api.Session
+
+    db = Session()
+    sup = User(username="bc_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    db.add(sup)
+    db.flush()
+    col = User(username="bc_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    other = User(username="bc_other", hashed_password="x", full_name="Other", role=RoleType.COLLECTOR)
+    db.add_all([col, other])
+    db.flush()
+    box = Box(user_id=col.id)
+    db.add(box)
+    db.commit()
+    ledger.move(db, None, box.id, 100000.0, "DEPOSIT")
+    db.close()
+    users = sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.headers, users, Session
+
+
+def test_cash_count_totals_every_denomination():
+    count = CashCount(bill_100000=1, bill_2000=1, coin_1000=1, coin_500=1, coin_200=1, coin_100=1, coin_50=1)
+    assert count.total_amount == 103850
+
+
+def test_close_compares_count_and_is_unique_per_day(api):
+    client, headers, users, _ = api
+    url = f"/api/v1/box/{users['bc_col']}/close"
+    resp = client.post(url, json={"bill_50000": 1, "bill_20000": 2, "coin_500": 1}, headers=headers("bc_sup"))
+    assert resp.status_code == 201
+    body = resp.json()
+    assert body["system_balance"] == 100000
+    assert body["counted_balance"] == 90500
+    assert body["difference"] == -9500
+    assert body["status"] == "SHORTAGE"
+    assert body["denominations"]["coin_500"] == 1
+
+    again = client.post(url, json={"bill_100000": 1}, headers=headers("bc_sup"))
+    assert again.status_code == 409
+    closes = client.get(f"/api/v1/box/{users['bc_col']}/closes", headers=headers("bc_col")).json()
+    assert [c["status"] for c in closes] == ["SHORTAGE"]
+
+
+def test_close_requires_box_access(api):
+    client, headers, users, _ = api
+    resp = client.post(f"/api/v1/box/{users['bc_col']}/close", json={}, headers=headers("bc_other"))
+    assert resp.status_code == 403
+
+
+def test_denied_requests_do_not_create_a_box(api):
+    client, headers, users, Session = api
+    # bc_other todavía no tiene caja: un acceso denegado no debe crearla
+    for method, path in (("get", "balance"), ("get", "closes"), ("post", "close")):
+        kwargs = {"json": {}} if method == "post" else {}
+        resp = getattr(client, method)(f"/api/v1/box/{users['bc_other']}/{path}", headers=headers("bc_col"), **kwargs)
+        assert resp.status_code == 403
+    db = Session()
+    try:
+        assert db.query(Box).filter(Box.user_id == users["bc_other"]).count() == 0
+    finally:
+        db.close()
+
+
+def test_balance_as_of_starts_from_nearest_close(api):
+    client, headers, users, Session = api
+    url = f"/api/v1/box/{users['bc_col']}/balance"
+    today = business_date()
+    assert client.post(f"/api/v1/box/{users['bc_col']}/close", json={"bill_100000": 1}, headers=headers("bc_sup")).json()["status"] == "MATCH"
+
+    db = Session()
+    box = db.query(Box).filter(Box.user_id == users["bc_col"]).one()
+    ledger.move(db, None, box.id, 5000.0, "DEPOSIT")
+    # Si el saldo se recalculara desde el inicio, este cambio en la foto no se vería
+    db.query(BoxClose).update({BoxClose.system_balance: 100001.0})
+    db.commit()
+    db.close()
+
+    # El día cerrado suma también las partidas posteriores al cierre
+    closed_day = client.get(url, params={"as_of": today.isoformat()}, headers=headers("bc_col")).json()
+    assert closed_day["base_balance"] == 105001
+    assert closed_day["close_date"] == today.isoformat()
+    next_day = client.get(url, params={"as_of": (today + timedelta(days=1)).isoformat()}, headers=headers("bc_col")).json()
+    assert next_day["base_balance"] == 105001
+    assert next_day["close_date"] == today.isoformat()
+    before = client.get(url, params={"as_of": (today - timedelta(days=1)).isoformat()}, headers=headers("bc_col")).json()
+    assert before["base_balance"] == 0
+    assert before["close_date"] is None
+
+
+def test_team_close_withdraws_and_reports_in_one_request(api):
+    client, headers, users, Session = api
+    db = Session()
+    sup_id = users["bc_sup"]
+    second = User(username="bc_col2", hashed_password="x", full_name="Col 2", role=RoleType.COLLECTOR, supervisor_id=sup_id)
+    db.add(second)
+    db.flush()
+    box = Box(user_id=second.id)
+    db.add(box)
+    db.commit()
+    ledger.move(db, None, box.id, 20000.0, "DEPOSIT")
+    second_id = second.id
+    db.close()
+
+    resp = client.post("/api/v1/box/close-team", json={"closes": [
+        {"user_id": users["bc_col"], "bill_100000": 1, "coin_1000": 2},
+        {"user_id": second_id, "bill_10000": 1},
+    ]}, headers=headers("bc_sup"))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(c["username"], c["status"], c["difference"], c["withdrawn"]) for c in body["closes"]] == [
+        ("bc_col", "SURPLUS", 2000, 100000), ("bc_col2", "SHORTAGE", -10000, 20000),
+    ]
+    assert body["total_withdrawn"] == 120000
+    assert body["total_difference"] == -8000
+
+    db = Session()
+    try:
+        assert ledger.get_balance(db, users["bc_col"]) == 0
+        assert ledger.get_balance(db, second_id) == 0
+        assert ledger.get_balance(db, sup_id) == 120000
+        assert ledger.reconcile(db) == []
+        assert db.query(BoxClose).count() == 2
+    finally:
+        db.close()
+
+    # Cerrar de nuevo el mismo día no retira ni guarda nada
+    again = client.post("/api/v1/box/close-team", json={"closes": [{"user_id": second_id}]}, headers=headers("bc_sup"))
+    assert again.status_code == 409
+
+
+def test_team_close_rejects_users_outside_the_team(api):
+    client, headers, users, _ = api
+    payload = {"closes": [{"user_id": users["bc_col"]}, {"user_id": users["bc_other"]}]}
+    assert client.post("/api/v1/box/close-team", json=payload, headers=headers("bc_sup")).status_code == 400
+    assert client.post("/api/v1/box/close-team", json=payload, headers=headers("bc_col")).status_code == 403
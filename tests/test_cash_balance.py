@@ -0,0 +1,69 @@
+"""
+Saldo materializado de caja (crud.crud_caja): se actualiza en el mismo commit que la
+transacción, valida fondos y se concilia contra el historial del libro mayor.
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud_caja, ledger
+from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.ledger import AccountType, LedgerAccount
+from app.models.user import User, RoleType
+from app.schemas.caja import CashTransactionCreate
+
+
+@pytest.fixture
+def db(sqlite_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+    user = User(username="cb_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR)
+    session.add(user)
+    session.commit()
+    yield session, user.id
+    session.close()
+
+
+def test_balance_follows_each_transaction(db):
+    session, user_id = db
+    assert crud_caja.get_user_balance(session, user_id) == 0.0
+    crud_caja.create_cash_transaction(session, CashTransactionCreate(type="deposit", amount=100.0), user_id)
+    crud_caja.create_cash_transaction(session, CashTransactionCreate(type="payment", amount=25.0), user_id)
+    crud_caja.create_cash_transaction(session, CashTransactionCreate(type="withdrawal", amount=40.0), user_id)
+    assert crud_caja.get_user_balance(session, user_id) == 85.0
+    assert session.query(CashTransaction).count() == 3
+    assert ledger.reconcile(session) == []
+
+
+def test_insufficient_funds_writes_nothing(db):
+    session, user_id = db
+    crud_caja.create_cash_transaction(session, CashTransactionCreate(type="deposit", amount=10.0), user_id)
+    with pytest.raises(ValueError):
+        crud_caja.create_cash_transaction(session, CashTransactionCreate(type="disbursement", amount=10.01), user_id)
+    assert crud_caja.get_user_balance(session, user_id) == 10.0
+    assert session.query(CashTransaction).count() == 1
+    assert ledger.reconcile(session) == []
+
+
+def test_reconcile_reports_and_fixes_drift(db):
+    session, user_id = db
+    crud_caja.create_cash_transaction(session, CashTransactionCreate(type="deposit", amount=50.0), user_id)
+    account = session.query(LedgerAccount).filter_by(user_id=user_id, account_type=AccountType.PRINCIPAL).one()
+    account.balance = 70.0
+    session.commit()
+
+    drifts = ledger.reconcile(session)
+    assert [(d["user_id"], d["stored"], d["ledger"], d["drift"]) for d in drifts] == [(user_id, 70.0, 50.0, 20.0)]
+    assert ledger.reconcile(session, fix=True) == drifts
+    assert crud_caja.get_user_balance(session, user_id) == 50.0
+    assert ledger.reconcile(session) == []
+
+
+def test_failed_post_without_commit_leaves_rollback_to_the_caller(db):
+    session, user_id = db
+    # Cambio pendiente del llamador en la misma transacción
+    session.add(User(username="cb_other", hashed_password="x", full_name="Otro", role=RoleType.COLLECTOR))
+    session.flush()
+    with pytest.raises(ValueError):
+        crud_caja.apply_cash_transaction(session, user_id, TransactionType.WITHDRAWAL, 5.0)
+    assert session.query(User).filter_by(username="cb_other").count() == 1
+    session.rollback()
+    assert session.query(User).filter_by(username="cb_other").count() == 0
@@ -0,0 +1,59 @@
+"""
+Listado de clientes (GET /clients): filtro de supervisor en SQL y paginación keyset
+(after_id) sobre una base SQLite temporal.
+"""
+import pytest
+
+from app.models.client import Client
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def api(sqlite_api):
+    db = sqlite_api.Session()
+    admin = User(username="cl_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    sup = User(username="cl_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    db.add_all([admin, sup])
+    db.flush()
+    col1 = User(username="cl_col1", hashed_password="x", full_name="Col 1", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    col2 = User(username="cl_col2", hashed_password="x", full_name="Col 2", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    other = User(username="cl_other", hashed_password="x", full_name="Otro", role=RoleType.COLLECTOR)
+    db.add_all([col1, col2, other])
+    db.flush()
+    # Intercalados para que el filtro no coincida con un rango de ids
+    for i, collector in enumerate([col1, other, col2, col1, other, col2, col1]):
+        db.add(Client(dni=f"cl{i}", full_name=f"Cliente {i}", phone=str(i), collector_id=collector.id))
+    db.commit()
+    db.close()
+    return sqlite_api.client, sqlite_api.headers, sqlite_api.load_users()
+
+
+def test_supervisor_only_lists_team_clients(api):
+    client, headers, users = api
+    rows = client.get("/api/v1/clients/", headers=headers("cl_sup")).json()
+    assert [r["dni"] for r in rows] == ["cl0", "cl2", "cl3", "cl5", "cl6"]
+    assert {r["collector_id"] for r in rows} == {users["cl_col1"], users["cl_col2"]}
+
+    own = client.get("/api/v1/clients/", headers=headers("cl_col2")).json()
+    assert [r["dni"] for r in own] == ["cl2", "cl5"]
+    assert len(client.get("/api/v1/clients/", headers=headers("cl_admin")).json()) == 7
+
+
+def test_keyset_pages_cover_the_scope_without_gaps(api):
+    client, headers, _ = api
+    full = [r["id"] for r in client.get("/api/v1/clients/", headers=headers("cl_sup")).json()]
+
+    seen, after_id = [], None
+    while True:
+        params = {"limit": 2, **({"after_id": after_id} if after_id is not None else {})}
+        page = client.get("/api/v1/clients/", params=params, headers=headers("cl_sup")).json()
+        if not page:
+            break
+        assert len(page) <= 2
+        seen.extend(r["id"] for r in page)
+        after_id = page[-1]["id"]
+    assert seen == full
+
+    # after_id ignora skip: el cursor manda
+    page = client.get("/api/v1/clients/", params={"after_id": full[0], "skip": 3, "limit": 1}, headers=headers("cl_sup")).json()
+    assert [r["id"] for r in page] == [full[1]]
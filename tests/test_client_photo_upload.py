@@ -0,0 +1,117 @@
+"""
+Pipeline de subida de fotos (app/core/cloudinary.py + app/core/images.py) con el
+backend local en disco.
+
+No necesita servidor ni Cloudinary: usa LocalDiskStorage en un directorio temporal
+y una base SQLite temporal para el trabajo en segundo plano.
+"""
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers
+
+from app.core import cloudinary as photo_upload
+from app.core.config import settings
+from app.core.database import Base
+from app.core.storage import LocalDiskStorage
+from app.models.user import User
+from app.models.client import Client
+
+
+def _jpeg(width: int = 3000, height: int = 2000, exif: bool = False) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 120, 40))
+    out = io.BytesIO()
+    if exif:
+        data = Image.Exif()
+        data[0x010F] = "CamaraTest"  # Make
+        image.save(out, format="JPEG", exif=data)
+    else:
+        image.save(out, format="JPEG")
+    return out.getvalue()
+
+
+def _upload(data: bytes, content_type: str = "image/jpeg") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="casa.jpg", headers=Headers({"content-type": content_type}))
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    storage = LocalDiskStorage(str(tmp_path / "media"), "/media")
+    monkeypatch.setattr(photo_upload, "get_storage", lambda: storage)
+    return storage
+
+
+def test_upload_rejects_oversized_file_while_reading(local_storage, monkeypatch):
+    monkeypatch.setattr(settings, "photo_max_bytes", 100 * 1024)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(photo_upload.upload_client_photo(_upload(b"x" * (200 * 1024)), client_id=1))
+    assert exc.value.status_code == 400
+    assert not (local_storage.root / "clients" / "1").exists()
+
+
+def test_upload_rejects_invalid_type(local_storage):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(photo_upload.upload_client_photo(_upload(b"data", "application/pdf"), client_id=1))
+    assert exc.value.status_code == 400
+
+
+def test_upload_stores_downsized_photo_and_thumbnail(local_storage):
+    urls = asyncio.run(photo_upload.upload_client_photo(_upload(_jpeg(exif=True)), client_id=7))
+    assert urls == {
+        "house_photo_url": "/media/clients/7/house_photo.jpg",
+        "house_photo_thumb_url": "/media/clients/7/house_photo_thumb.jpg",
+    }
+    folder = local_storage.root / "clients" / "7"
+    with Image.open(folder / "house_photo.jpg") as full:
+        assert max(full.size) == settings.photo_max_dimension
+        assert not full.getexif()
+    with Image.open(folder / "house_photo_thumb.jpg") as thumb:
+        assert max(thumb.size) == settings.photo_thumb_dimension
+    assert (folder / "house_photo_thumb.jpg").stat().st_size < (folder / "house_photo.jpg").stat().st_size
+
+
+def test_upload_rejects_undecodable_image(local_storage):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(photo_upload.upload_client_photo(_upload(b"not-an-image"), client_id=1))
+    assert exc.value.status_code == 400
+
+
+def test_storage_failure_returns_generic_error(local_storage, monkeypatch, caplog):
+    def _fail(*args, **kwargs):
+        raise RuntimeError("bucket secreto: credenciales inválidas")
+
+    monkeypatch.setattr(local_storage, "save", _fail)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(photo_upload.upload_client_photo(_upload(_jpeg(800, 600)), client_id=1))
+    assert exc.value.status_code == 500
+    assert exc.value.detail == "Failed to upload image"
+    # El detalle queda en el log
+    assert "credenciales inválidas" in caplog.text
+
+
+def test_background_job_updates_client_record(local_storage, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'photos.db'}")
+    Base.metadata.create_all(engine, tables=[User.__table__, Client.__table__])
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    client = Client(dni="123", full_name="Cliente Foto", phone="1")
+    db.add(client)
+    db.commit()
+    client_id = client.id
+    db.close()
+
+    urls = photo_upload.process_photo_upload(io.BytesIO(_jpeg(800, 600)), client_id, session_factory=Session)
+
+    db = Session()
+    try:
+        saved = db.get(Client, client_id)
+        assert saved.house_photo_url == urls["house_photo_url"]
+        assert saved.house_photo_thumb_url == urls["house_photo_thumb_url"]
+    finally:
+        db.close()
+        engine.dispose()
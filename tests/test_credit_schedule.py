@@ -0,0 +1,91 @@
+"""
+Plan de cuotas de los créditos: generación al desembolsar y aplicación de pagos (sueltos y en lote).
+"""
+import pytest
+
+from app.crud import ledger
+from app.core.dates import business_date
+from app.crud.credit import build_schedule
+from app.models.box import Box
+from app.models.client import Client
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def api(sqlite_api):
+    db = sqlite_api.Session()
+    admin = User(username="cs_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    col = User(username="cs_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR)
+    db.add_all([admin, col])
+    db.flush()
+    box = Box(user_id=col.id)
+    client = Client(dni="cs1", full_name="Cliente", phone="1", collector_id=col.id)
+    db.add_all([box, client])
+    db.commit()
+    ledger.move(db, None, box.id, 1000.0, "DEPOSIT")
+    client_id = client.id
+    db.close()
+    sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.headers, client_id
+
+
+def test_build_schedule_absorbs_rounding_in_last_installment():
+    rows = build_schedule(100.0, 100.0 / 3, 3, business_date())
+    assert [r["amount"] for r in rows] == [33.33, 33.33, 33.34]
+    assert [r["number"] for r in rows] == [1, 2, 3]
+    assert rows[0]["due_date"] < rows[-1]["due_date"]
+
+
+def test_payments_fill_oldest_installments(api):
+    client, headers, client_id = api
+    admin = headers("cs_admin")
+    credit = client.post("/api/v1/credits/", json={
+        "client_id": client_id, "amount": 100.0, "interest_rate": 20.0, "term_days": 20,
+    }, headers=admin).json()
+    schedule = client.get(f"/api/v1/credits/{credit['id']}/schedule", headers=admin).json()
+    assert len(schedule) == 20
+    assert sum(i["amount"] for i in schedule) == pytest.approx(120.0)
+    assert credit["end_date"].startswith(schedule[-1]["due_date"])
+
+    resp = client.post("/api/v1/transactions/", json={
+        "amount": 9.0, "transaction_type": "payment", "credit_id": credit["id"],
+    }, headers=admin)
+    assert resp.status_code == 201, resp.text
+    resp = client.post("/api/v1/transactions/batch", json={"items": [
+        {"client_ref": "cs-1", "amount": 3.0, "transaction_type": "payment", "credit_id": credit["id"]},
+        {"client_ref": "cs-2", "amount": 4.0, "transaction_type": "payment", "credit_id": credit["id"]},
+    ]}, headers=admin)
+    assert resp.status_code == 200, resp.text
+
+    schedule = client.get(f"/api/v1/credits/{credit['id']}/schedule", headers=admin).json()
+    assert [(i["paid_amount"], i["status"]) for i in schedule[:4]] == [
+        (6.0, "paid"), (6.0, "paid"), (4.0, "partial"), (0.0, "pending"),
+    ]
+    assert schedule[0]["paid_at"] is not None
+    assert sum(i["paid_amount"] for i in schedule) == pytest.approx(16.0)
+
+
+def test_patching_remaining_amount_rebuilds_the_schedule(api):
+    client, headers, client_id = api
+    admin = headers("cs_admin")
+    credit = client.post("/api/v1/credits/", json={
+        "client_id": client_id, "amount": 100.0, "interest_rate": 20.0, "term_days": 20,
+    }, headers=admin).json()
+    url = f"/api/v1/credits/{credit['id']}"
+    assert client.post("/api/v1/transactions/", json={
+        "amount": 9.0, "transaction_type": "payment", "credit_id": credit["id"],
+    }, headers=admin).status_code == 201
+
+    # Corrección manual: el cliente ya pagó 27 (4 cuotas y media)
+    resp = client.patch(url, json={"remaining_amount": 93.0, "status": None}, headers=admin)
+    assert resp.status_code == 200, resp.text
+    schedule = client.get(f"{url}/schedule", headers=admin).json()
+    assert [i["status"] for i in schedule[:6]] == ["paid"] * 4 + ["partial", "pending"]
+    assert schedule[4]["paid_amount"] == 3.0
+    assert sum(i["paid_amount"] for i in schedule) == pytest.approx(27.0)
+    assert schedule[0]["paid_at"] is not None and schedule[4]["paid_at"] is None
+
+    # Volver al total deja todas las cuotas abiertas
+    client.patch(url, json={"remaining_amount": 120.0, "status": None}, headers=admin)
+    schedule = client.get(f"{url}/schedule", headers=admin).json()
+    assert {(i["paid_amount"], i["status"], i["paid_at"]) for i in schedule} == {(0.0, "pending", None)}
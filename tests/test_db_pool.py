@@ -0,0 +1,76 @@
+"""
+Pool de conexiones medido (app/core/database.py) y GET /stats/db-pool sobre SQLite en archivo.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core import database
+from app.core.database import Base, MeteredQueuePool, create_db_engine, get_pool_stats, pool_metrics
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    # Pool chico con timeout corto para provocar esperas y agotamiento
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=0, pool_timeout=0.1,
+                              connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def api(sqlite_api, monkeypatch):
+    db = sqlite_api.Session()
+    db.add_all([
+        User(username="dp_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN),
+        User(username="dp_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR),
+    ])
+    db.commit()
+    db.close()
+    sqlite_api.load_users()
+
+    monkeypatch.setattr(database, "engine", sqlite_api.engine)
+    pool_metrics.reset()
+    yield sqlite_api.client, sqlite_api.headers, sqlite_api.engine
+    pool_metrics.reset()
+
+
+def test_file_sqlite_uses_the_metered_pool(api):
+    _, _, engine = api
+    assert isinstance(engine.pool, MeteredQueuePool)
+    stats = get_pool_stats(engine)
+    assert stats["pool_class"] == "MeteredQueuePool"
+    assert stats["size"] == 2
+
+
+def test_pool_stats_count_checkouts_and_timeouts(api):
+    _, _, engine = api
+    pool_metrics.reset()
+    first, second = engine.connect(), engine.connect()
+    assert get_pool_stats(engine)["checked_out"] == 2
+    # Pool lleno y sin overflow: la tercera espera pool_timeout y falla
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = get_pool_stats(engine)
+    assert (stats["checkouts"], stats["checkins"], stats["timeouts"], stats["checked_out"]) == (2, 2, 1, 0)
+    assert stats["wait_seconds_max"] >= stats["wait_seconds_avg"] >= 0
+
+
+def test_db_pool_endpoint_is_admin_only(api):
+    client, headers, engine = api
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    resp = client.get("/api/v1/stats/db-pool", headers=headers("dp_admin"))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["pool_class"] == "MeteredQueuePool"
+    assert body["checkouts"] >= 1 and body["timeouts"] == 0
+    assert {"size", "checked_in", "checked_out", "overflow", "max_overflow", "wait_seconds_avg"} <= set(body)
+
+    assert client.get("/api/v1/stats/db-pool", headers=headers("dp_col")).status_code == 403
@@ -0,0 +1,64 @@
+"""
+Exportación por lotes (app/crud/export.py + app/core/export.py) sobre SQLite temporal.
+"""
+import csv
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import export as encoders
+from app.core.database import Base
+from app.crud.export import EXPORT_MODELS, export_select, iter_export_rows
+from app.models.user import User, RoleType
+from app.models.client import Client
+
+ROWS = 2500
+BATCH = 1000
+
+
+@pytest.fixture(scope="module")
+def session(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('export') / 'export.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    collectors = [User(username=f"e_col{i}", hashed_password="x", full_name=f"C{i}", role=RoleType.COLLECTOR) for i in range(2)]
+    db.add_all(collectors)
+    db.flush()
+    db.add_all([
+        Client(dni=f"e{i}", full_name=f"Cliente, {i}", phone="1", collector_id=collectors[i % 2].id)
+        for i in range(ROWS)
+    ])
+    db.commit()
+    yield db, [c.id for c in collectors]
+    db.close()
+    engine.dispose()
+
+
+def test_rows_are_read_in_batches_within_scope(session):
+    db, collector_ids = session
+    batches = list(iter_export_rows(db, export_select("clients", collector_ids[:1]), BATCH))
+    assert [len(b) for b in batches] == [BATCH, ROWS // 2 - BATCH]
+    assert list(iter_export_rows(db, export_select("clients", []), BATCH)) == []
+
+
+def test_csv_streams_one_chunk_per_batch(session):
+    db, _ = session
+    columns = list(EXPORT_MODELS["clients"].__table__.columns)
+    chunks = list(encoders.iter_csv(columns, iter_export_rows(db, export_select("clients"), BATCH)))
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == ROWS
+    assert rows[0]["full_name"] == "Cliente, 0"
+
+
+@pytest.mark.skipif(encoders.pa is None, reason="pyarrow no instalado")
+def test_parquet_round_trip(session):
+    db, collector_ids = session
+    columns = list(EXPORT_MODELS["clients"].__table__.columns)
+    batches = iter_export_rows(db, export_select("clients", collector_ids[1:]), BATCH)
+    data = b"".join(encoders.iter_parquet(columns, batches))
+    table = encoders.pq.read_table(io.BytesIO(data))
+    assert table.num_rows == ROWS // 2
+    assert set(table.column("collector_id").to_pylist()) == {collector_ids[1]}
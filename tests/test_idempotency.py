@@ -0,0 +1,99 @@
+"""
+Idempotency-Key en POST /transactions sobre una base SQLite temporal: reintentos,
+clave reutilizada con otro contenido, operación en curso y fallo antes de guardar la respuesta.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.crud import idempotency as crud_idempotency
+from app.crud import ledger
+from app.models.cash_transaction import CashTransaction
+from app.models.idempotency import IdempotencyKey
+from app.models.user import User, RoleType
+from app.schemas.transaction import TransactionCreate
+
+DEPOSIT = {"amount": 50.0, "transaction_type": "deposit"}
+
+
+@pytest.fixture
+def api(sqlite_api):
+    db = sqlite_api.Session()
+    admin = User(username="id_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    db.add(admin)
+    db.commit()
+    admin_id = admin.id
+    db.close()
+    sqlite_api.load_users()
+
+    def post(key, payload=DEPOSIT, client=sqlite_api.client):
+        return client.post("/api/v1/transactions/", json=payload,
+                           headers={**sqlite_api.headers("id_admin"), "Idempotency-Key": key})
+
+    return post, admin_id, sqlite_api.Session
+
+
+def _state(Session, admin_id):
+    db = Session()
+    try:
+        return db.query(CashTransaction).count(), ledger.get_balance(db, admin_id)
+    finally:
+        db.close()
+
+
+def test_retry_replays_the_stored_response(api):
+    post, admin_id, Session = api
+    first = post("k-1")
+    assert first.status_code == 201
+    retry = post("k-1")
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert _state(Session, admin_id) == (1, 50.0)
+
+
+def test_key_reused_with_another_body_is_rejected(api):
+    post, admin_id, Session = api
+    assert post("k-1").status_code == 201
+    resp = post("k-1", {"amount": 60.0, "transaction_type": "deposit"})
+    assert resp.status_code == 409
+    assert _state(Session, admin_id) == (1, 50.0)
+
+
+def test_duplicate_while_the_first_request_is_in_flight(api):
+    post, admin_id, Session = api
+    # La reserva de otro request con la misma clave, todavía sin respuesta
+    db = Session()
+    req_hash = crud_idempotency.request_hash("POST /transactions", TransactionCreate(**DEPOSIT).model_dump(mode="json"))
+    db.add(IdempotencyKey(
+        user_id=admin_id, key="k-1", request_hash=req_hash,
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+    ))
+    db.commit()
+    db.close()
+
+    resp = post("k-1")
+    assert resp.status_code == 409
+    assert "en curso" in resp.json()["detail"]
+    assert _state(Session, admin_id) == (0, 0.0)
+
+
+def test_failure_before_saving_the_response_commits_nothing(api, monkeypatch):
+    post, admin_id, Session = api
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("caída entre la operación y la respuesta")
+
+    monkeypatch.setattr(crud_idempotency, "save_response", crash)
+    resp = post("k-1", client=TestClient(app, raise_server_exceptions=False))
+    assert resp.status_code == 500
+    # La operación del handler (llamado con commit=False) no quedó confirmada sin su respuesta
+    assert _state(Session, admin_id) == (0, 0.0)
+    monkeypatch.undo()
+
+    # La clave no quedó atascada: el reintento se ejecuta una sola vez
+    assert post("k-1").status_code == 201
+    assert post("k-1").headers["Idempotent-Replayed"] == "true"
+    assert _state(Session, admin_id) == (1, 50.0)
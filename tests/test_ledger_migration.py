@@ -0,0 +1,96 @@
+"""
+Migración al libro mayor (f0605e479aae): upgrade consolida la base de la caja y el saldo
+de cash_balances en la cuenta principal, y downgrade vuelve a separarlos sin pérdida.
+Corre upgrade()/downgrade() sobre las tablas previas creadas a mano en SQLite.
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "f0605e479aae_create_ledger_and_backfill.py"
+
+# Esquema previo a la migración (solo las columnas que lee o elimina)
+PREVIOUS_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR)",
+    "CREATE TABLE credits (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE boxes (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users(id), "
+    "base_balance FLOAT, insurance_balance FLOAT, last_updated DATETIME)",
+    "CREATE TABLE box_movements (id INTEGER PRIMARY KEY, box_id INTEGER REFERENCES boxes(id), amount FLOAT NOT NULL, "
+    "movement_type VARCHAR NOT NULL, description VARCHAR, is_insurance BOOLEAN, created_at DATETIME, "
+    "performed_by_id INTEGER REFERENCES users(id))",
+    "CREATE INDEX ix_box_movements_id ON box_movements (id)",
+    "CREATE INDEX ix_box_movements_box_id_created_at ON box_movements (box_id, created_at)",
+    "CREATE TABLE cash_balances (user_id INTEGER PRIMARY KEY REFERENCES users(id), balance FLOAT NOT NULL, updated_at DATETIME)",
+    "CREATE TABLE cash_transactions (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users(id), "
+    "credit_id INTEGER REFERENCES credits(id), amount FLOAT, transaction_type VARCHAR, description VARCHAR, created_at DATETIME)",
+]
+
+
+@pytest.fixture
+def migration():
+    spec = importlib.util.spec_from_file_location("ledger_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(engine, step):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            step()
+
+
+def _balances(conn):
+    boxes = {row.user_id: (row.base_balance, row.insurance_balance) for row in conn.execute(
+        sa.text("SELECT user_id, base_balance, insurance_balance FROM boxes"))}
+    cash = dict(conn.execute(sa.text("SELECT user_id, balance FROM cash_balances")).all())
+    return boxes, cash
+
+
+def test_upgrade_downgrade_keeps_box_base_and_cash_balance_apart(tmp_path, migration):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migration.db'}")
+    with engine.begin() as conn:
+        for ddl in PREVIOUS_SCHEMA:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("INSERT INTO users (id, username) VALUES (1, 'col1'), (2, 'col2'), (3, 'sin_caja')")
+        conn.exec_driver_sql(
+            "INSERT INTO boxes (id, user_id, base_balance, insurance_balance) VALUES (1, 1, 300.0, 15.0), (2, 2, 80.0, 0.0)"
+        )
+        # Caja 1: su historial explica 250 de 300 (50 vienen de ediciones directas)
+        conn.exec_driver_sql(
+            "INSERT INTO box_movements (box_id, amount, movement_type, is_insurance) "
+            "VALUES (1, 250.0, 'DEPOSIT', 0), (1, 15.0, 'INSURANCE', 1)"
+        )
+        # Transacciones: col1 suma 70 pero su saldo materializado quedó en 75 (deriva)
+        conn.exec_driver_sql(
+            "INSERT INTO cash_transactions (user_id, amount, transaction_type) VALUES "
+            "(1, 100.0, 'DEPOSIT'), (1, 30.0, 'WITHDRAWAL'), (2, 20.0, 'PAYMENT'), (3, 5.0, 'DEPOSIT')"
+        )
+        conn.exec_driver_sql("INSERT INTO cash_balances (user_id, balance) VALUES (1, 75.0), (2, 20.0), (3, 5.0)")
+        original = _balances(conn)
+
+    _run(engine, migration.upgrade)
+    with engine.connect() as conn:
+        principal = dict(conn.execute(sa.text(
+            "SELECT user_id, balance FROM ledger_accounts WHERE account_type = 'PRINCIPAL'"
+        )).all())
+        # Consolidado: base de la caja + saldo de caja
+        assert principal == {1: 375.0, 2: 100.0, 3: 5.0}
+        # Cada cuenta de usuario coincide con sus partidas y el libro suma cero
+        drift = conn.execute(sa.text(
+            "SELECT COUNT(*) FROM ledger_accounts a WHERE a.user_id IS NOT NULL AND ABS(a.balance - "
+            "(SELECT COALESCE(SUM(p.amount), 0) FROM ledger_postings p WHERE p.account_id = a.id)) > 1e-9"
+        )).scalar()
+        assert drift == 0
+        assert abs(conn.execute(sa.text("SELECT SUM(amount) FROM ledger_postings")).scalar()) < 1e-9
+
+    _run(engine, migration.downgrade)
+    with engine.connect() as conn:
+        assert _balances(conn) == original
+        # El historial de la caja no incluye la apertura del saldo de caja
+        assert conn.execute(sa.text("SELECT COUNT(*) FROM box_movements WHERE movement_type = 'OPENING_CASH'")).scalar() == 0
+    engine.dispose()
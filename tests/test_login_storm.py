@@ -0,0 +1,69 @@
+"""
+Benchmark: latencia de otros endpoints durante una tormenta de logins.
+
+Lanza LOGIN_STORM_SIZE logins concurrentes (por defecto 100, como al inicio del turno)
+y mientras tanto mide GET /health. Reporta p50/p99 y falla si el p99 supera
+LOGIN_STORM_MAX_P99_MS. Requiere un usuario válido:
+    BENCH_USERNAME=... BENCH_PASSWORD=... pytest -s tests/test_login_storm.py
+"""
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+BASE = os.getenv("BASE_URL", "http://127.0.0.1:8000")
+USERNAME = os.getenv("BENCH_USERNAME")
+PASSWORD = os.getenv("BENCH_PASSWORD")
+STORM_SIZE = int(os.getenv("LOGIN_STORM_SIZE", "100"))
+MAX_P99_MS = float(os.getenv("LOGIN_STORM_MAX_P99_MS", "500"))
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+@pytest.mark.skipif(not (USERNAME and PASSWORD), reason="Falta variable de entorno: BENCH_USERNAME/BENCH_PASSWORD")
+def test_login_storm_does_not_stall_other_requests():
+    done = threading.Event()
+    latencies_ms = []
+
+    def probe():
+        with requests.Session() as s:
+            while not done.is_set():
+                start = time.perf_counter()
+                r = s.get(f"{BASE}/health", timeout=30)
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+                assert r.status_code == 200
+
+    def login(_):
+        r = requests.post(
+            f"{BASE}/api/v1/auth/token",
+            data={"username": USERNAME, "password": PASSWORD},
+            timeout=120,
+        )
+        return r.status_code
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    storm_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STORM_SIZE) as pool:
+        statuses = list(pool.map(login, range(STORM_SIZE)))
+    storm_s = time.perf_counter() - storm_start
+    done.set()
+    prober.join()
+
+    assert statuses.count(200) == STORM_SIZE, statuses
+    assert latencies_ms, "no se midió ninguna petición durante la tormenta"
+    p50 = statistics.median(latencies_ms)
+    p99 = _percentile(latencies_ms, 99)
+    print(
+        f"\n{STORM_SIZE} logins en {storm_s:.1f}s | /health durante la tormenta: "
+        f"n={len(latencies_ms)} p50={p50:.1f}ms p99={p99:.1f}ms max={max(latencies_ms):.1f}ms"
+    )
+    assert p99 <= MAX_P99_MS, f"p99 de /health {p99:.1f}ms supera {MAX_P99_MS}ms"
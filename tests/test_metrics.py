@@ -0,0 +1,70 @@
+"""
+Middleware de métricas (app/core/metrics.py) sobre una app mínima con SQLite en memoria.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import metrics
+from app.core.config import settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as conn:
+            for _ in range(item_id):
+                conn.execute(text("SELECT 'secreto', 42"))
+        return {"item_id": item_id}
+
+    metrics.registry.reset()
+    monkeypatch.setattr(settings, "metrics_route_budgets", {"GET /items/{item_id}": {"sql": 2}})
+    yield TestClient(app)
+    metrics.registry.reset()
+    engine.dispose()
+
+
+def test_requests_are_grouped_by_route_template_with_sql_counts(client):
+    client.get("/items/1")
+    client.get("/items/3")
+
+    text_format = metrics.registry.render_prometheus()
+    labels = 'method="GET",route="/items/{item_id}"'
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in text_format
+    assert f'http_requests_total{{{labels},status="200"}} 2' in text_format
+    assert f"http_sql_statements_total{{{labels}}} 4" in text_format
+    # Solo /items/3 supera el presupuesto de 2 sentencias
+    assert f"http_budget_exceeded_total{{{labels}}} 1" in text_format
+    assert "/items/3" not in text_format
+
+
+def test_slow_query_samples_are_redacted(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_slow_query_ms", 0)
+    client.get("/items/1")
+
+    sample = metrics.registry.slow_queries()[0]
+    assert sample["route"] == "/items/{item_id}"
+    assert sample["statement"] == "SELECT ?, ?"
+
+
+def test_metrics_endpoint_requires_token(monkeypatch):
+    from app import main
+
+    client = TestClient(main.app)
+    monkeypatch.setattr(main.settings, "metrics_enabled", True)
+    monkeypatch.setattr(main.settings, "metrics_token", None)
+    # Sin token configurado no se expone, aunque las métricas estén activas
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(main.settings, "metrics_token", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    monkeypatch.setattr(main.settings, "metrics_enabled", False)
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 404
@@ -0,0 +1,94 @@
+"""
+Caché de principals (app/core/principal.py): el token se valida sin cargar el User en
+cada request y los cambios de rol, estado o username se ven en el request siguiente.
+"""
+import pytest
+
+from app.core import principal as principal_module
+from app.core.principal import get_principal, invalidate_principal
+from app.core.security import create_access_token
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def api(sqlite_api, monkeypatch):
+    db = sqlite_api.Session()
+    db.add(User(username="pc_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN))
+    db.commit()
+    admin_id = db.query(User.id).scalar()
+    db.close()
+    sqlite_api.load_users()
+
+    loads = []
+    real = principal_module.load_principal
+
+    def counting(*args, **kwargs):
+        loads.append(args[1])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(principal_module, "load_principal", counting)
+
+    def get(token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else sqlite_api.headers("pc_admin")
+        return sqlite_api.client.get("/api/v1/items", headers=headers)
+
+    return get, sqlite_api.Session, loads, admin_id
+
+
+def _update_admin(Session, **values):
+    db = Session()
+    try:
+        user = db.query(User).filter(User.username == "pc_admin").one()
+        for name, value in values.items():
+            setattr(user, name, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_principal_is_loaded_once_per_ttl(api):
+    get, Session, loads, admin_id = api
+    assert get().status_code == 200
+    assert get().status_code == 200
+    assert loads == ["pc_admin"]
+
+    db = Session()
+    try:
+        principal = get_principal(db, "pc_admin", admin_id)
+        assert (principal.id, principal.role, principal.is_active) == (admin_id, RoleType.ADMIN, True)
+        # Un uid que no corresponde al username no valida
+        invalidate_principal()
+        assert get_principal(db, "pc_admin", admin_id + 1) is None
+    finally:
+        db.close()
+
+
+def test_role_change_and_deactivation_apply_on_the_next_request(api):
+    get, Session, loads, _ = api
+    assert get().status_code == 200
+
+    _update_admin(Session, role=RoleType.COLLECTOR)
+    assert get().status_code == 403
+
+    _update_admin(Session, role=RoleType.ADMIN, is_active=False)
+    resp = get()
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Inactive user"
+    assert len(loads) == 3
+
+
+def test_renamed_user_old_token_stops_working(api):
+    get, Session, loads, admin_id = api
+    assert get().status_code == 200
+    _update_admin(Session, username="pc_admin2")
+    assert get().status_code == 401
+    token = create_access_token({"sub": "pc_admin2", "uid": admin_id})
+    assert get(token).status_code == 200
+
+
+def test_unrelated_updates_keep_the_cached_principal(api):
+    get, Session, loads, _ = api
+    get()
+    _update_admin(Session, full_name="Otro nombre")
+    get()
+    assert loads == ["pc_admin"]
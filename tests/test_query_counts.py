@@ -0,0 +1,126 @@
+"""
+Presupuesto de consultas SQL por endpoint (detecta N+1).
+
+Cuenta las sentencias que emite cada petición contra una base SQLite temporal con
+varios clientes y créditos; si un serializador o un permiso vuelve a cargar relaciones
+fila por fila, el conteo crece con los datos y la prueba falla. Las cachés de
+principal y de alcance se calientan con una primera petición: se mide el estado estable.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User, RoleType
+from app.models.client import Client
+from app.models.credit import Credit
+from app.models.cash_transaction import CashTransaction, TransactionType
+
+ROWS = 10
+
+
+@contextmanager
+def count_queries(engine):
+    """Acumula en una lista las sentencias SQL ejecutadas sobre `engine` dentro del bloque."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+@pytest.fixture(scope="module")
+def api(module_sqlite_api):
+    db = module_sqlite_api.Session()
+    admin = User(username="q_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    sup = User(username="q_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    db.add_all([admin, sup])
+    db.flush()
+    collectors = [
+        User(username=f"q_col{i}", hashed_password="x", full_name=f"Col {i}", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+        for i in range(2)
+    ]
+    db.add_all(collectors)
+    db.flush()
+    for i in range(ROWS):
+        collector = collectors[i % 2]
+        client = Client(dni=f"q{i}", full_name=f"Cliente {i}", phone="1", collector_id=collector.id)
+        db.add(client)
+        db.flush()
+        credit = Credit(
+            client_id=client.id, amount=100.0, interest_rate=20.0, term_days=20, insurance_amount=0.0,
+            total_amount=120.0, remaining_amount=120.0, daily_payment=6.0,
+        )
+        db.add(credit)
+        db.flush()
+        db.add(CashTransaction(
+            user_id=collector.id, credit_id=credit.id, amount=6.0, transaction_type=TransactionType.PAYMENT,
+        ))
+    db.commit()
+    first_credit_id = db.query(Credit.id).order_by(Credit.id).limit(1).scalar()
+    db.close()
+    module_sqlite_api.load_users()
+    return module_sqlite_api.client, module_sqlite_api.engine, module_sqlite_api.headers, first_credit_id
+
+
+def _measure(client, engine, method, path, headers, **kwargs):
+    client.request(method, path, headers=headers, **kwargs)  # calienta cachés de principal/alcance
+    with count_queries(engine) as statements:
+        response = client.request(method, path, headers=headers, **kwargs)
+    return response, statements
+
+
+@pytest.mark.parametrize("username", ["q_admin", "q_sup", "q_col0"])
+# Listados: solo la consulta de la página (el ETag se calcula sobre sus filas)
+@pytest.mark.parametrize("path,budget", [
+    ("/api/v1/clients/", 1),
+    ("/api/v1/credits/", 1),
+    ("/api/v1/transactions/", 1),
+])
+def test_list_endpoints_use_constant_queries(api, username, path, budget):
+    client, engine, headers, _ = api
+    response, statements = _measure(client, engine, "GET", path, headers(username))
+    assert response.status_code == 200, response.text
+    assert response.json(), "la prueba necesita filas para detectar N+1"
+    assert len(statements) <= budget, statements
+
+
+@pytest.mark.parametrize("path", ["/api/v1/clients/", "/api/v1/credits/", "/api/v1/transactions/"])
+def test_conditional_list_get_skips_page_query(api, path):
+    client, engine, headers, _ = api
+    auth = headers("q_sup")
+    etag = client.get(path, headers=auth).headers["ETag"]
+    response, statements = _measure(client, engine, "GET", path, {**auth, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(statements) == 1, statements
+
+    # ETag viejo: versión + página, y el ETag nuevo es el mismo que sin If-None-Match
+    response, statements = _measure(client, engine, "GET", path, {**auth, "If-None-Match": 'W/"viejo"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 2, statements
+
+
+@pytest.mark.parametrize("username", ["q_admin", "q_sup"])
+def test_read_credit_loads_client_in_same_query(api, username):
+    client, engine, headers, credit_id = api
+    response, statements = _measure(client, engine, "GET", f"/api/v1/credits/{credit_id}", headers(username))
+    assert response.status_code == 200, response.text
+    assert len(statements) <= 1, statements
+
+
+def test_create_payment_does_not_reload_credit(api):
+    client, engine, headers, credit_id = api
+    body = {"amount": 1.0, "transaction_type": "payment", "credit_id": credit_id}
+    # Crédito + cliente, cuentas del libro (SELECT), saldo (UPDATE), asiento y partidas (2 INSERT),
+    # cuotas abiertas (SELECT) y su UPDATE en bloque, UPDATE crédito, INSERT transacción, refresh
+    response, statements = _measure(client, engine, "POST", "/api/v1/transactions/", headers("q_admin"), json=body)
+    assert response.status_code == 201, response.text
+    assert sum(s.lstrip().upper().startswith("SELECT credits") for s in statements) <= 1, statements
+    assert len(statements) <= 10, statements
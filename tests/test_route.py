@@ -0,0 +1,97 @@
+"""
+Hoja de ruta del día (GET /route/today) sobre una base SQLite temporal.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.dates import business_date
+from app.crud.credit import build_schedule
+from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.client import Client
+from app.models.credit import Credit, CreditInstallment, CreditStatus, InstallmentStatus
+from app.models.user import User, RoleType
+
+
+def _credit(db, client, start, paid_installments=0):
+    credit = Credit(client_id=client.id, amount=100.0, interest_rate=20.0, term_days=20,
+                    total_amount=120.0, remaining_amount=120.0 - 6.0 * paid_installments, daily_payment=6.0)
+    db.add(credit)
+    db.flush()
+    for row in build_schedule(120.0, 6.0, 20, start):
+        if row["number"] <= paid_installments:
+            row.update(paid_amount=row["amount"], status=InstallmentStatus.paid)
+        db.add(CreditInstallment(credit_id=credit.id, **row))
+    return credit
+
+
+@pytest.fixture
+def api(sqlite_api):
+    today = business_date()
+    db = sqlite_api.Session()
+    sup = User(username="rt_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    db.add(sup)
+    db.flush()
+    col = User(username="rt_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    other = User(username="rt_other", hashed_password="x", full_name="Other", role=RoleType.COLLECTOR)
+    db.add_all([col, other])
+    db.flush()
+    first = Client(dni="rt1", full_name="Primero", phone="1", address="Calle 1", latitude=4.6, longitude=-74.1,
+                   collector_id=col.id, route_order=1)
+    second = Client(dni="rt2", full_name="Segundo", phone="2", collector_id=col.id, route_order=2)
+    unordered = Client(dni="rt3", full_name="Sin orden", phone="3", collector_id=col.id)
+    future = Client(dni="rt4", full_name="Empieza mañana", phone="4", collector_id=col.id, route_order=0)
+    foreign = Client(dni="rt5", full_name="Otro cobrador", phone="5", collector_id=other.id)
+    db.add_all([first, second, unordered, future, foreign])
+    db.flush()
+    # Segundo: desembolsado hace 3 días, pagó la primera cuota -> 1 atrasada + la de hoy
+    late = _credit(db, second, today - timedelta(days=3), paid_installments=1)
+    db.add(CashTransaction(user_id=col.id, credit_id=late.id, amount=6.0, transaction_type=TransactionType.PAYMENT,
+                           created_at=datetime(2026, 1, 2, 12, 0)))
+    _credit(db, first, today - timedelta(days=1))
+    _credit(db, unordered, today - timedelta(days=1))
+    _credit(db, future, today)
+    _credit(db, foreign, today - timedelta(days=1))
+    done = _credit(db, first, today - timedelta(days=1))
+    done.status = CreditStatus.completed
+    db.commit()
+    db.close()
+    users = sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.engine, sqlite_api.headers, users
+
+
+def test_route_lists_due_credits_in_route_order(api):
+    client, engine, headers, _ = api
+    statements = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        resp = client.get("/api/v1/route/today", headers=headers("rt_col"))
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert [s["client_name"] for s in body["stops"]] == ["Primero", "Segundo", "Sin orden"]
+    assert sum("credit_installments" in s for s in statements) == 1, statements
+
+    first, second, _ = body["stops"]
+    assert (first["expected_amount"], first["arrears_amount"], first["overdue_installments"]) == (6.0, 0.0, 0)
+    assert (first["address"], first["latitude"], first["last_payment_at"]) == ("Calle 1", 4.6, None)
+    assert (second["expected_amount"], second["arrears_amount"], second["overdue_installments"]) == (12.0, 6.0, 1)
+    assert second["last_payment_at"].startswith("2026-01-02")
+    assert body["total_expected"] == 24.0
+    assert body["total_arrears"] == 6.0
+
+
+def test_route_respects_visibility(api):
+    client, _, headers, users = api
+    sup = client.get("/api/v1/route/today", headers=headers("rt_sup")).json()
+    assert {s["collector_id"] for s in sup["stops"]} == {users["rt_col"]}
+    other = client.get("/api/v1/route/today", headers=headers("rt_other")).json()
+    assert [s["client_name"] for s in other["stops"]] == ["Otro cobrador"]
+    resp = client.get("/api/v1/route/today", params={"collector_id": users["rt_other"]}, headers=headers("rt_sup"))
+    assert resp.status_code == 403
@@ -0,0 +1,140 @@
+"""
+Estadísticas (crud.stats): totales y desgloses en una consulta, comparados con el cálculo
+tabla por tabla sobre una base SQLite temporal.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import stats as crud_stats
+from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.client import Client
+from app.models.credit import Credit, CreditStatus
+from app.models.user import User, RoleType
+
+FIELDS = ("total_cobranzas", "total_clientes", "total_pendientes", "total_realizadas", "monto_total")
+
+
+@pytest.fixture
+def db(sqlite_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+
+    sup = User(username="st_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    session.add(sup)
+    session.flush()
+    col1 = User(username="st_col1", hashed_password="x", full_name="Col 1", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    col2 = User(username="st_col2", hashed_password="x", full_name="Col 2", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    lone = User(username="st_lone", hashed_password="x", full_name="Sin supervisor", role=RoleType.COLLECTOR)
+    session.add_all([col1, col2, lone])
+    session.flush()
+
+    clients = [
+        Client(dni="st1", full_name="A", phone="1", collector_id=col1.id),
+        Client(dni="st2", full_name="B", phone="2", collector_id=col1.id, is_active=False),
+        Client(dni="st3", full_name="C", phone="3", collector_id=col2.id),
+        Client(dni="st4", full_name="D", phone="4", collector_id=lone.id),
+        Client(dni="st5", full_name="E", phone="5", collector_id=sup.id),
+    ]
+    session.add_all(clients)
+    session.flush()
+    statuses = [CreditStatus.active, CreditStatus.completed, CreditStatus.active, CreditStatus.defaulted, CreditStatus.completed]
+    for client, status in zip(clients, statuses):
+        session.add(Credit(client_id=client.id, amount=100.0, total_amount=120.0, remaining_amount=60.0, status=status))
+    payments = [
+        (col1, 10.0, datetime(2026, 3, 1, 9)), (col1, 5.5, datetime(2026, 3, 2, 18)),
+        (col2, 7.0, datetime(2026, 3, 2, 8)), (lone, 3.0, datetime(2026, 3, 3, 12)),
+        (sup, 20.0, datetime(2026, 3, 3, 23, 59)),
+    ]
+    for user, amount, created_at in payments:
+        session.add(CashTransaction(user_id=user.id, amount=amount, transaction_type=TransactionType.PAYMENT,
+                                    created_at=created_at))
+    session.commit()
+    users = {u.username: u for u in session.query(User)}
+
+    yield session, users
+
+    session.close()
+
+
+def _baseline(db, start_date=None, end_date=None, user_ids=None):
+    """Las mismas métricas calculadas tabla por tabla en Python, agrupadas por cobrador."""
+    per_collector = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    per_day = defaultdict(lambda: {"total_cobranzas": 0, "monto_total": 0})
+    for tx in db.query(CashTransaction):
+        day = tx.created_at.date()
+        if (user_ids is not None and tx.user_id not in user_ids) or (start_date and day < start_date) \
+                or (end_date and day > end_date):
+            continue
+        per_collector[tx.user_id]["total_cobranzas"] += 1
+        per_collector[tx.user_id]["monto_total"] += tx.amount
+        per_day[str(day)]["total_cobranzas"] += 1
+        per_day[str(day)]["monto_total"] += tx.amount
+    for client in db.query(Client).filter(Client.is_active == True):
+        if user_ids is None or client.collector_id in user_ids:
+            per_collector[client.collector_id]["total_clientes"] += 1
+    for credit in db.query(Credit):
+        if user_ids is None or credit.client.collector_id in user_ids:
+            row = per_collector[credit.client.collector_id]
+            row["total_pendientes"] += credit.status == CreditStatus.active
+            row["total_realizadas"] += credit.status == CreditStatus.completed
+    return per_collector, per_day
+
+
+def _by_supervisor(db, per_collector):
+    grouped = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for user_id, row in per_collector.items():
+        user = db.get(User, user_id)
+        key = user.id if user.role == RoleType.SUPERVISOR else user.supervisor_id
+        for field in FIELDS:
+            grouped[key][field] += row[field]
+    return grouped
+
+
+def _keyed(breakdown):
+    return {row["key"]: {k: v for k, v in row.items() if k != "key"} for row in breakdown}
+
+
+@pytest.mark.parametrize("scoped", [False, True])
+def test_totals_and_breakdowns_match_per_table_counts(db, scoped):
+    session, users = db
+    user_ids = [users["st_col1"].id, users["st_lone"].id] if scoped else None
+    per_collector, per_day = _baseline(session, user_ids=user_ids)
+
+    result = crud_stats.get_stats(session, user_ids=user_ids)
+    assert {f: result[f] for f in FIELDS} == {f: pytest.approx(sum(r[f] for r in per_collector.values())) for f in FIELDS}
+
+    by_collector = crud_stats.get_stats(session, user_ids=user_ids, group_by="collector")["breakdown"]
+    assert _keyed(by_collector) == per_collector
+    assert [row["key"] for row in by_collector] == sorted(per_collector)
+
+    by_supervisor = crud_stats.get_stats(session, user_ids=user_ids, group_by="supervisor")["breakdown"]
+    assert _keyed(by_supervisor) == _by_supervisor(session, per_collector)
+
+    by_day = crud_stats.get_stats(session, user_ids=user_ids, group_by="day")["breakdown"]
+    assert _keyed(by_day) == per_day
+    assert [row["key"] for row in by_day] == sorted(per_day)
+
+
+def test_supervisor_breakdown_groups_team_and_own_movements(db):
+    session, users = db
+    sup, lone = users["st_sup"].id, users["st_lone"].id
+    breakdown = _keyed(crud_stats.get_stats(session, group_by="supervisor")["breakdown"])
+    # Sus dos cobradores más su propia cartera; el cobrador sin supervisor queda bajo None
+    assert breakdown[sup]["total_cobranzas"] == 4
+    assert breakdown[sup]["monto_total"] == pytest.approx(42.5)
+    assert breakdown[sup]["total_clientes"] == 3
+    assert breakdown[None]["monto_total"] == pytest.approx(3.0)
+    assert lone not in breakdown
+
+
+def test_date_range_only_filters_transactions(db):
+    session, _ = db
+    start, end = date(2026, 3, 2), date(2026, 3, 2)
+    per_collector, per_day = _baseline(session, start_date=start, end_date=end)
+    result = crud_stats.get_stats(session, start_date=start, end_date=end, group_by="day")
+    assert result["total_cobranzas"] == 2
+    assert result["monto_total"] == pytest.approx(12.5)
+    assert result["total_clientes"] == sum(r["total_clientes"] for r in per_collector.values())
+    assert _keyed(result["breakdown"]) == per_day
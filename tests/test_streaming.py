@@ -0,0 +1,70 @@
+"""
+Listados en streaming (?stream=ndjson|json) sobre una base SQLite temporal.
+"""
+import json
+
+import pytest
+
+from app.core import streaming
+from app.models.user import User, RoleType
+from app.models.client import Client
+from app.models.credit import Credit
+
+CLIENTS = 7
+
+
+@pytest.fixture
+def api(sqlite_api, monkeypatch):
+    db = sqlite_api.Session()
+    admin = User(username="st_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    col_a = User(username="st_col_a", hashed_password="x", full_name="A", role=RoleType.COLLECTOR)
+    col_b = User(username="st_col_b", hashed_password="x", full_name="B", role=RoleType.COLLECTOR)
+    db.add_all([admin, col_a, col_b])
+    db.flush()
+    for i in range(CLIENTS):
+        client = Client(dni=f"st{i}", full_name=f"Cliente {i}", phone="1",
+                        collector_id=(col_a if i % 2 == 0 else col_b).id)
+        db.add(client)
+        db.flush()
+        db.add(Credit(client_id=client.id, amount=100.0, interest_rate=20.0, term_days=20,
+                      total_amount=120.0, remaining_amount=120.0, daily_payment=6.0))
+    db.commit()
+    db.close()
+    # Lotes chicos para que la respuesta se arme con varios chunks
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 2)
+    sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.headers
+
+
+@pytest.mark.parametrize("path", ["/api/v1/clients/", "/api/v1/credits/", "/api/v1/transactions/"])
+def test_json_stream_matches_regular_list(api, path):
+    client, headers = api
+    admin = headers("st_admin")
+    regular = client.get(path, headers=admin)
+    streamed = client.get(path, params={"stream": "json"}, headers=admin)
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "application/json"
+    assert streamed.json() == regular.json()
+
+
+def test_ndjson_stream_respects_scope_and_paging(api):
+    client, headers = api
+    resp = client.get("/api/v1/clients/", params={"stream": "ndjson", "limit": 3}, headers=headers("st_col_a"))
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["dni"] for r in rows] == ["st0", "st2", "st4"]
+
+
+def test_stream_keeps_etag_and_conditional_get(api):
+    client, headers = api
+    admin = headers("st_admin")
+    resp = client.get("/api/v1/credits/", params={"stream": "ndjson"}, headers=admin)
+    assert len(resp.text.splitlines()) == CLIENTS
+    etag = resp.headers["etag"]
+    again = client.get("/api/v1/credits/", params={"stream": "ndjson"}, headers={**admin, "If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_invalid_stream_mode_is_rejected(api):
+    client, headers = api
+    assert client.get("/api/v1/clients/", params={"stream": "xml"}, headers=headers("st_admin")).status_code == 422
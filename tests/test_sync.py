@@ -0,0 +1,88 @@
+"""
+Sincronización incremental (GET /api/v1/sync) sobre una base SQLite temporal.
+"""
+import pytest
+
+from app.core.config import settings
+from app.models.user import User, RoleType
+from app.models.client import Client
+from app.models.credit import Credit
+
+
+@pytest.fixture
+def api(sqlite_api, monkeypatch):
+    db = sqlite_api.Session()
+    admin = User(username="s_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    col_a = User(username="s_col_a", hashed_password="x", full_name="A", role=RoleType.COLLECTOR)
+    col_b = User(username="s_col_b", hashed_password="x", full_name="B", role=RoleType.COLLECTOR)
+    db.add_all([admin, col_a, col_b])
+    db.flush()
+    for i, collector in enumerate([col_a, col_a, col_b]):
+        client = Client(dni=f"s{i}", full_name=f"Cliente {i}", phone="1", collector_id=collector.id)
+        db.add(client)
+        db.flush()
+        db.add(Credit(client_id=client.id, amount=100.0, interest_rate=20.0, term_days=20,
+                      total_amount=120.0, remaining_amount=120.0, daily_payment=6.0))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(settings, "sync_overlap_seconds", 0)
+    users = sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.headers, users
+
+
+def test_full_sync_then_empty_delta(api):
+    client, headers, _ = api
+    first = client.get("/api/v1/sync/", headers=headers("s_col_a")).json()
+    assert first["full_resync"] is True
+    assert [c["dni"] for c in first["clients"]] == ["s0", "s1"]
+    assert len(first["credits"]) == 2
+
+    delta = client.get("/api/v1/sync/", params={"since": first["cursor"]}, headers=headers("s_col_a")).json()
+    assert delta["full_resync"] is False
+    assert delta["clients"] == delta["credits"] == []
+    assert delta["deleted"] == {"clients": [], "credits": []}
+
+
+def test_delta_returns_changes_and_tombstones_within_scope(api):
+    client, headers, users = api
+    cursor = client.get("/api/v1/sync/", headers=headers("s_col_a")).json()["cursor"]
+    admin = headers("s_admin")
+    clients = client.get("/api/v1/clients/", headers=admin).json()
+    ids = {c["dni"]: c["id"] for c in clients}
+    credits = client.get("/api/v1/credits/", headers=admin).json()
+
+    client.put(f"/api/v1/clients/{ids['s0']}", headers=admin, json={"full_name": "Editado"})
+    client.put(f"/api/v1/clients/{ids['s1']}", headers=admin, json={"collector_id": users["s_col_b"]})
+    client.delete(f"/api/v1/clients/{ids['s2']}", headers=admin)
+
+    delta_a = client.get("/api/v1/sync/", params={"since": cursor}, headers=headers("s_col_a")).json()
+    assert [c["full_name"] for c in delta_a["clients"]] == ["Editado"]
+    assert delta_a["deleted"]["clients"] == [ids["s1"]]
+    # El crédito del cliente reasignado también se borra del dispositivo anterior
+    assert delta_a["deleted"]["credits"] == [c["id"] for c in credits if c["client_id"] == ids["s1"]]
+
+    delta_b = client.get("/api/v1/sync/", params={"since": cursor}, headers=headers("s_col_b")).json()
+    assert [c["id"] for c in delta_b["clients"]] == [ids["s1"]]
+    assert delta_b["deleted"]["clients"] == [ids["s2"]]
+    assert delta_b["deleted"]["credits"] == [c["id"] for c in credits if c["client_id"] == ids["s2"]]
+
+
+def test_deactivated_client_tombstones_its_credits(api):
+    client, headers, users = api
+    cursor = client.get("/api/v1/sync/", headers=headers("s_col_a")).json()["cursor"]
+    admin = headers("s_admin")
+    target = client.get("/api/v1/clients/", headers=admin).json()[0]
+    credit_ids = [c["id"] for c in client.get("/api/v1/credits/", headers=admin).json() if c["client_id"] == target["id"]]
+
+    # DELETE desactiva el cliente (soft delete)
+    assert client.delete(f"/api/v1/clients/{target['id']}", headers=admin).status_code == 204
+
+    delta = client.get("/api/v1/sync/", params={"since": cursor}, headers=headers("s_col_a")).json()
+    assert delta["deleted"] == {"clients": [target["id"]], "credits": credit_ids}
+    other = client.get("/api/v1/sync/", params={"since": cursor}, headers=headers("s_col_b")).json()
+    assert other["deleted"] == {"clients": [], "credits": []}
+
+
+def test_invalid_cursor_is_rejected(api):
+    client, headers, _ = api
+    assert client.get("/api/v1/sync/", params={"since": "no-es-un-cursor"}, headers=headers("s_col_a")).status_code == 400
@@ -0,0 +1,140 @@
+"""
+Sincronización de pagos en lote (POST /transactions/batch) sobre una base SQLite temporal.
+"""
+import pytest
+
+from app.crud import ledger
+from app.models.cash_transaction import CashTransaction
+from app.models.client import Client
+from app.models.credit import Credit
+from app.models.ledger import LedgerEntry
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def api(sqlite_api):
+    Session = sqlite_api.Session
+
+    db = Session()
+    admin = User(username="tb_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    col = User(username="tb_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR)
+    col2 = User(username="tb_col2", hashed_password="x", full_name="Col 2", role=RoleType.COLLECTOR)
+    db.add_all([admin, col, col2])
+    db.flush()
+    client = Client(dni="tb1", full_name="Cliente", phone="1", collector_id=col.id)
+    client2 = Client(dni="tb2", full_name="Cliente 2", phone="2", collector_id=col2.id)
+    db.add_all([client, client2])
+    db.flush()
+    credit = Credit(client_id=client.id, amount=100.0, interest_rate=20.0, term_days=20,
+                    total_amount=120.0, remaining_amount=120.0, daily_payment=6.0)
+    credit2 = Credit(client_id=client2.id, amount=100.0, interest_rate=20.0, term_days=20,
+                     total_amount=120.0, remaining_amount=120.0, daily_payment=6.0)
+    db.add_all([credit, credit2])
+    db.commit()
+    credit_ids = {"tb_col": credit.id, "tb_col2": credit2.id}
+    db.close()
+    users = sqlite_api.load_users()
+    return sqlite_api.client, sqlite_api.headers, users, credit_ids, Session
+
+
+def test_collector_batch_only_registers_payments(api):
+    client, headers, users, credit_ids, Session = api
+    resp = client.post("/api/v1/transactions/batch", json={"items": [
+        {"client_ref": "tb-dep", "amount": 1000000.0, "transaction_type": "deposit"},
+        {"client_ref": "tb-pay", "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col"]},
+    ]}, headers=headers("tb_col"))
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert (body["created"], body["errors"]) == (1, 1)
+    assert body["results"][0]["status"] == "error"
+    assert "admin" in body["results"][0]["detail"]
+
+    db = Session()
+    try:
+        assert ledger.get_balance(db, users["tb_col"]) == 6.0
+        assert [t.client_ref for t in db.query(CashTransaction)] == ["tb-pay"]
+    finally:
+        db.close()
+
+
+def test_admin_batch_can_register_deposits(api):
+    client, headers, users, _, Session = api
+    resp = client.post("/api/v1/transactions/batch", json={"items": [
+        {"client_ref": "tb-dep", "amount": 500.0, "transaction_type": "deposit"},
+    ]}, headers=headers("tb_admin"))
+    assert resp.json()["created"] == 1
+
+    db = Session()
+    try:
+        assert ledger.get_balance(db, users["tb_admin"]) == 500.0
+    finally:
+        db.close()
+
+
+def test_client_ref_is_unique_per_user(api):
+    client, headers, users, credit_ids, Session = api
+    # Dos dispositivos pueden generar la misma clave: cada cobrador tiene su propio espacio
+    for username in ("tb_col", "tb_col2"):
+        resp = client.post("/api/v1/transactions/batch", json={"items": [
+            {"client_ref": "ref-1", "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids[username]},
+        ]}, headers=headers(username))
+        assert resp.json()["created"] == 1, resp.text
+
+    # El reintento del mismo cobrador sí es un duplicado
+    retry = client.post("/api/v1/transactions/batch", json={"items": [
+        {"client_ref": "ref-1", "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col2"]},
+    ]}, headers=headers("tb_col2")).json()
+    assert retry["duplicates"] == 1
+
+    db = Session()
+    try:
+        rows = {(t.user_id, t.client_ref): t.id for t in db.query(CashTransaction)}
+        assert set(rows) == {(users["tb_col"], "ref-1"), (users["tb_col2"], "ref-1")}
+        assert retry["results"][0]["transaction_id"] == rows[(users["tb_col2"], "ref-1")]
+    finally:
+        db.close()
+
+
+def test_single_create_follows_batch_rules(api):
+    client, headers, users, credit_ids, _ = api
+    deposit = client.post("/api/v1/transactions/", json={"amount": 100.0, "transaction_type": "deposit"}, headers=headers("tb_col"))
+    assert deposit.status_code == 403
+    assert "admin" in deposit.json()["detail"]
+
+    payment = client.post("/api/v1/transactions/", json={
+        "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col"],
+    }, headers=headers("tb_col"))
+    assert payment.status_code == 201, payment.text
+    assert payment.json()["user_id"] == users["tb_col"]
+
+    # Fuera de su scope, igual que en el lote
+    other = client.post("/api/v1/transactions/", json={
+        "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col2"],
+    }, headers=headers("tb_col"))
+    assert other.status_code == 403
+
+    assert client.post("/api/v1/transactions/", json={"amount": 50.0, "transaction_type": "deposit"},
+                       headers=headers("tb_admin")).status_code == 201
+
+
+def test_batch_posts_one_ledger_entry_per_item(api):
+    client, headers, users, credit_ids, Session = api
+    resp = client.post("/api/v1/transactions/batch", json={"items": [
+        {"client_ref": "e-1", "amount": 6.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col"],
+         "description": "Cuota 1"},
+        {"client_ref": "e-2", "amount": 4.0, "transaction_type": "payment", "credit_id": credit_ids["tb_col"],
+         "description": "Cuota 2"},
+    ]}, headers=headers("tb_col"))
+    assert resp.json()["created"] == 2
+
+    db = Session()
+    try:
+        entries = db.query(LedgerEntry).order_by(LedgerEntry.id).all()
+        assert [(e.entry_type, e.credit_id, e.description) for e in entries] == [
+            ("PAYMENT", credit_ids["tb_col"], "Cuota 1"), ("PAYMENT", credit_ids["tb_col"], "Cuota 2"),
+        ]
+        assert sorted(p.amount for p in entries[1].postings) == [-4.0, 4.0]
+        assert ledger.get_balance(db, users["tb_col"]) == 10.0
+        assert ledger.reconcile(db) == []
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+"""
+Filtros por fecha de transacciones como rango semiabierto sobre created_at
+(crud.transaction.created_at_range) en una base SQLite temporal.
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.transaction import created_at_range, get_transactions
+from app.models.cash_transaction import CashTransaction, TransactionType
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def db(sqlite_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+    user = User(username="td_col", hashed_password="x", full_name="Col", role=RoleType.COLLECTOR)
+    session.add(user)
+    session.flush()
+    for label, created_at in [
+        ("antes", datetime(2026, 2, 28, 23, 59, 59, 999999)),
+        ("inicio", datetime(2026, 3, 1, 0, 0)),
+        ("medio", datetime(2026, 3, 2, 13, 30)),
+        ("fin", datetime(2026, 3, 3, 23, 59, 59, 999999)),
+        ("despues", datetime(2026, 3, 4, 0, 0)),
+    ]:
+        session.add(CashTransaction(user_id=user.id, amount=1.0, transaction_type=TransactionType.PAYMENT,
+                                    description=label, created_at=created_at))
+    session.commit()
+    yield session, user.id
+    session.close()
+
+
+def test_end_date_includes_the_whole_last_day(db):
+    session, user_id = db
+    rows = get_transactions(session, user_ids=[user_id], start_date=date(2026, 3, 1), end_date=date(2026, 3, 3))
+    assert sorted(t.description for t in rows) == ["fin", "inicio", "medio"]
+
+
+def test_open_ended_ranges(db):
+    session, user_id = db
+    since = get_transactions(session, user_ids=[user_id], start_date=date(2026, 3, 3))
+    assert sorted(t.description for t in since) == ["despues", "fin"]
+    until = get_transactions(session, user_ids=[user_id], end_date=date(2026, 2, 28))
+    assert [t.description for t in until] == ["antes"]
+
+
+def test_range_compares_the_column_without_functions():
+    # Sin func.date(created_at): el motor puede usar los índices (user_id, created_at)
+    stmt = select(CashTransaction.id).where(*created_at_range(date(2026, 3, 1), date(2026, 3, 3)))
+    sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "date(" not in sql.lower()
+    assert "cash_transactions.created_at >= '2026-03-01 00:00:00.000000'" in sql
+    assert "cash_transactions.created_at < '2026-03-04 00:00:00.000000'" in sql
+    assert created_at_range() == []
@@ -0,0 +1,106 @@
+"""
+Caché del alcance de visibilidad de supervisores (app/core/visibility.py): aciertos e
+invalidación al cambiar supervisor, rol, estado o username de un usuario.
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core import visibility
+from app.core.visibility import build_visibility_scope, get_supervisor_collector_ids, invalidate_supervisor_scope
+from app.models.user import User, RoleType
+
+
+@pytest.fixture
+def db(sqlite_engine, monkeypatch):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+
+    admin = User(username="vs_admin", hashed_password="x", full_name="Admin", role=RoleType.ADMIN)
+    sup = User(username="vs_sup", hashed_password="x", full_name="Sup", role=RoleType.SUPERVISOR)
+    sup2 = User(username="vs_sup2", hashed_password="x", full_name="Sup 2", role=RoleType.SUPERVISOR)
+    session.add_all([admin, sup, sup2])
+    session.flush()
+    session.add_all([
+        User(username="vs_col1", hashed_password="x", full_name="Col 1", role=RoleType.COLLECTOR, supervisor_id=sup.id),
+        User(username="vs_col2", hashed_password="x", full_name="Col 2", role=RoleType.COLLECTOR, supervisor_id=sup2.id),
+    ])
+    session.commit()
+
+    # Cuenta las consultas reales al resolver el alcance
+    calls = []
+    real = visibility.get_visible_collector_ids
+
+    def counting(*args, **kwargs):
+        calls.append(args[1:])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(visibility, "get_visible_collector_ids", counting)
+    invalidate_supervisor_scope()
+    yield session, {u.username: u for u in session.query(User)}, calls
+
+    invalidate_supervisor_scope()
+    session.close()
+
+
+def test_scope_is_cached_per_supervisor(db):
+    session, users, calls = db
+    sup = users["vs_sup"]
+    assert get_supervisor_collector_ids(session, sup.id) == [users["vs_col1"].id]
+    assert get_supervisor_collector_ids(session, sup.id) == [users["vs_col1"].id]
+    assert len(calls) == 1
+
+    scope = build_visibility_scope(session, sup)
+    assert scope.collector_ids == [users["vs_col1"].id, sup.id]
+    assert scope.can_see(users["vs_col1"].id) and not scope.can_see(users["vs_col2"].id)
+    assert len(calls) == 1
+    assert build_visibility_scope(session, users["vs_admin"]).is_admin
+
+
+def test_reassigning_a_collector_invalidates_both_supervisors(db):
+    session, users, calls = db
+    sup, sup2, col2 = users["vs_sup"], users["vs_sup2"], users["vs_col2"]
+    get_supervisor_collector_ids(session, sup.id)
+    get_supervisor_collector_ids(session, sup2.id)
+
+    col2.supervisor_id = sup.id
+    session.commit()
+
+    assert sorted(get_supervisor_collector_ids(session, sup.id)) == sorted([users["vs_col1"].id, col2.id])
+    assert get_supervisor_collector_ids(session, sup2.id) == []
+    assert len(calls) == 4
+
+
+def test_new_and_deactivated_collectors_invalidate_the_scope(db):
+    session, users, calls = db
+    sup = users["vs_sup"]
+    get_supervisor_collector_ids(session, sup.id)
+
+    new = User(username="vs_col3", hashed_password="x", full_name="Col 3", role=RoleType.COLLECTOR, supervisor_id=sup.id)
+    session.add(new)
+    session.commit()
+    assert new.id in get_supervisor_collector_ids(session, sup.id)
+
+    users["vs_col1"].is_active = False
+    session.commit()
+    assert get_supervisor_collector_ids(session, sup.id) == [new.id]
+    assert len(calls) == 3
+
+
+def test_renaming_a_user_refreshes_routes_assigned_by_name(db):
+    session, users, calls = db
+    sup2, col1 = users["vs_sup2"], users["vs_col1"]
+    # vs_sup2 ve además la ruta asignada por nombre de usuario
+    assert sorted(get_supervisor_collector_ids(session, sup2.id, "vs_col1")) == sorted([users["vs_col2"].id, col1.id])
+
+    col1.username = "vs_col1_renamed"
+    session.commit()
+    assert get_supervisor_collector_ids(session, sup2.id, "vs_col1") == [users["vs_col2"].id]
+    assert len(calls) == 2
+
+
+def test_unrelated_updates_keep_the_cache(db):
+    session, users, calls = db
+    get_supervisor_collector_ids(session, users["vs_sup"].id)
+    users["vs_col1"].full_name = "Otro nombre"
+    session.commit()
+    get_supervisor_collector_ids(session, users["vs_sup"].id)
+    assert len(calls) == 1